@@ -7,6 +7,7 @@ Usage:
     python3 build.py --check             # Pre-flight checks only
     python3 build.py --verify dist/...   # Verify a built dist package
     python3 build.py --rebuild-base      # Force recompile FrankenPHP base
+    python3 build.py --no-cache          # Rebuild the binary even if inputs are unchanged
 
 All build parameters are read from VERSION + build.conf. No hardcoded values.
 """
@@ -18,6 +19,7 @@ import fnmatch
 import hashlib
 import json
 import os
+import re
 import shutil
 import subprocess
 import tarfile
@@ -26,6 +28,7 @@ from pathlib import Path
 
 import docker
 
+from lib.checksums import remember, sha256_file, sha256_files
 from lib.config import BuildConfig
 
 
@@ -54,6 +57,23 @@ def _clean_dir(path: Path):
     path.mkdir(parents=True, exist_ok=True)
 
 
+# Left out of the package when the source isn't a git checkout. Matched against
+# each path component; an excluded directory is never descended into.
+SOURCE_EXCLUDE = (
+    ".git", ".github", ".gitignore", ".dockerignore",
+    ".env", ".env.*", "vendor", "node_modules",
+    "tmp", "logs", "cache", ".idea", ".vscode",
+    "composer.lock", "package-lock.json",
+    "__pycache__", ".DS_Store",
+)
+_SOURCE_EXCLUDE_RE = re.compile("|".join(fnmatch.translate(p) for p in SOURCE_EXCLUDE))
+
+
+def _ignore_excluded(directory: str, names: list[str]) -> set[str]:
+    """shutil.copytree ignore callback for SOURCE_EXCLUDE."""
+    return {n for n in names if _SOURCE_EXCLUDE_RE.match(n)}
+
+
 # ---------------------------------------------------------------------------
 # Builder class — all state lives here, zero globals
 # ---------------------------------------------------------------------------
@@ -114,47 +134,35 @@ class Builder:
 
     # -- Archive -----------------------------------------------------------
 
-    def archive_app(self) -> Path:
-        """Archive OrangeScrum V4 app into a tar file."""
-        archive_path = self.c.builder_dir / "repo.tar"
-
-        git_dir = self.c.repo / ".git"
-        if git_dir.exists():
-            print("  Using git archive (tracked files only)...")
+    def export_app(self):
+        """Write the OrangeScrum V4 app source into package_dir, with no intermediate archive."""
+        if (self.c.repo / ".git").exists():
+            print("  Streaming git archive (tracked files only)...")
             try:
-                _run(
-                    ["git", "-C", str(self.c.repo), "archive", "--format=tar",
-                     "HEAD", "-o", str(archive_path)]
-                )
-                return archive_path
-            except subprocess.CalledProcessError:
-                print("  Git archive failed, falling back to manual tar...")
-
-        print("  Creating tar archive with exclusions...")
-        exclude = {
-            ".git", ".github", ".gitignore", ".dockerignore",
-            ".env", ".env.*", "vendor", "node_modules",
-            "tmp", "logs", "cache", ".idea", ".vscode",
-            "composer.lock", "package-lock.json",
-            "__pycache__", ".DS_Store",
-        }
-
-        def tar_filter(tarinfo):
-            rel = Path(tarinfo.name)
-            for part in rel.parts:
-                if part in exclude:
-                    return None
-                if any(fnmatch.fnmatch(part, p) for p in exclude if "*" in p):
-                    return None
-            return tarinfo
+                self._extract_git_archive()
+                return
+            except (subprocess.CalledProcessError, tarfile.TarError) as e:
+                print(f"  Git archive failed ({e}), falling back to a filtered copy...")
+                _clean_dir(self.c.package_dir)
 
-        with tarfile.open(archive_path, "w") as tar:
-            tar.add(self.c.repo, arcname=".", filter=tar_filter, recursive=True)
-        return archive_path
+        print("  Copying source with exclusions...")
+        shutil.copytree(
+            self.c.repo, self.c.package_dir,
+            symlinks=True, ignore=_ignore_excluded, dirs_exist_ok=True,
+        )
 
-    def extract_archive(self, archive_path: Path):
-        with tarfile.open(archive_path, "r") as tar:
-            tar.extractall(path=self.c.package_dir)
+    def _extract_git_archive(self):
+        cmd = ["git", "-C", str(self.c.repo), "archive", "--format=tar", "HEAD"]
+        print(f"  $ {' '.join(cmd)} | extract")
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                tar.extractall(path=self.c.package_dir)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
 
     def copy_config_overrides(self):
         config_dir = self.c.common_dir / "config"
@@ -252,6 +260,63 @@ class Builder:
         print(f"  ELF: valid, {size / (1024*1024):.1f} MB, "
               f"{'static' if is_static else 'DYNAMIC (warning)'}")
 
+    # -- Build cache -------------------------------------------------------
+
+    def build_fingerprint(self, inputs: dict | None) -> tuple[str, dict] | None:
+        """Hash of the build inputs plus the base image id, or None if uncacheable."""
+        if inputs is None:
+            return None
+        try:
+            base_id = self.docker_client.images.get(self.c.base_image).id
+        except docker.errors.ImageNotFound:
+            return None
+        inputs = {**inputs, "base_image_id": base_id}
+        digest = hashlib.sha256(
+            json.dumps(inputs, sort_keys=True).encode()
+        ).hexdigest()
+        return digest, inputs
+
+    def load_build_cache(self) -> dict:
+        try:
+            return json.loads(self.c.build_cache_file.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def cached_binary_matches(self, fingerprint: str, inputs: dict) -> bool:
+        """True if the binary on disk was built from exactly these inputs."""
+        record = self.load_build_cache()
+        if record.get("fingerprint") != fingerprint:
+            changed = sorted(
+                k for k, v in record.get("inputs", {}).items()
+                if inputs.get(k) != v
+            )
+            if changed:
+                print(f"  Changed since last build: {', '.join(changed)}")
+            return False
+        try:
+            st = self.c.binary_path.stat()
+        except FileNotFoundError:
+            return False
+        # Any other writer of the binary (--skip-archive builds, manual copies) changes these
+        if (st.st_size != record.get("binary_size_bytes")
+                or st.st_mtime_ns != record.get("binary_mtime_ns")):
+            return False
+        if record.get("binary_sha256"):
+            remember(self.c.binary_path, record["binary_sha256"])
+        return True
+
+    def record_build_cache(self, fingerprint: str, inputs: dict):
+        st = self.c.binary_path.stat()
+        record = {
+            "fingerprint": fingerprint,
+            "inputs": inputs,
+            "binary_size_bytes": st.st_size,
+            "binary_mtime_ns": st.st_mtime_ns,
+            "binary_sha256": sha256_file(self.c.binary_path),
+            "built_at": self.c.build_date,
+        }
+        self.c.build_cache_file.write_text(json.dumps(record, indent=2) + "\n")
+
     # -- Deployment packages -----------------------------------------------
 
     def build_deployment_folders(self):
@@ -278,16 +343,17 @@ class Builder:
 
     def write_checksums(self):
         """Write SHA256 checksum files next to the binaries in dist."""
-        pairs = [
-            (self.c.dist_docker_dir / "orangescrum-app" / self.c.binary_name,),
-            (self.c.dist_native_dir / "bin" / "orangescrum",),
+        binaries = [
+            b for b in (
+                self.c.dist_docker_dir / "orangescrum-app" / self.c.binary_name,
+                self.c.dist_native_dir / "bin" / "orangescrum",
+            )
+            if b.exists()
         ]
-        for (binary,) in pairs:
-            if binary.exists():
-                sha = hashlib.sha256(binary.read_bytes()).hexdigest()
-                checksum_file = binary.with_suffix(binary.suffix + ".sha256")
-                checksum_file.write_text(f"{sha}  {binary.name}\n")
-                print(f"  Checksum: {checksum_file.name}")
+        for binary, sha in sha256_files(binaries).items():
+            checksum_file = binary.with_suffix(binary.suffix + ".sha256")
+            checksum_file.write_text(f"{sha}  {binary.name}\n")
+            print(f"  Checksum: {checksum_file.name}")
 
     def prune_old_dists(self):
         dist_root = self.c.root / "dist"
@@ -318,26 +384,38 @@ class Builder:
         expected_sha = manifest.get("binary_sha256")
         if not expected_sha:
             print("  [WARN] No binary_sha256 in manifest")
-            return True
 
-        # Find the binary
-        for candidate in [
-            dist_dir / "orangescrum-app" / "osv4-prod",
-            dist_dir / "bin" / "orangescrum",
-        ]:
-            if candidate.exists():
-                actual_sha = hashlib.sha256(candidate.read_bytes()).hexdigest()
-                if actual_sha == expected_sha:
-                    print(f"  [OK] Binary SHA256 matches: {actual_sha[:16]}...")
-                    return True
+        # Every binary in the dist is checked against the manifest and its .sha256 file
+        binary_name = manifest.get("binary_name", self.c.binary_name)
+        binaries = [
+            b for b in (
+                dist_dir / "orangescrum-app" / binary_name,
+                dist_dir / "bin" / "orangescrum",
+            )
+            if b.exists()
+        ]
+        if not binaries:
+            print("  [FAIL] Binary not found in dist")
+            return False
+
+        ok = True
+        for binary, actual_sha in sha256_files(binaries).items():
+            expected = {"manifest": expected_sha}
+            checksum_file = binary.with_suffix(binary.suffix + ".sha256")
+            if checksum_file.exists():
+                expected[checksum_file.name] = checksum_file.read_text().split()[0]
+            rel = binary.relative_to(dist_dir)
+            for source, sha in expected.items():
+                if not sha:
+                    continue
+                if sha == actual_sha:
+                    print(f"  [OK] {rel} matches {source}: {actual_sha[:16]}...")
                 else:
-                    print(f"  [FAIL] SHA256 mismatch!")
-                    print(f"    Expected: {expected_sha}")
+                    print(f"  [FAIL] {rel} SHA256 mismatch ({source})!")
+                    print(f"    Expected: {sha}")
                     print(f"    Actual:   {actual_sha}")
-                    return False
-
-        print("  [FAIL] Binary not found in dist")
-        return False
+                    ok = False
+        return ok
 
     # -- Deploy (optional) -------------------------------------------------
 
@@ -382,6 +460,35 @@ class Builder:
 
     # -- Main build pipeline -----------------------------------------------
 
+    def _build_binary(self, args):
+        """Archive the app source, embed it into FrankenPHP and extract the binary."""
+        # -- Prepare application source --
+        if not args.skip_archive:
+            self._step("Prepare package directory")
+            _clean_dir(self.c.package_dir)
+
+            self._step("Export application source")
+            self.export_app()
+
+            self._step("Copy configuration overrides")
+            self.copy_config_overrides()
+        elif args.clean and self.c.package_dir.exists():
+            _clean_dir(self.c.package_dir)
+
+        # -- Build FrankenPHP --
+        if not args.skip_base:
+            self._step("Ensure FrankenPHP base image")
+            self.ensure_base_image(args.rebuild_base)
+
+        self._step("Embed application into FrankenPHP")
+        self.build_app_embed()
+
+        self._step("Extract binary")
+        self.extract_binary()
+
+        self._step("Validate binary")
+        self.validate_binary()
+
     def run(self, args) -> int:
         build_start = time.time()
 
@@ -396,36 +503,26 @@ class Builder:
             return 1
 
         try:
-            # -- Prepare application source --
-            if not args.skip_archive:
-                self._step("Prepare package directory")
-                _clean_dir(self.c.package_dir)
-
-                self._step("Archive application source")
-                archive = self.archive_app()
-
-                self._step("Extract to package directory")
-                self.extract_archive(archive)
-                archive.unlink(missing_ok=True)
-
-                self._step("Copy configuration overrides")
-                self.copy_config_overrides()
-            elif args.clean and self.c.package_dir.exists():
-                _clean_dir(self.c.package_dir)
-
-            # -- Build FrankenPHP --
-            if not args.skip_base:
-                self._step("Ensure FrankenPHP base image")
-                self.ensure_base_image(args.rebuild_base)
-
-            self._step("Embed application into FrankenPHP")
-            self.build_app_embed()
-
-            self._step("Extract binary")
-            self.extract_binary()
+            # -- Build cache: the app source is only pinned when it is archived here --
+            inputs = None if args.skip_archive else self.c.build_inputs()
+            cached = False
+            if not (args.no_cache or args.rebuild_base):
+                self._step("Check build cache")
+                fp = self.build_fingerprint(inputs)
+                if fp is None:
+                    print("  Not cacheable (no git source or no base image yet)")
+                else:
+                    cached = self.cached_binary_matches(*fp)
+                    print(f"  {'Hit' if cached else 'Miss'}: {fp[0][:16]}")
 
-            self._step("Validate binary")
-            self.validate_binary()
+            if cached:
+                self._step("Reuse cached binary")
+                self.validate_binary()
+            else:
+                self._build_binary(args)
+                fp = self.build_fingerprint(inputs)
+                if fp is not None:
+                    self.record_build_cache(*fp)
 
             # -- Package --
             self._step("Build deployment packages")
@@ -435,8 +532,9 @@ class Builder:
             self.write_manifests()
             self.write_checksums()
 
-            self._step("Clean up builder")
-            self.stop_builder_stack()
+            if not cached:
+                self._step("Clean up builder")
+                self.stop_builder_stack()
 
             self._step("Prune old builds")
             self.prune_old_dists()
@@ -521,6 +619,8 @@ def parse_args():
                     help="Keep builder/package/ after build")
     p.add_argument("--clean", action="store_true",
                     help="Clean package dir before building")
+    p.add_argument("--no-cache", action="store_true",
+                    help="Rebuild the binary even if its inputs are unchanged")
 
     # Config
     p.add_argument("--config", metavar="PATH",
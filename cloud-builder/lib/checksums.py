@@ -0,0 +1,52 @@
+"""SHA256 of build artifacts.
+
+Files are streamed through a fixed buffer, so hashing a 100 MB binary needs
+no more memory than hashing a config file. Digests are remembered per
+(path, size, mtime), so an artifact is read at most once per build no matter
+how many manifests and checksum files mention it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+HASH_BUFFER = 1024 * 1024  # bytes per read
+MAX_WORKERS = 4  # hashlib releases the GIL, so threads hash in parallel
+
+_digests: dict[tuple[str, int, int], str] = {}
+
+
+def _key(path: Path, st: os.stat_result) -> tuple[str, int, int]:
+    return (str(Path(path).resolve()), st.st_size, st.st_mtime_ns)
+
+
+def remember(path: Path, digest: str):
+    """Record a digest known from elsewhere (e.g. the build cache) for the file as it is now."""
+    _digests[_key(path, Path(path).stat())] = digest
+
+
+def sha256_file(path: Path) -> str:
+    st = Path(path).stat()
+    key = _key(path, st)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        buf = bytearray(HASH_BUFFER)
+        view = memoryview(buf)
+        with open(path, "rb", buffering=0) as f:
+            while n := f.readinto(buf):
+                h.update(view[:n])
+        digest = _digests[key] = h.hexdigest()
+    return digest
+
+
+def sha256_files(paths: list[Path]) -> dict[Path, str]:
+    """Digest of every path, hashed concurrently."""
+    paths = list(dict.fromkeys(paths))
+    if len(paths) <= 1:
+        return {p: sha256_file(p) for p in paths}
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(paths))) as pool:
+        return dict(zip(paths, pool.map(sha256_file, paths)))
@@ -16,6 +16,18 @@ import time
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from .checksums import sha256_file
+
+
+# Files in builder/ that shape the binary (php.ini and Caddyfile are embedded)
+BUILDER_INPUT_FILES = (
+    "base-build.Dockerfile",
+    "app-embed.Dockerfile",
+    "docker-compose.yaml",
+    "php.ini",
+    "Caddyfile",
+)
+
 
 @dataclass(frozen=True)
 class BuildConfig:
@@ -53,14 +65,18 @@ class BuildConfig:
     uid: int
     gid: int
 
-    # Builder compose file (derived)
+    # Builder compose file and build cache record (derived)
     builder_compose_file: Path = field(default=Path("."))
+    build_cache_file: Path = field(default=Path("."))
 
     def __post_init__(self):
         # frozen=True prevents assignment, but we can use object.__setattr__ in __post_init__
         object.__setattr__(
             self, "builder_compose_file", self.builder_dir / "docker-compose.yaml"
         )
+        object.__setattr__(
+            self, "build_cache_file", self.builder_dir / "build-cache.json"
+        )
 
     @classmethod
     def from_args(
@@ -152,6 +168,31 @@ class BuildConfig:
             gid=gid,
         )
 
+    def build_inputs(self) -> dict | None:
+        """Everything that goes into the embedded binary, or None if the source can't be pinned.
+
+        The app source is identified by its git commit plus a hash of any
+        uncommitted changes; a source tree outside git is never cached.
+        """
+        head = _git_head(self.repo)
+        if head is None:
+            return None
+        overrides = sorted((self.common_dir / "config").glob("*.example.php"))
+        return {
+            "git_sha": head,
+            "dirty_hash": _git_dirty_hash(self.repo),
+            "frankenphp_version": self.frankenphp_version,
+            "php_version": self.php_version,
+            "php_extensions": self.php_extensions,
+            "no_compress": self.no_compress,
+            "builder_files": {
+                name: sha256_file(self.builder_dir / name)
+                for name in BUILDER_INPUT_FILES
+                if (self.builder_dir / name).exists()
+            },
+            "config_overrides": {f.name: sha256_file(f) for f in overrides},
+        }
+
     def build_env(self) -> dict[str, str]:
         """Return environment variables to pass to Docker build commands."""
         env = os.environ.copy()
@@ -186,7 +227,7 @@ class BuildConfig:
             "binary_name": self.binary_name,
         }
         if self.binary_path.exists():
-            result["binary_sha256"] = _sha256(self.binary_path)
+            result["binary_sha256"] = sha256_file(self.binary_path)
             result["binary_size_bytes"] = self.binary_path.stat().st_size
         return result
 
@@ -215,9 +256,21 @@ def _git_sha(repo: Path) -> str:
         return "unknown"
 
 
-def _sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+def _git_head(repo: Path) -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "-C", str(repo), "rev-parse", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+def _git_dirty_hash(repo: Path) -> str | None:
+    """SHA256 of uncommitted changes to tracked files, or None for a clean tree."""
+    diff = subprocess.check_output(
+        ["git", "-C", str(repo), "diff", "HEAD", "--binary"],
+        stderr=subprocess.DEVNULL,
+    )
+    return hashlib.sha256(diff).hexdigest() if diff else None
@@ -1,13 +1,14 @@
-"""Authentication — HTTP Basic for API routes, token-based for WebSockets."""
+"""Authentication — HTTP Basic for API routes, token-based for WebSockets and Traefik."""
 
 import os
 import secrets
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
 AUTH_USER = os.environ.get("CONTROLLER_USER", "admin")
 AUTH_PASS = os.environ.get("CONTROLLER_PASS", "")
+PROVIDER_TOKEN = os.environ.get("TRAEFIK_PROVIDER_TOKEN", "")
 
 security = HTTPBasic()
 
@@ -28,3 +29,14 @@ def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Basic"},
         )
     return credentials.username
+
+
+def verify_provider_token(token: str = Query("", description="TRAEFIK_PROVIDER_TOKEN")):
+    """Shared-secret check for Traefik's HTTP provider, which cannot send Basic auth."""
+    if not PROVIDER_TOKEN:
+        raise HTTPException(
+            status_code=503,
+            detail="Traefik provider token not configured. Set TRAEFIK_PROVIDER_TOKEN environment variable.",
+        )
+    if not secrets.compare_digest(token.encode(), PROVIDER_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -1,13 +1,21 @@
-"""Shared helpers — Docker, registry (SQLite-backed), domain detection, sanitization."""
+"""Shared helpers — Docker, registry (SQLite-backed), templates, domain detection, sanitization."""
 
+import configparser
+import hashlib
 import json
+import logging
 import os
 import re
 import sqlite3
+import time
 from pathlib import Path
 
 import docker
+import yaml
 from fastapi import HTTPException
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+log = logging.getLogger("ssmd.helpers")
 
 # Paths
 PROJECT_ROOT = Path(os.environ.get("PROJECT_ROOT", "/project"))
@@ -56,7 +64,39 @@ def _get_db() -> sqlite3.Connection:
             status         TEXT DEFAULT 'running',
             restricted     INTEGER DEFAULT 0,
             branch         TEXT DEFAULT '',
-            worktree_path  TEXT DEFAULT ''
+            worktree_path  TEXT DEFAULT '',
+            migrations_fingerprint TEXT DEFAULT ''
+        )
+    """)
+    _ensure_columns(db, "instances", {"migrations_fingerprint": "TEXT DEFAULT ''"})
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            path        TEXT PRIMARY KEY,
+            instance    TEXT DEFAULT '',
+            db_name     TEXT DEFAULT '',
+            size_bytes  INTEGER DEFAULT 0,
+            created_at  TEXT DEFAULT '',
+            profile     TEXT DEFAULT 'full',
+            sha256      TEXT DEFAULT ''
+        )
+    """)
+    _ensure_columns(db, "snapshots", {"profile": "TEXT DEFAULT 'full'", "sha256": "TEXT DEFAULT ''"})
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_policies (
+            scope        TEXT PRIMARY KEY,
+            keep_last    INTEGER,
+            keep_daily   INTEGER,
+            keep_weekly  INTEGER,
+            max_total_mb INTEGER
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS generated_files (
+            path       TEXT PRIMARY KEY,
+            kind       TEXT DEFAULT 'file',
+            owner      TEXT DEFAULT '',
+            sha256     TEXT DEFAULT '',
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     """)
     db.commit()
@@ -65,6 +105,14 @@ def _get_db() -> sqlite3.Connection:
     return db
 
 
+def _ensure_columns(db: sqlite3.Connection, table: str, columns: dict):
+    """Add columns introduced after a table was first created."""
+    existing = {r[1] for r in db.execute(f"PRAGMA table_info({table})")}
+    for column, decl in columns.items():
+        if column not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def _migrate_from_json(db: sqlite3.Connection):
     """Import data from the legacy registry.json into SQLite."""
     try:
@@ -141,14 +189,16 @@ def save_registry(registry: dict):
             db.execute("""
                 INSERT OR REPLACE INTO instances
                     (name, type, subdomain, db_name, db_user, container_name,
-                     source_path, created_at, status, restricted, branch, worktree_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     source_path, created_at, status, restricted, branch, worktree_path,
+                     migrations_fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 name, inst['type'], inst['subdomain'], inst['db_name'],
                 inst.get('db_user', 'postgres'), inst['container_name'],
                 inst.get('source_path', ''), inst.get('created_at', ''),
                 inst.get('status', 'running'), int(inst.get('restricted', False)),
                 inst.get('branch', ''), inst.get('worktree_path', ''),
+                inst.get('migrations_fingerprint', ''),
             ))
 
         db.execute("COMMIT")
@@ -159,11 +209,279 @@ def save_registry(registry: dict):
         db.close()
 
 
-# ─── Domain / HTTPS / Cache detection ───────────────────────────────────────
+def set_migrations_fingerprint(name: str, fingerprint: str):
+    db = _get_db()
+    db.execute("UPDATE instances SET migrations_fingerprint = ? WHERE name = ?", (fingerprint, name))
+    db.commit()
+    db.close()
+
+
+# ─── Snapshot catalog & retention policies ──────────────────────────────────
+
+SNAPSHOTS_DIR = PROJECT_ROOT / "snapshots"
+SNAPSHOT_POLICY_FIELDS = ("keep_last", "keep_daily", "keep_weekly", "max_total_mb")
+GLOBAL_POLICY_SCOPE = "*"
+
+
+SNAPSHOT_PROFILES_FILE = PROJECT_ROOT / "config" / "snapshot-profiles.conf"
+DEFAULT_SNAPSHOT_PROFILE = "full"
+
+
+def load_snapshot_profiles() -> dict[str, dict]:
+    """Read named pg_dump profiles from config/snapshot-profiles.conf."""
+    profiles = {DEFAULT_SNAPSHOT_PROFILE: {"description": "Complete dump: schema and all data", "pg_dump_args": []}}
+    cp = configparser.ConfigParser()
+    if SNAPSHOT_PROFILES_FILE.exists():
+        cp.read(SNAPSHOT_PROFILES_FILE)
+    for name in cp.sections():
+        section = cp[name]
+        args = []
+        if section.getboolean("schema_only", fallback=False):
+            args.append("--schema-only")
+        for key, flag in (("table", "--table"), ("exclude_table", "--exclude-table"),
+                          ("exclude_table_data", "--exclude-table-data")):
+            args += [f"{flag}={pat.strip()}" for pat in section.get(key, "").split(",") if pat.strip()]
+        profiles[name] = {"description": section.get("description", ""), "pg_dump_args": args}
+    return profiles
+
+
+def load_snapshot_catalog() -> list[dict]:
+    db = _get_db()
+    db.row_factory = sqlite3.Row
+    rows = db.execute("SELECT * FROM snapshots ORDER BY created_at DESC").fetchall()
+    db.close()
+    return [dict(r) for r in rows]
+
+
+def record_snapshot(path: str, instance: str = "", db_name: str = "",
+                    size_bytes: int = 0, created_at: str = "", profile: str = "full",
+                    sha256: str = ""):
+    db = _get_db()
+    db.execute("""
+        INSERT OR REPLACE INTO snapshots (path, instance, db_name, size_bytes, created_at, profile, sha256)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (path, instance, db_name, size_bytes, created_at, profile, sha256))
+    db.commit()
+    db.close()
+
+
+def forget_snapshots(paths):
+    db = _get_db()
+    db.executemany("DELETE FROM snapshots WHERE path = ?", [(p,) for p in paths])
+    db.commit()
+    db.close()
+
+
+def load_snapshot_policies() -> dict[str, dict]:
+    db = _get_db()
+    db.row_factory = sqlite3.Row
+    rows = db.execute("SELECT * FROM snapshot_policies").fetchall()
+    db.close()
+    return {r["scope"]: {f: r[f] for f in SNAPSHOT_POLICY_FIELDS} for r in rows}
+
+
+def save_snapshot_policy(scope: str, policy: dict):
+    db = _get_db()
+    db.execute("""
+        INSERT OR REPLACE INTO snapshot_policies
+            (scope, keep_last, keep_daily, keep_weekly, max_total_mb)
+        VALUES (?, ?, ?, ?, ?)
+    """, (scope, *(policy.get(f) for f in SNAPSHOT_POLICY_FIELDS)))
+    db.commit()
+    db.close()
+
+
+def delete_snapshot_policy(scope: str):
+    db = _get_db()
+    db.execute("DELETE FROM snapshot_policies WHERE scope = ?", (scope,))
+    db.commit()
+    db.close()
+
+
+# ─── Generated-file manifest ────────────────────────────────────────────────
+# Shared with the CLI (`./ssmd verify`, reset); paths are relative to PROJECT_ROOT.
+
+_GENERATED_LINE_RE = re.compile(r"^#\s*Generated: .*$", re.M)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of generated content, ignoring the '# Generated:' timestamp line."""
+    return hashlib.sha256(_GENERATED_LINE_RE.sub("", text, count=1).encode()).hexdigest()
+
+
+def record_generated(entries: list[dict]):
+    db = _get_db()
+    db.executemany("""
+        INSERT OR REPLACE INTO generated_files (path, kind, owner, sha256)
+        VALUES (?, ?, ?, ?)
+    """, [(e["path"], e.get("kind", "file"), e.get("owner", ""), e.get("sha256", "")) for e in entries])
+    db.commit()
+    db.close()
+
+
+def forget_generated(paths: list[str] | None = None, owner: str | None = None):
+    db = _get_db()
+    if paths:
+        db.executemany("DELETE FROM generated_files WHERE path = ?", [(p,) for p in paths])
+    if owner:
+        db.execute("DELETE FROM generated_files WHERE owner = ?", (owner,))
+    db.commit()
+    db.close()
+
+
+def write_generated(path: Path, content: str, owner: str = ""):
+    """Write a generated file and record it in the manifest."""
+    path.write_text(content)
+    record_generated([{"path": str(path.relative_to(PROJECT_ROOT)), "owner": owner,
+                       "sha256": content_hash(content)}])
+
+
+# ─── Templates ──────────────────────────────────────────────────────────────
+
+_template_env: Environment | None = None
+
+
+def get_template_env() -> Environment:
+    """Process-wide Jinja environment for TEMPLATES_DIR.
+
+    Compiled templates are cached in memory and in a bytecode cache under the
+    system temp dir; a template is recompiled when its file's mtime changes.
+    """
+    global _template_env
+    if _template_env is None:
+        _template_env = Environment(
+            loader=FileSystemLoader(str(TEMPLATES_DIR)),
+            trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True,
+            auto_reload=True, bytecode_cache=FileSystemBytecodeCache(),
+        )
+    return _template_env
+
+
+# ─── Project context (domain / HTTPS / cache engine / base services) ────────
+
+def _stat_key(path: Path):
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _stored_domain() -> str | None:
+    db = _get_db()
+    row = db.execute("SELECT value FROM config WHERE key = 'domain'").fetchone()
+    db.close()
+    return row[0] if row else None
+
+
+_EMPTY_COMPOSE = {"project": None, "domain": None, "http_provider": False, "cache_engine": "redis", "services": {}}
+
+
+def _format_port(port) -> str:
+    if isinstance(port, dict):  # long syntax
+        published = port.get("published")
+        target = f"{port.get('target')}/{port['protocol']}" if port.get("protocol") else str(port.get("target"))
+        return f"{published}:{target}" if published else target
+    return str(port)
+
+
+def parse_compose(content: str) -> dict:
+    """Structured model of a docker-compose.yml.
+
+    {project, domain, http_provider, cache_engine,
+     services: {name: {container_name, image, healthcheck, ports}}}
+    container_name is None when the file does not pin one.
+    """
+    data = yaml.safe_load(content) or {}
+    project = data.get("name")
+    services = {}
+    command_args = []
+    for svc, spec in (data.get("services") or {}).items():
+        spec = spec or {}
+        healthcheck = spec.get("healthcheck") or {}
+        services[svc] = {
+            "container_name": spec.get("container_name") or (f"{project}-{svc}-1" if project else None),
+            "image": spec.get("image", ""),
+            "healthcheck": bool(healthcheck) and not healthcheck.get("disable", False),
+            "ports": [_format_port(p) for p in spec.get("ports") or []],
+        }
+        command = spec.get("command") or []
+        command_args.extend(command if isinstance(command, list) else str(command).split())
+    match = re.search(r"# Domain: ([a-z0-9.-]+\.[a-z]{2,})", content)  # comments are not in the YAML data
+    return {
+        "project": project,
+        "domain": match.group(1) if match else None,
+        "http_provider": any(str(arg).startswith("--providers.http.endpoint") for arg in command_args),
+        "cache_engine": "memcached" if "memcached-durango" in services and "redis-durango" not in services else "redis",
+        "services": services,
+    }
+
+
+class ProjectContext:
+    """Values parsed from the project's files, cached per source.
+
+    A source is re-read only when the mtime or size of its file(s) changes, so
+    a lookup on the request path costs one stat() per file.
+    """
+
+    def __init__(self):
+        self._cache: dict[str, tuple] = {}
+        self._compose_by_hash: tuple[str, dict] = ("", _EMPTY_COMPOSE)
+
+    def _cached(self, name: str, paths: tuple[Path, ...], loader):
+        key = tuple(_stat_key(p) for p in paths)
+        hit = self._cache.get(name)
+        if hit is None or hit[0] != key:
+            hit = (key, loader())
+            self._cache[name] = hit
+        return hit[1]
+
+    def _registry_cached(self, name: str, loader):
+        # registry.db is in WAL mode, so a write may only touch the -wal file until checkpoint
+        return self._cached(name, (REGISTRY_DB, REGISTRY_DB.with_name(REGISTRY_DB.name + "-wal")), loader)
+
+    @property
+    def domain(self) -> str | None:
+        return self._registry_cached("domain", _stored_domain) or self.compose["domain"]
+
+    @property
+    def registry(self) -> dict:
+        """Cached load_registry() result — read-only; use load_registry() to modify."""
+        return self._registry_cached("registry", load_registry)
+
+    @property
+    def enable_https(self) -> bool:
+        path = TRAEFIK_DIR / "dynamic.yml"
+        return self._cached("https", (path,), lambda: "websecure" in path.read_text() if path.exists() else True)
+
+    @property
+    def compose(self) -> dict:
+        path = PROJECT_ROOT / "docker-compose.yml"
+        return self._cached("compose", (path,), lambda: self._load_compose(path))
+
+    def _load_compose(self, path: Path) -> dict:
+        # Only reached when the file's stat changed; a touch or an identical
+        # regeneration is caught by the hash and not parsed again
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return _EMPTY_COMPOSE
+        digest = hashlib.sha256(data).hexdigest()
+        if self._compose_by_hash[0] != digest:
+            try:
+                model = parse_compose(data.decode())
+            except (yaml.YAMLError, UnicodeDecodeError, AttributeError) as e:
+                log.warning("Could not parse %s (%s); discovering services from Docker labels", path, e)
+                model = _EMPTY_COMPOSE
+            self._compose_by_hash = (digest, model)
+        return self._compose_by_hash[1]
+
+
+project_context = ProjectContext()
+
 
 def get_domain():
-    reg = load_registry()
-    return reg.get("domain")
+    return project_context.domain
 
 
 def get_domain_prefix():
@@ -172,59 +490,85 @@ def get_domain_prefix():
 
 
 def detect_https():
-    dynamic_yml = TRAEFIK_DIR / "dynamic.yml"
-    if dynamic_yml.exists():
-        return "websecure" in dynamic_yml.read_text()
-    return True
+    return project_context.enable_https
+
+
+def detect_http_provider():
+    """True when Traefik pulls instance routes from the controller instead of traefik/instances.yml."""
+    return project_context.compose["http_provider"]
 
 
 def detect_cache_engine():
-    compose = PROJECT_ROOT / "docker-compose.yml"
-    if compose.exists():
-        content = compose.read_text()
-        if "redis-durango" in content:
-            return "redis"
-        if "memcached-durango" in content:
-            return "memcached"
-    return "redis"
+    return project_context.compose["cache_engine"]
 
 
 # ─── Container helpers ──────────────────────────────────────────────────────
 
-def _get_base_service_names() -> set:
-    """Read service names from docker-compose.yml dynamically."""
-    compose = PROJECT_ROOT / "docker-compose.yml"
-    if not compose.exists():
-        return set()
-    services = set()
-    in_services = False
-    for line in compose.read_text().splitlines():
-        stripped = line.strip()
-        if stripped == "services:":
-            in_services = True
+LABEL_CACHE_TTL = 30  # seconds
+
+_label_cache: dict = {"key": None, "at": 0.0, "services": {}}
+
+
+def _services_from_labels() -> dict[str, dict]:
+    """Base services of the running compose project, from com.docker.compose.* labels.
+
+    Used when docker-compose.yml is missing or unreadable; cached for LABEL_CACHE_TTL.
+    """
+    domain = get_domain()
+    if not domain:
+        return {}
+    project = f"orangescrum-{domain.replace('.', '-')}"
+    now = time.monotonic()
+    if _label_cache["key"] == project and now - _label_cache["at"] < LABEL_CACHE_TTL:
+        return _label_cache["services"]
+    services = {}
+    try:
+        containers = docker_client.containers.list(
+            all=True, filters={"label": f"com.docker.compose.project={project}"})
+    except Exception:
+        containers = []
+    for c in containers:
+        svc = c.labels.get("com.docker.compose.service")
+        if not svc:
             continue
-        if in_services:
-            if line and not line[0].isspace():
-                break
-            if line.startswith("  ") and not line.startswith("    ") and stripped.endswith(":") and not stripped.startswith("#"):
-                svc = stripped.rstrip(":").strip()
-                if svc:
-                    services.add(svc)
-    services.add("controller")
+        config = c.attrs.get("Config", {})
+        services[svc] = {
+            "container_name": c.name,
+            "image": config.get("Image", ""),
+            "healthcheck": bool(config.get("Healthcheck")),
+            "ports": [f"{b['HostPort']}:{port}" for port, binds in (c.ports or {}).items() for b in binds or []],
+        }
+    _label_cache.update(key=project, at=now, services=services)
     return services
 
 
-def sanitize_container_name(name: str) -> str:
-    """Validate that a name resolves to a known container in our ecosystem."""
+def get_base_services() -> dict[str, dict]:
+    """Base services from docker-compose.yml (cached on file hash), else from Docker labels."""
+    return project_context.compose["services"] or _services_from_labels()
+
+
+def get_base_container_names() -> dict[str, str]:
+    """{service: container name} for the base services, controller included."""
     prefix = get_domain_prefix()
-    registry = load_registry()
+    names = {svc: spec["container_name"] or f"{prefix}-{svc}" for svc, spec in get_base_services().items()}
+    names.setdefault("controller", f"{prefix}-controller")
+    return names
+
+
+def _get_base_service_names() -> set:
+    """Base service names, plus the controller itself."""
+    return set(get_base_container_names())
 
-    base_services = _get_base_service_names()
-    if name in base_services:
-        return f"{prefix}-{name}"
 
+def sanitize_container_name(name: str) -> str:
+    """Validate that a name resolves to a known container in our ecosystem."""
+    base_containers = get_base_container_names()
+    if name in base_containers:
+        return base_containers[name]
+
+    registry = project_context.registry
     if name in registry.get("instances", {}):
-        return registry["instances"][name].get("container_name", f"{prefix}-{name}")
+        return registry["instances"][name].get("container_name", f"{get_domain_prefix()}-{name}")
 
     raise HTTPException(404, f"Unknown service or instance: '{name}'")
 
@@ -272,6 +616,36 @@ def get_container_stats(container_name):
         return {"cpu_percent": 0, "mem_usage_mb": 0, "mem_limit_mb": 0, "mem_percent": 0}
 
 
+MIGRATION_DIRS = ("config/Migrations", "config/Seeds")
+
+
+def resolve_instance_source(source_path: str) -> Path:
+    """Map a registry source_path (project-relative or host-absolute) to a controller path."""
+    if source_path.startswith(HOST_PROJECT_ROOT + "/"):
+        return PROJECT_ROOT / source_path[len(HOST_PROJECT_ROOT) + 1:]
+    return PROJECT_ROOT / source_path
+
+
+def migrations_fingerprint(source_path: str) -> str | None:
+    """Hash an instance's migration and seed files (including plugins); None if it has none."""
+    root = resolve_instance_source(source_path)
+    dirs = [root / d for d in MIGRATION_DIRS]
+    dirs += [plugin / d for plugin in sorted(root.glob("plugins/*")) for d in MIGRATION_DIRS]
+    h = hashlib.sha256()
+    found = False
+    for base in dirs:
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for fname in sorted(filenames):
+                f = Path(dirpath) / fname
+                h.update(str(f.relative_to(root)).encode() + b"\0")
+                h.update(hashlib.sha256(f.read_bytes()).digest())
+                found = True
+    return h.hexdigest() if found else None
+
+
 def validate_source_path(source: str) -> str:
     """Resolve and validate source path stays within project root."""
     resolved = (PROJECT_ROOT / source).resolve()
@@ -0,0 +1,250 @@
+"""Persistent log index — tails every managed container into day-partitioned
+SQLite FTS5 files, so logs survive instance recreation and are searchable in one query.
+
+    log-index/2026-04-04.db    FTS5 table lines(line, source, ts), one file per UTC day
+    log-index/state.json       last indexed timestamp per source, to resume without gaps
+
+Retention drops whole day files, oldest first, once the total exceeds MAX_TOTAL_MB.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .helpers import PROJECT_ROOT, docker_client, get_base_container_names, load_registry
+from .logstream import docker_ts_to_epoch, iter_lines
+
+log = logging.getLogger("ssmd.logindex")
+
+INDEX_ENABLED = os.environ.get("LOG_INDEX", "0") == "1"
+MAX_TOTAL_MB = int(os.environ.get("LOG_INDEX_MAX_MB", "1024"))
+LOG_INDEX_DIR = PROJECT_ROOT / "log-index"
+STATE_FILE = LOG_INDEX_DIR / "state.json"
+
+DISCOVER_INTERVAL = 30  # seconds between scans for new / restarted containers
+WRITE_INTERVAL = 1.0  # seconds between batched inserts
+RETENTION_INTERVAL = 300  # seconds between size checks
+INITIAL_TAIL = 1000  # lines taken from a container the first time it is seen
+
+_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(line, source UNINDEXED, ts UNINDEXED)"
+
+
+def partitions() -> list[Path]:
+    """Day files, newest first."""
+    if not LOG_INDEX_DIR.exists():
+        return []
+    return sorted(LOG_INDEX_DIR.glob("????-??-??.db"), reverse=True)
+
+
+def _partition_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in (path, path.with_name(path.name + "-wal")) if p.exists())
+
+
+def index_stats() -> dict:
+    parts = partitions()
+    return {
+        "enabled": INDEX_ENABLED,
+        "partitions": [{"day": p.stem, "size_bytes": _partition_size(p)} for p in parts],
+        "total_bytes": sum(_partition_size(p) for p in parts),
+        "max_total_mb": MAX_TOTAL_MB,
+    }
+
+
+def search(q: str = "", source: str | None = None, since: str | None = None, until: str | None = None,
+           limit: int = 100) -> list[dict]:
+    """Newest-first matches across day partitions.
+
+    q is an FTS5 query (empty matches every line); since/until are Docker-style
+    timestamps. Partitions outside the window are never opened. Raises
+    sqlite3.OperationalError for a malformed query.
+    """
+    hits: list[dict] = []
+    for path in partitions():
+        day = path.stem
+        if until and day > until[:10]:
+            continue
+        if since and day < since[:10]:
+            break
+        where, params = [], []
+        if q:
+            where.append("lines MATCH ?")
+            params.append(q)
+        for clause, value in (("source = ?", source), ("ts >= ?", since), ("ts <= ?", until)):
+            if value:
+                where.append(clause)
+                params.append(value)
+        sql = "SELECT ts, source, line FROM lines"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rowid DESC LIMIT ?"
+        params.append(limit - len(hits))
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            hits.extend({"timestamp": ts, "source": src, "line": line}
+                        for ts, src, line in db.execute(sql, params))
+        finally:
+            db.close()
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+def enforce_retention() -> list[str]:
+    """Delete the oldest day files until the index fits MAX_TOTAL_MB; today's file is kept."""
+    parts = partitions()
+    total = sum(_partition_size(p) for p in parts)
+    removed = []
+    for path in reversed(parts[1:]):
+        if total <= MAX_TOTAL_MB * 1024 * 1024:
+            break
+        total -= _partition_size(path)
+        for f in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+            f.unlink(missing_ok=True)
+        removed.append(path.stem)
+    return removed
+
+
+class LogIndexer:
+    """One tailing thread per running managed container, one writer thread for SQLite."""
+
+    def __init__(self):
+        self._lines: queue.Queue = queue.Queue(maxsize=100_000)
+        self._tailers: dict[str, threading.Thread] = {}
+        self._streams: dict[str, object] = {}
+        self._stop = threading.Event()
+        try:
+            self._last_ts: dict[str, str] = json.loads(STATE_FILE.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._last_ts = {}
+        self._threads = [threading.Thread(target=self._discover, name="log-index-discover", daemon=True),
+                         threading.Thread(target=self._write, name="log-index-writer", daemon=True)]
+
+    def start(self):
+        LOG_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        """Stop tailing and flush what was already read."""
+        self._stop.set()
+        for stream in list(self._streams.values()):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self._threads[1].join(timeout=5)
+
+    def _targets(self) -> dict[str, str]:
+        """source label -> container name: base services, then instances."""
+        targets = {svc: name for svc, name in get_base_container_names().items() if svc != "controller"}
+        for name, inst in load_registry().get("instances", {}).items():
+            targets[name] = inst.get("container_name") or name
+        return targets
+
+    def _discover(self):
+        while not self._stop.is_set():
+            try:
+                for source, container_name in self._targets().items():
+                    tailer = self._tailers.get(source)
+                    if tailer is None or not tailer.is_alive():
+                        tailer = threading.Thread(target=self._tail, args=(source, container_name),
+                                                  name=f"log-index-{source}", daemon=True)
+                        self._tailers[source] = tailer
+                        tailer.start()
+            except Exception:
+                log.exception("Log index discovery failed")
+            self._stop.wait(DISCOVER_INTERVAL)
+
+    def _tail(self, source: str, container_name: str):
+        try:
+            container = docker_client.containers.get(container_name)
+            if container.status != "running":
+                return
+            last = self._last_ts.get(source)
+            # since has sub-second precision; lines at exactly `last` are skipped below
+            kwargs = {"since": docker_ts_to_epoch(last)} if last else {"tail": INITIAL_TAIL}
+            stream = container.logs(stream=True, follow=True, timestamps=True, **kwargs)
+        except Exception:
+            return
+        self._streams[source] = stream
+        try:
+            for line in iter_lines(stream):
+                ts, _, text = line.partition(" ")
+                if last and ts <= last:
+                    continue
+                while not self._stop.is_set():
+                    try:
+                        self._lines.put((ts, source, text), timeout=1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:  # container stopped or removed; discovery restarts us
+            log.debug("Stopped tailing %s: %s", source, e)
+        finally:
+            self._streams.pop(source, None)
+
+    def _write(self):
+        next_retention = time.monotonic()
+        while True:
+            stopping = self._stop.wait(WRITE_INTERVAL)
+            batch = []
+            while True:
+                try:
+                    batch.append(self._lines.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._insert(batch)
+                except Exception:
+                    log.exception("Writing %d log line(s) to the index failed", len(batch))
+            if time.monotonic() >= next_retention:
+                removed = enforce_retention()
+                if removed:
+                    log.info("Log index retention removed: %s", ", ".join(removed))
+                next_retention = time.monotonic() + RETENTION_INTERVAL
+            if stopping:
+                return
+
+    def _insert(self, batch: list[tuple[str, str, str]]):
+        batch.sort()
+        by_day: dict[str, list] = {}
+        for ts, source, text in batch:
+            by_day.setdefault(ts[:10], []).append((text, source, ts))
+            if ts > self._last_ts.get(source, ""):
+                self._last_ts[source] = ts
+        for day, rows in by_day.items():
+            db = sqlite3.connect(LOG_INDEX_DIR / f"{day}.db")
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(_SCHEMA)
+                with db:
+                    db.executemany("INSERT INTO lines (line, source, ts) VALUES (?, ?, ?)", rows)
+            finally:
+                db.close()
+        tmp = STATE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._last_ts))
+        os.replace(tmp, STATE_FILE)
+
+
+_indexer: LogIndexer | None = None
+
+
+def start_log_indexer():
+    global _indexer
+    if INDEX_ENABLED and _indexer is None:
+        _indexer = LogIndexer()
+        _indexer.start()
+        log.info("Log indexer started (%s, cap %d MB)", LOG_INDEX_DIR, MAX_TOTAL_MB)
+
+
+def stop_log_indexer():
+    global _indexer
+    if _indexer is not None:
+        _indexer.stop()
+        _indexer = None
@@ -0,0 +1,470 @@
+"""Container logs — line and timestamp helpers, and live streaming: one Docker
+follow-stream per container, read on a dedicated thread and fanned out to every
+WebSocket viewer in coalesced frames."""
+
+import asyncio
+import codecs
+import concurrent.futures
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, WebSocket
+
+log = logging.getLogger("ssmd.logstream")
+
+FLUSH_INTERVAL = int(os.environ.get("LOG_FLUSH_MS", "50")) / 1000  # max delay before a frame is sent
+FLUSH_BYTES = int(os.environ.get("LOG_FLUSH_BYTES", str(32 * 1024)))  # ...or as soon as this much is buffered
+QUEUE_CHUNKS = 1024  # chunks buffered per stream before the reader thread blocks
+RECENT_LINES = int(os.environ.get("LOG_RECENT_LINES", "100"))  # replayed to viewers who join late
+SUBSCRIBER_BACKLOG = 64  # batches queued per viewer before its lines are dropped
+
+_EOF = None
+
+
+# ─── Lines and timestamps ───────────────────────────────────────────────────
+
+def iter_lines(stream):
+    """Complete lines from a Docker log stream, whatever the chunking."""
+    pending = b""
+    for chunk in stream:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode(errors="replace")
+    if pending:
+        yield pending.decode(errors="replace")
+
+
+_RELATIVE_TIME_RE = re.compile(r"^(\d+)([smhd])$")
+_RELATIVE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_time(value: str, field: str) -> float:
+    """Unix time from an ISO 8601 timestamp (UTC unless it has an offset), epoch seconds, or '90m'/'2h'/'1d' ago."""
+    try:
+        if match := _RELATIVE_TIME_RE.match(value):
+            delta = timedelta(**{_RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+            return (datetime.now(timezone.utc) - delta).timestamp()
+        if re.fullmatch(r"\d+(\.\d+)?", value):
+            return float(value)
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+    except ValueError:
+        raise HTTPException(422, f"Invalid {field}: '{value}' (use ISO 8601, epoch seconds, or e.g. 30m, 2h, 1d)")
+
+
+def docker_ts_to_epoch(ts: str) -> float:
+    """Epoch seconds from Docker's RFC 3339 timestamp with nanoseconds (2026-04-04T12:00:00.123456789Z)."""
+    base, _, frac = ts.rstrip("Z").partition(".")
+    return datetime.fromisoformat(base).replace(tzinfo=timezone.utc).timestamp() + float(f"0.{frac or 0}")
+
+
+def epoch_to_docker_ts(epoch: float) -> str:
+    """Docker's timestamp format for an epoch time; compares correctly with real log timestamps as text."""
+    dt = datetime.fromtimestamp(epoch, timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond:06d}000Z"
+
+
+# ─── Live streaming ─────────────────────────────────────────────────────────
+
+class LogReader:
+    """Iterates a blocking Docker log stream on its own thread, pushing chunks into queue.
+
+    A full queue blocks the thread (and so the Docker stream) instead of
+    buffering without bound. _EOF is queued when the stream ends or fails.
+    """
+
+    def __init__(self, stream, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.stream, self.loop, self.queue = stream, loop, queue
+        self._stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="log-reader", daemon=True)
+        self.thread.start()
+
+    def _submit(self, item) -> concurrent.futures.Future | None:
+        """Schedule queue.put(item) on the loop; None once the loop has shut down."""
+        coro = self.queue.put(item)
+        try:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        except RuntimeError:  # loop closed
+            coro.close()
+            return None
+
+    def _put(self, item) -> bool:
+        future = self._submit(item)
+        if future is None:
+            return False
+        while not self._stopped.is_set():
+            try:
+                future.result(timeout=1)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def _run(self):
+        try:
+            for chunk in self.stream:
+                if not self._put(chunk):
+                    return
+        except Exception as e:  # stream closed under us, daemon went away, loop shut down
+            if not self._stopped.is_set():
+                log.debug("Log reader stopped: %s", e)
+        finally:
+            if not self._stopped.is_set():
+                self._submit(_EOF)
+
+    def stop(self):
+        """Close the Docker stream; the thread exits even if blocked on a full queue."""
+        self._stopped.set()
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+
+
+async def next_batch(queue: asyncio.Queue) -> tuple[bytes, bool]:
+    """Wait for data, then keep collecting for up to FLUSH_INTERVAL or FLUSH_BYTES.
+
+    Returns (data, ended); ended is True once the stream has finished.
+    """
+    chunk = await queue.get()
+    if chunk is _EOF:
+        return b"", True
+    parts, size = [chunk], len(chunk)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + FLUSH_INTERVAL
+    while size < FLUSH_BYTES:
+        try:
+            chunk = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+        if chunk is _EOF:
+            return b"".join(parts), True
+        parts.append(chunk)
+        size += len(chunk)
+    return b"".join(parts), False
+
+
+async def until_disconnect(websocket: WebSocket):
+    """Return once the client goes away (log sockets never expect client messages)."""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+class LineBuffer:
+    """Decodes one byte stream incrementally, so neither a UTF-8 character nor a
+    line split across chunks is broken apart."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+
+    def decode(self, data: bytes) -> str:
+        return self._decoder.decode(data)
+
+    def lines(self, data: bytes) -> list[str]:
+        """Lines completed by data, newline included; an unfinished last line waits for more."""
+        *lines, self._partial = (self._partial + self.decode(data)).split("\n")
+        return [line + "\n" for line in lines]
+
+    def flush(self) -> str:
+        """What is left once the stream has ended."""
+        tail, self._partial = self._partial + self._decoder.decode(b"", final=True), ""
+        return tail
+
+
+class LogSubscriber:
+    """One WebSocket's view of a channel: a bounded queue of batches.
+
+    A subscriber that falls behind loses batches rather than slowing the
+    channel down; the next batch it does get starts with a marker line. The
+    marker always stands on a line of its own, and the leftover tail of a
+    line cut by the drop is discarded with it.
+    """
+
+    def __init__(self, channel: "LogChannel"):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        self.dropped = 0
+        self._mid_line = False  # the last batch queued ended without a newline
+        self._dropped_mid_line = False  # the last batch dropped did
+
+    def offer(self, data: bytes | None):
+        if data is _EOF:
+            if self.queue.full():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_EOF)
+            return
+        if self.queue.full():
+            self.dropped += data.count(b"\n") or 1
+            self._dropped_mid_line = not data.endswith(b"\n")
+            return
+        if self.dropped:
+            if self._dropped_mid_line:  # data starts with the rest of a dropped line
+                cut = data.find(b"\n")
+                if cut < 0:
+                    return
+                data = data[cut + 1:]
+                self.dropped += 1
+            marker = f"--- {self.dropped} line(s) dropped: client too slow ---\n".encode()
+            data = (b"\n" if self._mid_line else b"") + marker + data
+            self.dropped = 0
+        self._mid_line = not data.endswith(b"\n")
+        self.queue.put_nowait(data)
+
+
+class LogChannel:
+    """One upstream Docker follow-stream, broadcast to every subscriber.
+
+    The stream is opened on a worker thread (Docker answers over HTTP); ready
+    resolves once it is open, or carries the error. The last RECENT_LINES
+    complete lines are kept so late joiners start with context.
+    """
+
+    def __init__(self, hub: "LogHub", key: str, open_stream):
+        self.hub, self.key = hub, key
+        self.subscribers: set[LogSubscriber] = set()
+        self.recent: deque[bytes] = deque(maxlen=RECENT_LINES)
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.ready.add_done_callback(lambda f: f.cancelled() or f.exception())  # waiters may all be gone
+        self._tail = b""  # unfinished last line, not yet in recent
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        self._reader: LogReader | None = None
+        self._closed = False
+        self._task = asyncio.create_task(self._run(open_stream))
+
+    def backlog(self) -> bytes:
+        """What a new subscriber is sent first: the recent lines plus any unfinished one."""
+        return b"".join(self.recent) + self._tail
+
+    async def _run(self, open_stream):
+        try:
+            stream = await asyncio.to_thread(open_stream, RECENT_LINES)
+        except Exception as e:
+            if not self.ready.done():
+                self.ready.set_exception(e)
+            self._finish()
+            return
+        if self._closed:  # the last viewer left while the stream was opening
+            try:
+                stream.close()
+            except Exception:
+                pass
+            return
+        self._reader = LogReader(stream, asyncio.get_running_loop(), self._queue)
+        self.ready.set_result(None)
+        try:
+            while True:
+                data, ended = await next_batch(self._queue)
+                if data:
+                    *lines, self._tail = (self._tail + data).split(b"\n")
+                    self.recent.extend(line + b"\n" for line in lines)
+                    for sub in list(self.subscribers):
+                        sub.offer(data)
+                if ended:
+                    break
+        finally:
+            self._finish()
+
+    def _finish(self):
+        self.close()
+        for sub in list(self.subscribers):
+            sub.offer(_EOF)
+
+    def close(self):
+        """Stop the upstream stream and forget the channel."""
+        self._closed = True
+        if self.hub._channels.get(self.key) is self:
+            del self.hub._channels[self.key]
+        if not self.ready.done():
+            self.ready.cancel()
+        if self._reader is not None:
+            self._reader.stop()
+            if self._task is not asyncio.current_task():
+                self._task.cancel()
+
+
+class LogHub:
+    """Shares one Docker log stream per container among all WebSocket viewers."""
+
+    def __init__(self):
+        self._channels: dict[str, LogChannel] = {}
+
+    async def subscribe(self, container_name: str, open_stream) -> LogSubscriber:
+        """Join the container's channel, opening it with open_stream(tail) if needed.
+
+        open_stream runs on a worker thread; concurrent first viewers share one
+        open, and each of them gets its error if it fails.
+        """
+        channel = self._channels.get(container_name)
+        if channel is None:
+            channel = LogChannel(self, container_name, open_stream)
+            self._channels[container_name] = channel
+        sub = LogSubscriber(channel)
+        backlog = channel.backlog()
+        if backlog:
+            sub.offer(backlog)
+        channel.subscribers.add(sub)  # joined before the open completes, so the channel is never orphaned
+        try:
+            await asyncio.shield(channel.ready)
+        except BaseException:
+            self.unsubscribe(sub)
+            raise
+        return sub
+
+    def unsubscribe(self, sub: LogSubscriber):
+        """Leave; the upstream stream is torn down when the last viewer goes."""
+        channel = sub.channel
+        channel.subscribers.discard(sub)
+        if not channel.subscribers:
+            channel.close()
+
+    def stats(self) -> dict[str, int]:
+        """Subscribers per open channel."""
+        return {key: len(ch.subscribers) for key, ch in self._channels.items()}
+
+
+log_hub = LogHub()
+
+
+class LineFilter:
+    """Server-side include (grep) / exclude regexes, applied to each line's text."""
+
+    def __init__(self, grep: str | None = None, exclude: str | None = None):
+        self.grep = re.compile(grep) if grep else None  # re.error on a bad pattern
+        self.exclude = re.compile(exclude) if exclude else None
+
+    def __bool__(self):
+        return bool(self.grep or self.exclude)
+
+    def keep(self, line: str) -> bool:
+        return (not self.grep or bool(self.grep.search(line))) and \
+            not (self.exclude and self.exclude.search(line))
+
+
+async def _serve(websocket: WebSocket, forward, cleanup):
+    """Run forward() until it finishes or the client disconnects, then cleanup()."""
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(until_disconnect(websocket))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # surface send errors
+    finally:
+        for task in tasks:
+            task.cancel()
+        cleanup()
+
+
+async def pump_logs(websocket: WebSocket, container_name: str, open_stream, line_filter: LineFilter | None = None):
+    """Follow a container's logs through the hub, one text frame per batch.
+
+    Returns when the stream ends or the client disconnects, whichever is first.
+    """
+    sub = await log_hub.subscribe(container_name, open_stream)
+    buffer = LineBuffer()
+
+    async def forward():
+        while True:
+            parts = [await sub.queue.get()]
+            while parts[-1] is not _EOF and not sub.queue.empty():
+                parts.append(sub.queue.get_nowait())
+            ended = parts[-1] is _EOF
+            data = b"".join(parts[:-1] if ended else parts)
+            if line_filter:  # only whole lines can be matched
+                lines = buffer.lines(data)
+                if ended and (tail := buffer.flush()):
+                    lines.append(tail)
+                text = "".join(line for line in lines if line_filter.keep(line))
+            else:
+                text = buffer.decode(data) + (buffer.flush() if ended else "")
+            if text:
+                await websocket.send_text(text)
+            if ended:
+                return
+
+    await _serve(websocket, forward, lambda: log_hub.unsubscribe(sub))
+
+
+async def pump_merged(websocket: WebSocket, sources: dict[str, tuple[str, object]],
+                      line_filter: LineFilter | None = None):
+    """Follow several containers on one socket, lines tagged with their source.
+
+    sources maps label -> (hub key, open_stream); the streams must carry
+    Docker timestamps. Lines gathered within one FLUSH_INTERVAL window are
+    sent in timestamp order as '<label> | <timestamp> <line>'.
+    """
+    # Bounded, so a slow client backs up into each subscriber's queue, where
+    # LogSubscriber.offer drops batches, instead of buffering here without limit
+    merged: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG * len(sources))
+    results = await asyncio.gather(
+        *(log_hub.subscribe(key, open_stream) for key, open_stream in sources.values()),
+        return_exceptions=True,
+    )
+    subs = dict(zip(sources, results))
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        for sub in results:
+            if isinstance(sub, LogSubscriber):
+                log_hub.unsubscribe(sub)
+        raise failed[0]
+    width = max(map(len, subs))
+
+    async def relay(label: str, sub: LogSubscriber):
+        while True:
+            item = await sub.queue.get()
+            await merged.put((label, item))
+            if item is _EOF:
+                return
+
+    async def forward():
+        relays = [asyncio.create_task(relay(label, sub)) for label, sub in subs.items()]
+        active = len(relays)
+        loop = asyncio.get_running_loop()
+        buffers = {label: LineBuffer() for label in subs}  # a batch may end mid-line or mid-character
+        try:
+            while active:
+                lines = []
+                item = await merged.get()
+                deadline = loop.time() + FLUSH_INTERVAL
+                while True:
+                    label, data = item
+                    if data is _EOF:
+                        active -= 1
+                        tail = buffers[label].flush()
+                        chunks = [tail + "\n"] if tail else []
+                    else:
+                        chunks = buffers[label].lines(data)
+                    for line in chunks:
+                        ts, _, msg = line.partition(" ")
+                        if not line_filter or line_filter.keep(msg):
+                            lines.append((ts, label, msg))
+                    remaining = deadline - loop.time()
+                    if not active or remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(merged.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if lines:
+                    lines.sort(key=lambda entry: entry[0])  # RFC 3339 with fixed nanoseconds sorts as text
+                    await websocket.send_text("".join(f"{label:<{width}} | {ts} {msg}" for ts, label, msg in lines))
+        finally:
+            for task in relays:
+                task.cancel()
+
+    def cleanup():
+        for sub in subs.values():
+            log_hub.unsubscribe(sub)
+
+    await _serve(websocket, forward, cleanup)
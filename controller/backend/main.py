@@ -3,7 +3,9 @@ ssmd Controller — FastAPI Backend
 Manages dynamic V4/selfhosted instances, container status, logs, and web terminal.
 """
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -11,9 +13,27 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from .routes import instances, database, monitoring, websockets
+from .logindex import start_log_indexer, stop_log_indexer
+from .retention import PRUNE_INTERVAL, snapshot_pruner
+from .routing import flush_route_publish
+from .routes import instances, database, monitoring, traefik, websockets
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if PRUNE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(snapshot_pruner()))
+    start_log_indexer()
+    yield
+    for task in tasks:
+        task.cancel()
+    stop_log_indexer()
+    flush_route_publish()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="ssmd",
     version="1.0.0",
     description="ssmd — Spawn, Scope, Migrate, Destroy. Manages dynamic isolated instances — containers, databases, routing, and git worktrees.",
@@ -27,8 +47,9 @@ allowed_origins = [f"https://control.{domain}", f"http://control.{domain}"] if d
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
-    allow_methods=["GET", "POST", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", "Range", "If-Range", "X-Content-SHA256"],
+    expose_headers=["Content-Range", "Accept-Ranges", "ETag", "X-Content-SHA256"],
 )
 
 # ─── Include Routers ─────────────────────────────────────────────────────────
@@ -36,6 +57,7 @@ app.add_middleware(
 app.include_router(instances.router)
 app.include_router(database.router)
 app.include_router(monitoring.router)
+app.include_router(traefik.router)
 app.include_router(websockets.router)
 
 # ─── Serve Frontend ──────────────────────────────────────────────────────────
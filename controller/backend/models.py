@@ -75,6 +75,20 @@ class CreateInstanceRequest(BaseModel):
         return v
 
 
+class SnapshotPolicyRequest(BaseModel):
+    keep_last: Optional[int] = None
+    keep_daily: Optional[int] = None
+    keep_weekly: Optional[int] = None
+    max_total_mb: Optional[int] = None
+
+    @field_validator("keep_last", "keep_daily", "keep_weekly", "max_total_mb")
+    @classmethod
+    def validate_positive(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("Retention values must be positive (omit a field to leave it unset)")
+        return v
+
+
 # ─── Response Models ─────────────────────────────────────────────────────────
 
 class ContainerStatusInfo(BaseModel):
@@ -97,8 +111,8 @@ class InstanceInfo(BaseModel):
     url: str
     db_name: str
     container_name: str
-    container_status: str
-    container_health: str
+    container_status: Optional[str] = None  # None unless requested (single-instance lookup)
+    container_health: Optional[str] = None
     created_at: str
     source_path: str
     branch: str
@@ -119,6 +133,7 @@ class CreateInstanceResponse(BaseModel):
 class DbSetupResponse(BaseModel):
     migrations: str
     seeds: str
+    skipped: bool = False
 
 class DbSnapshotResponse(BaseModel):
     message: str
@@ -130,10 +145,32 @@ class SnapshotInfo(BaseModel):
     path: str
     size_kb: int
     created: str
+    instance: str = ""
+    profile: str = "full"
+    sha256: str = ""
 
 class SnapshotListResponse(BaseModel):
     snapshots: list[SnapshotInfo]
 
+class SnapshotProfile(BaseModel):
+    name: str
+    description: str
+    pg_dump_args: list[str]
+
+class SnapshotProfileListResponse(BaseModel):
+    profiles: list[SnapshotProfile]
+
+class SnapshotPolicy(SnapshotPolicyRequest):
+    scope: str
+
+class SnapshotPolicyListResponse(BaseModel):
+    policies: list[SnapshotPolicy]
+
+class SnapshotPruneResponse(BaseModel):
+    dry_run: bool
+    removed: list[SnapshotInfo]
+    freed_kb: int
+
 class ContainerStatsResponse(BaseModel):
     cpu_percent: float
     mem_usage_mb: float
@@ -144,3 +181,22 @@ class LogsResponse(BaseModel):
     lines: list[str]
     container_name: str
     tail: int
+
+class LogLine(BaseModel):
+    timestamp: str
+    line: str
+
+class LogSearchResponse(BaseModel):
+    lines: list[LogLine]
+    container_name: str
+    scanned: int
+    next_cursor: Optional[str] = None
+
+class IndexedLogLine(BaseModel):
+    timestamp: str
+    source: str
+    line: str
+
+class LogIndexSearchResponse(BaseModel):
+    hits: list[IndexedLogLine]
+    took_ms: float
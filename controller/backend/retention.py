@@ -0,0 +1,173 @@
+"""Snapshot catalog and retention — naming, catalog sync, prune planning, background pruner."""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime
+
+from .helpers import (
+    DEFAULT_SNAPSHOT_PROFILE, GLOBAL_POLICY_SCOPE, PROJECT_ROOT, SNAPSHOTS_DIR,
+    load_registry, load_snapshot_catalog, record_snapshot, forget_snapshots,
+    load_snapshot_policies,
+)
+
+log = logging.getLogger("ssmd.retention")
+
+PRUNE_INTERVAL = int(os.environ.get("SNAPSHOT_PRUNE_INTERVAL", "3600"))  # seconds, 0 = off
+
+_SNAPSHOT_NAME_RE = re.compile(
+    r"^(?P<db_name>.+)_(?P<timestamp>\d{8}_\d{6})(?:_(?P<profile>[a-z0-9-]+))?\.sql\.gz$"
+)
+SNAPSHOT_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def snapshot_filename(db_name: str, timestamp: str, profile: str) -> str:
+    suffix = "" if profile == DEFAULT_SNAPSHOT_PROFILE else f"_{profile}"
+    return f"{db_name}_{timestamp}{suffix}.sql.gz"
+
+
+def snapshot_created_at(path) -> str:
+    """When the dump was taken: the _YYYYMMDD_HHMMSS part of its name, else the file's mtime.
+
+    Uploaded or copied-in snapshots have a fresh mtime; trusting it would make
+    an old dump look like the newest one to the retention rules.
+    """
+    match = _SNAPSHOT_NAME_RE.match(path.name)
+    if match:
+        try:
+            return datetime.strptime(match.group("timestamp"), SNAPSHOT_TIMESTAMP_FORMAT) \
+                .isoformat(timespec="seconds")
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec="seconds")
+
+
+def catalog_snapshot(path, instance: str, db_name: str, profile: str = DEFAULT_SNAPSHOT_PROFILE,
+                     sha256: str = ""):
+    """Record a snapshot written under snapshots/ in the catalog."""
+    record_snapshot(
+        f"snapshots/{path.name}", instance, db_name, path.stat().st_size,
+        snapshot_created_at(path), profile, sha256,
+    )
+
+
+def catalog_inferred(path, db_to_instance: dict[str, str] | None = None, sha256: str = ""):
+    """Catalog a snapshot that arrived from outside, inferring instance and profile from its name."""
+    if db_to_instance is None:
+        db_to_instance = {inst["db_name"]: name
+                          for name, inst in load_registry().get("instances", {}).items()}
+    match = _SNAPSHOT_NAME_RE.match(path.name)
+    db_name = match.group("db_name") if match else ""
+    profile = (match.group("profile") if match else None) or DEFAULT_SNAPSHOT_PROFILE
+    catalog_snapshot(path, db_to_instance.get(db_name, ""), db_name, profile, sha256)
+
+
+def sync_catalog() -> list[dict]:
+    """Reconcile the catalog with snapshots/ and return the current entries."""
+    catalog = {e["path"]: e for e in load_snapshot_catalog()}
+    on_disk = {f"snapshots/{f.name}": f for f in SNAPSHOTS_DIR.glob("*.sql.gz")} \
+        if SNAPSHOTS_DIR.exists() else {}
+
+    gone = [p for p in catalog if p not in on_disk]
+    if gone:
+        forget_snapshots(gone)
+
+    new = [p for p in on_disk if p not in catalog]
+    if new:
+        db_to_instance = {inst["db_name"]: name
+                          for name, inst in load_registry().get("instances", {}).items()}
+        for rel in new:
+            catalog_inferred(on_disk[rel], db_to_instance)
+
+    return load_snapshot_catalog() if (gone or new) else list(catalog.values())
+
+
+def _group_key(entry: dict) -> str:
+    return entry.get("instance") or entry.get("db_name") or entry["path"]
+
+
+def _apply_cap(entries: list[dict], cap_mb) -> tuple[list[dict], list[dict]]:
+    """Split newest-first entries so the kept total fits cap_mb (newest always kept)."""
+    if not cap_mb:
+        return entries, []
+    limit = cap_mb * 1024 * 1024
+    total = 0
+    for i, e in enumerate(entries):
+        total += e.get("size_bytes", 0)
+        if total > limit and i > 0:
+            return entries[:i], entries[i:]
+    return entries, []
+
+
+def plan_prune(entries: list[dict], policies: dict[str, dict]) -> list[dict]:
+    """Return the catalog entries that the retention policies would remove.
+
+    Keep rules resolve per instance with field-by-field fallback to the global
+    policy; max_total_mb caps the instance (own policy) or everything (global).
+    lib/snapshots.py has the CLI's copy; tests/test_retention.py keeps them in step.
+    """
+    global_policy = policies.get(GLOBAL_POLICY_SCOPE, {})
+    groups: dict[str, list[dict]] = {}
+    for e in entries:
+        groups.setdefault(_group_key(e), []).append(e)
+
+    kept, pruned = [], []
+    for key, group in groups.items():
+        group = sorted(group, key=lambda e: e.get("created_at", ""), reverse=True)
+        own = policies.get(key, {})
+        rules = {f: own.get(f) if own.get(f) is not None else global_policy.get(f)
+                 for f in ("keep_last", "keep_daily", "keep_weekly")}
+
+        if any(rules.values()):
+            keep = set()
+            if rules["keep_last"]:
+                keep.update(e["path"] for e in group[:rules["keep_last"]])
+            for field, bucket in (("keep_daily", lambda d: d.date()),
+                                  ("keep_weekly", lambda d: d.isocalendar()[:2])):
+                if not rules[field]:
+                    continue
+                seen = set()
+                for e in group:
+                    b = bucket(datetime.fromisoformat(e["created_at"]))
+                    if b not in seen:
+                        if len(seen) >= rules[field]:
+                            break
+                        seen.add(b)
+                        keep.add(e["path"])
+            group_kept = [e for e in group if e["path"] in keep]
+            pruned.extend(e for e in group if e["path"] not in keep)
+        else:
+            group_kept = group
+
+        group_kept, dropped = _apply_cap(group_kept, own.get("max_total_mb"))
+        kept.extend(group_kept)
+        pruned.extend(dropped)
+
+    kept.sort(key=lambda e: e.get("created_at", ""), reverse=True)
+    _, dropped = _apply_cap(kept, global_policy.get("max_total_mb"))
+    pruned.extend(dropped)
+    return pruned
+
+
+def prune_snapshots(dry_run: bool = False) -> list[dict]:
+    """Apply retention policies to snapshots/ and return the entries removed."""
+    victims = plan_prune(sync_catalog(), load_snapshot_policies())
+    if dry_run or not victims:
+        return victims
+    for e in victims:
+        (PROJECT_ROOT / e["path"]).unlink(missing_ok=True)
+    forget_snapshots([e["path"] for e in victims])
+    return victims
+
+
+async def snapshot_pruner():
+    """Background task: prune snapshots every PRUNE_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL)
+        try:
+            victims = await asyncio.to_thread(prune_snapshots)
+            if victims:
+                log.info("Pruned %d snapshot(s): %s", len(victims), ", ".join(e["path"] for e in victims))
+        except Exception:
+            log.exception("Snapshot pruning failed")
@@ -1,68 +1,198 @@
 """Database routes — migrations, snapshots, restore."""
 
+import asyncio
 import gzip
+import hashlib
 import io
+import json
+import os
+import queue
+import re
 import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import formatdate
+from pathlib import Path
 
 import docker
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from ..helpers import (
-    PROJECT_ROOT, docker_client,
-    get_domain_prefix, load_registry,
+    GLOBAL_POLICY_SCOPE, PROJECT_ROOT, SNAPSHOTS_DIR, docker_client,
+    get_domain_prefix, load_registry, migrations_fingerprint, set_migrations_fingerprint,
     safe_sql_identifier, sanitize_container_name,
+    load_snapshot_policies, save_snapshot_policy, delete_snapshot_policy,
+    load_snapshot_catalog, load_snapshot_profiles,
 )
 from ..auth import verify_credentials
 from ..models import (
     DbSetupResponse, DbSnapshotResponse,
-    MessageResponse, SnapshotListResponse,
+    MessageResponse, SnapshotInfo, SnapshotListResponse,
+    SnapshotPolicy, SnapshotPolicyListResponse, SnapshotPolicyRequest,
+    SnapshotProfileListResponse, SnapshotPruneResponse,
+)
+from ..retention import (
+    catalog_inferred, catalog_snapshot, prune_snapshots, snapshot_filename, sync_catalog,
 )
 
 router = APIRouter(prefix="/api", tags=["database"])
 
 
+def _is_unchanged(inst: dict, fingerprint: str | None) -> bool:
+    return bool(fingerprint) and inst.get("migrations_fingerprint") == fingerprint
+
+
 @router.post("/instances/{name}/db-setup", response_model=DbSetupResponse, summary="Run migrations and seeds")
-def api_db_setup(name: str, skip_seed: bool = Query(False), user: str = Depends(verify_credentials)):
+def api_db_setup(
+    name: str,
+    skip_seed: bool = Query(False),
+    force: bool = Query(False, description="Run even if migrations and seeds are unchanged"),
+    user: str = Depends(verify_credentials),
+):
+    """No-op (`skipped: true`) when the instance's migration and seed files match
+    the fingerprint recorded by the last full setup, unless `force` is set."""
     registry = load_registry()
     if name not in registry.get("instances", {}):
         raise HTTPException(404, f"Instance '{name}' not found")
+    inst = registry["instances"][name]
+    fingerprint = migrations_fingerprint(inst.get("source_path", ""))
+    if not force and _is_unchanged(inst, fingerprint):
+        return {"migrations": "", "seeds": "", "skipped": True}
     container_name = sanitize_container_name(name)
     try:
         container = docker_client.containers.get(container_name)
     except docker.errors.NotFound:
         raise HTTPException(404, f"Container '{container_name}' not running")
-    exit_code, output = container.exec_run("php bin/cake.php migrations migrate", demux=True)
+    migrate_code, output = container.exec_run("php bin/cake.php migrations migrate", demux=True)
     migrate_out = (output[0] or b"").decode() + (output[1] or b"").decode()
     seed_out = ""
-    if not skip_seed:
-        exit_code, output = container.exec_run("php bin/cake.php migrations seed", demux=True)
+    if not skip_seed and migrate_code == 0:
+        seed_code, output = container.exec_run("php bin/cake.php migrations seed", demux=True)
         seed_out = (output[0] or b"").decode() + (output[1] or b"").decode()
+        if seed_code == 0 and fingerprint:
+            set_migrations_fingerprint(name, fingerprint)
     return {"migrations": migrate_out, "seeds": seed_out}
 
 
+def _exec_streaming(container_name: str, cmd: list[str], on_line) -> int:
+    """Run a command in a container, passing each output line to on_line. Returns the exit code."""
+    exec_id = docker_client.api.exec_create(container_name, cmd)
+    buf = b""
+    for chunk in docker_client.api.exec_start(exec_id, stream=True):
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            on_line(line.decode(errors="replace"))
+    if buf:
+        on_line(buf.decode(errors="replace"))
+    return docker_client.api.exec_inspect(exec_id)["ExitCode"]
+
+
+def _db_setup_one(name: str, container_name: str, skip_seed: bool, on_line,
+                  fingerprint: str | None = None) -> dict:
+    started = time.monotonic()
+    result = {"name": name, "migrations": "failed", "seeds": "skipped", "duration": 0.0}
+    try:
+        if _exec_streaming(container_name, ["php", "bin/cake.php", "migrations", "migrate"], on_line) == 0:
+            result["migrations"] = "ok"
+            if not skip_seed:
+                code = _exec_streaming(container_name, ["php", "bin/cake.php", "migrations", "seed"], on_line)
+                result["seeds"] = "ok" if code == 0 else "warning"
+                if code == 0 and fingerprint:
+                    set_migrations_fingerprint(name, fingerprint)
+    except docker.errors.APIError as e:
+        on_line(f"Docker error: {e.explanation or e}")
+    result["duration"] = round(time.monotonic() - started, 2)
+    return result
+
+
+@router.post("/instances/db-setup", summary="Run migrations and seeds across all instances")
+def api_fleet_db_setup(
+    type: str | None = Query(None, pattern="^(v4|selfhosted)$", description="Only instances of this type"),
+    parallel: int = Query(4, ge=1, le=16, description="Max instances migrated concurrently"),
+    skip_seed: bool = Query(False),
+    force: bool = Query(False, description="Include instances whose migrations are unchanged"),
+    user: str = Depends(verify_credentials),
+):
+    """Streams NDJSON: one `{"instance", "line"}` object per output line as instances
+    progress, then a final `{"summary": [...], "skipped": [...], "unchanged": [...]}`
+    object with per-instance status and duration. Stopped instances are skipped, and
+    so are instances whose migration fingerprint is unchanged unless `force` is set."""
+    instances = {
+        name: inst for name, inst in load_registry().get("instances", {}).items()
+        if not type or inst["type"] == type
+    }
+    running = sorted(n for n, inst in instances.items() if inst.get("status", "running") == "running")
+    skipped = sorted(set(instances) - set(running))
+    fingerprints = {n: migrations_fingerprint(instances[n].get("source_path", "")) for n in running}
+    unchanged = [] if force else [n for n in running if _is_unchanged(instances[n], fingerprints[n])]
+    targets = [n for n in running if n not in unchanged]
+    prefix = get_domain_prefix()
+    events: queue.Queue = queue.Queue()
+
+    def run(name: str) -> dict:
+        def on_line(line: str):
+            events.put({"instance": name, "line": line})
+        try:
+            container_name = instances[name].get("container_name", f"{prefix}-{name}")
+            return _db_setup_one(name, container_name, skip_seed, on_line, fingerprints[name])
+        except Exception as e:  # one broken instance must not cost the others their summary
+            on_line(f"Error: {e!r}")
+            return {"name": name, "migrations": "failed", "seeds": "skipped", "duration": 0.0}
+
+    def drive():
+        try:
+            with ThreadPoolExecutor(max_workers=parallel) as pool:
+                results = list(pool.map(run, targets))
+            events.put({"summary": results, "skipped": skipped, "unchanged": unchanged})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=drive, daemon=True).start()
+
+    def stream():
+        while (event := events.get()) is not None:
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/instances/{name}/db-snapshot", response_model=DbSnapshotResponse, summary="Snapshot database")
-def api_db_snapshot(name: str, user: str = Depends(verify_credentials)):
+def api_db_snapshot(
+    name: str,
+    profile: str = Query("full", description="Snapshot profile from config/snapshot-profiles.conf"),
+    user: str = Depends(verify_credentials),
+):
     registry = load_registry()
     if name not in registry.get("instances", {}):
         raise HTTPException(404, f"Instance '{name}' not found")
+    profiles = load_snapshot_profiles()
+    if profile not in profiles:
+        raise HTTPException(400, f"Unknown snapshot profile '{profile}'. Available: {', '.join(profiles)}")
     inst = registry["instances"][name]
     db_name = safe_sql_identifier(inst.get("db_name", ""))
     db_user = inst.get("db_user", "postgres")
     prefix = get_domain_prefix()
     pg_container = f"{prefix}-postgres16"
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = PROJECT_ROOT / "snapshots" / f"{db_name}_{timestamp}.sql.gz"
+    output_file = PROJECT_ROOT / "snapshots" / snapshot_filename(db_name, timestamp, profile)
     output_file.parent.mkdir(parents=True, exist_ok=True)
     try:
         pg = docker_client.containers.get(pg_container)
         exit_code, output = pg.exec_run(
-            f"pg_dump -U {db_user} --no-owner --no-acl {db_name}", demux=True
+            ["pg_dump", "-U", db_user, "--no-owner", "--no-acl",
+             *profiles[profile]["pg_dump_args"], db_name],
+            demux=True,
         )
         if exit_code != 0:
             raise HTTPException(500, f"pg_dump failed: {(output[1] or b'').decode()}")
         with open(output_file, "wb") as f:
             f.write(gzip.compress(output[0]))
+        catalog_snapshot(output_file, name, db_name, profile)
         return {
             "message": "Snapshot created",
             "file": f"snapshots/{output_file.name}",
@@ -101,6 +231,8 @@ def api_db_restore(name: str, snapshot: str = Query(...), user: str = Depends(ve
             f"psql -U {db_user} -d {db_name} -f /tmp/restore.sql", demux=True
         )
         pg.exec_run("rm -f /tmp/restore.sql")
+        # The schema is now whatever the snapshot had, so the next db-setup must run
+        set_migrations_fingerprint(name, "")
         if exit_code != 0:
             stderr = (output[1] or b"").decode()[:500]
             raise HTTPException(500, f"Restore failed: {stderr}")
@@ -109,14 +241,198 @@ def api_db_restore(name: str, snapshot: str = Query(...), user: str = Depends(ve
         raise HTTPException(404, "PostgreSQL container not found")
 
 
+def _snapshot_info(entry: dict) -> dict:
+    return {
+        "name": entry["path"].rsplit("/", 1)[-1], "path": entry["path"],
+        "size_kb": entry["size_bytes"] // 1024, "created": entry["created_at"],
+        "instance": entry["instance"], "profile": entry["profile"], "sha256": entry["sha256"],
+    }
+
+
 @router.get("/snapshots", response_model=SnapshotListResponse, summary="List database snapshots")
 def api_list_snapshots(user: str = Depends(verify_credentials)):
-    snapshots_dir = PROJECT_ROOT / "snapshots"
-    if not snapshots_dir.exists():
-        return {"snapshots": []}
-    files = sorted(snapshots_dir.glob("*.sql.gz"), key=lambda p: p.stat().st_mtime, reverse=True)
-    return {"snapshots": [
-        {"name": f.name, "path": f"snapshots/{f.name}", "size_kb": f.stat().st_size // 1024,
-         "created": datetime.fromtimestamp(f.stat().st_mtime).isoformat()}
-        for f in files
+    return {"snapshots": [_snapshot_info(e) for e in sync_catalog()]}
+
+
+@router.get("/snapshots/profiles", response_model=SnapshotProfileListResponse, summary="List snapshot profiles")
+def api_list_snapshot_profiles(user: str = Depends(verify_credentials)):
+    """Profiles come from config/snapshot-profiles.conf; `full` is always available."""
+    return {"profiles": [
+        {"name": name, **profile} for name, profile in load_snapshot_profiles().items()
     ]}
+
+
+@router.get("/snapshots/policies", response_model=SnapshotPolicyListResponse, summary="List snapshot retention policies")
+def api_list_snapshot_policies(user: str = Depends(verify_credentials)):
+    """Scope `*` is the global policy; any other scope is an instance name."""
+    return {"policies": [{"scope": scope, **policy} for scope, policy in sorted(load_snapshot_policies().items())]}
+
+
+@router.put("/snapshots/policies", response_model=SnapshotPolicy, summary="Set a snapshot retention policy")
+def api_set_snapshot_policy(
+    req: SnapshotPolicyRequest,
+    instance: str | None = Query(None, description="Instance name; omit for the global policy"),
+    user: str = Depends(verify_credentials),
+):
+    if instance and instance not in load_registry().get("instances", {}):
+        raise HTTPException(404, f"Instance '{instance}' not found")
+    scope = instance or GLOBAL_POLICY_SCOPE
+    policy = req.model_dump()
+    save_snapshot_policy(scope, policy)
+    return {"scope": scope, **policy}
+
+
+@router.delete("/snapshots/policies", response_model=MessageResponse, summary="Remove a snapshot retention policy")
+def api_delete_snapshot_policy(
+    instance: str | None = Query(None, description="Instance name; omit for the global policy"),
+    user: str = Depends(verify_credentials),
+):
+    delete_snapshot_policy(instance or GLOBAL_POLICY_SCOPE)
+    return {"message": f"Retention policy removed for {instance or 'global scope'}"}
+
+
+@router.post("/snapshots/prune", response_model=SnapshotPruneResponse, summary="Apply snapshot retention policies")
+def api_prune_snapshots(dry_run: bool = Query(False), user: str = Depends(verify_credentials)):
+    victims = prune_snapshots(dry_run=dry_run)
+    return {
+        "dry_run": dry_run,
+        "removed": [_snapshot_info(e) for e in victims],
+        "freed_kb": sum(e["size_bytes"] for e in victims) // 1024,
+    }
+
+
+# ─── Snapshot transfer ──────────────────────────────────────────────────────
+# Registered after the fixed /snapshots/* paths above: PUT /snapshots/{name}
+# would otherwise swallow PUT /snapshots/policies.
+
+SNAPSHOT_FILE_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*\.sql\.gz$")
+TRANSFER_CHUNK = 1024 * 1024
+
+
+def _snapshot_file(name: str):
+    if not SNAPSHOT_FILE_PATTERN.match(name):
+        raise HTTPException(400, "Snapshot name must look like <name>.sql.gz")
+    return SNAPSHOTS_DIR / name
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None for anything we don't serve partially (other units, multiple
+    ranges, malformed or inverted specs) so the caller falls back to the full
+    file; only a range starting past the end is unsatisfiable (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                return None
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None  # last-byte-pos before first-byte-pos: invalid, so ignored
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _iter_file(path, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(TRANSFER_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _write_chunk(f, digest, data: bytes):
+    digest.update(data)
+    f.write(data)
+
+
+@router.api_route("/snapshots/{name}/content", methods=["GET", "HEAD"], summary="Download a snapshot")
+def api_download_snapshot(name: str, request: Request, user: str = Depends(verify_credentials)):
+    """Streams the file from disk in 1 MiB chunks. Supports single `Range` requests
+    (206 / 416) and `If-Range` against the ETag, so interrupted downloads can resume.
+    `X-Content-SHA256` is sent when the checksum is known (uploaded snapshots)."""
+    path = _snapshot_file(name)
+    if not path.is_file():
+        raise HTTPException(404, f"Snapshot '{name}' not found")
+    st = path.stat()
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Content-Disposition": f'attachment; filename="{name}"',
+    }
+    entry = next((e for e in load_snapshot_catalog() if e["path"] == f"snapshots/{name}"), None)
+    if entry and entry["sha256"]:
+        headers["X-Content-SHA256"] = entry["sha256"]
+
+    start, end, status = 0, st.st_size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, st.st_size)
+        if byte_range:
+            start, end = byte_range
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file(path, start, end - start + 1),
+        status_code=status, media_type="application/gzip", headers=headers,
+    )
+
+
+@router.put("/snapshots/{name}", response_model=SnapshotInfo, summary="Upload a snapshot")
+async def api_upload_snapshot(
+    name: str,
+    request: Request,
+    overwrite: bool = Query(False),
+    x_content_sha256: str | None = Header(None, description="Expected SHA-256 of the body; verified before the file is kept"),
+    user: str = Depends(verify_credentials),
+):
+    """Streams the request body to snapshots/ without buffering it in memory. The
+    file is written under a temporary name, hashed as it arrives, and only renamed
+    into place (and catalogued) once the optional checksum matches."""
+    path = _snapshot_file(name)
+    if path.exists() and not overwrite:
+        raise HTTPException(409, f"Snapshot '{name}' already exists (use overwrite=true)")
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    # a temp file per request, so concurrent uploads of one name never share it
+    f = tempfile.NamedTemporaryFile(dir=SNAPSHOTS_DIR, prefix=f".{name}.", suffix=".part", delete=False)
+    tmp = Path(f.name)
+    digest = hashlib.sha256()
+    try:
+        with f:
+            buf = bytearray()
+            async for chunk in request.stream():
+                buf += chunk
+                if len(buf) >= TRANSFER_CHUNK:
+                    await asyncio.to_thread(_write_chunk, f, digest, bytes(buf))
+                    buf.clear()
+            if buf:
+                await asyncio.to_thread(_write_chunk, f, digest, bytes(buf))
+        actual = digest.hexdigest()
+        if x_content_sha256 and x_content_sha256.strip().lower() != actual:
+            raise HTTPException(422, f"Checksum mismatch: expected {x_content_sha256}, got {actual}")
+        os.chmod(tmp, 0o644)  # NamedTemporaryFile creates it 0600
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    catalog_inferred(path, sha256=actual)
+    entry = next(e for e in load_snapshot_catalog() if e["path"] == f"snapshots/{name}")
+    return _snapshot_info(entry)
@@ -9,53 +9,71 @@ from datetime import datetime
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from jinja2 import Environment, FileSystemLoader
 
 from ..helpers import (
     HOST_PROJECT_ROOT, INSTANCES_DIR, PROJECT_ROOT, RESERVED_SUBDOMAINS,
-    TEMPLATES_DIR, TRAEFIK_DIR, DEFAULT_SOURCE_PATHS,
+    DEFAULT_SOURCE_PATHS,
     docker_client, get_domain, get_domain_prefix, detect_https, detect_cache_engine,
     load_registry, save_registry, safe_sql_identifier, validate_source_path,
-    get_container_status,
+    get_container_status, get_template_env, record_generated, forget_generated, write_generated,
 )
 
 
 def _compose_cmd(compose_file: str, *args: str) -> list[str]:
     return ["docker", "compose", "-f", compose_file, *args]
 from ..auth import verify_credentials
+from ..routing import schedule_route_publish
 from ..models import (
     CreateInstanceRequest, CreateInstanceResponse,
-    InstanceListResponse, MessageResponse,
+    InstanceInfo, InstanceListResponse, MessageResponse,
 )
 
 router = APIRouter(prefix="/api", tags=["instances"])
 
 
-@router.get("/instances", response_model=InstanceListResponse, summary="List all instances")
-def api_list_instances(user: str = Depends(verify_credentials)):
-    registry = load_registry()
+def _instance_info(name: str, inst: dict, with_status: bool) -> dict:
     d = get_domain()
-    prefix = get_domain_prefix()
     protocol = "https" if detect_https() else "http"
-    instances = []
-    for name, inst in registry.get("instances", {}).items():
-        container_name = inst.get("container_name", f"{prefix}-{name}")
+    container_name = inst.get("container_name", f"{get_domain_prefix()}-{name}")
+    info = {
+        "name": name, "type": inst["type"],
+        "subdomain": inst["subdomain"],
+        "url": f"{protocol}://{inst['subdomain']}.{d}",
+        "db_name": inst["db_name"],
+        "container_name": container_name,
+        "created_at": inst.get("created_at", ""),
+        "source_path": inst.get("source_path", ""),
+        "branch": inst.get("branch", ""),
+        "worktree_path": inst.get("worktree_path", ""),
+        "restricted": inst.get("restricted", False),
+    }
+    if with_status:
         s = get_container_status(container_name)
-        instances.append({
-            "name": name, "type": inst["type"],
-            "subdomain": inst["subdomain"],
-            "url": f"{protocol}://{inst['subdomain']}.{d}",
-            "db_name": inst["db_name"],
-            "container_name": container_name,
-            "container_status": s["status"],
-            "container_health": s["health"],
-            "created_at": inst.get("created_at", ""),
-            "source_path": inst.get("source_path", ""),
-            "branch": inst.get("branch", ""),
-            "worktree_path": inst.get("worktree_path", ""),
-            "restricted": inst.get("restricted", False),
-        })
-    return {"domain": d, "instances": instances}
+        info["container_status"] = s["status"]
+        info["container_health"] = s["health"]
+    return info
+
+
+@router.get("/instances", response_model=InstanceListResponse, summary="List all instances")
+def api_list_instances(user: str = Depends(verify_credentials)):
+    registry = load_registry()
+    instances = [_instance_info(name, inst, with_status=True)
+                 for name, inst in registry.get("instances", {}).items()]
+    return {"domain": get_domain(), "instances": instances}
+
+
+@router.get("/instances/{name}", response_model=InstanceInfo, summary="Get one instance")
+def api_get_instance(
+    name: str,
+    include: str = Query("", description="Comma-separated extras; 'status' adds container status and health"),
+    user: str = Depends(verify_credentials),
+):
+    """Registry data for one instance. Docker is only queried with ?include=status."""
+    inst = load_registry().get("instances", {}).get(name)
+    if inst is None:
+        raise HTTPException(404, f"Instance '{name}' not found")
+    extras = {part.strip() for part in include.split(",") if part.strip()}
+    return _instance_info(name, inst, with_status="status" in extras)
 
 
 @router.post("/instances", response_model=CreateInstanceResponse, summary="Create a new instance")
@@ -142,10 +160,7 @@ def api_create_instance(req: CreateInstanceRequest, user: str = Depends(verify_c
 
     security_salt = hashlib.sha256(secrets.token_bytes(64)).hexdigest()
 
-    env = Environment(
-        loader=FileSystemLoader(str(TEMPLATES_DIR)),
-        trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True,
-    )
+    env = get_template_env()
     ctx = {
         "instance_name": name, "instance_type": instance_type,
         "instance_subdomain": subdomain, "domain": d,
@@ -165,13 +180,14 @@ def api_create_instance(req: CreateInstanceRequest, user: str = Depends(verify_c
             "cache_engine": detect_cache_engine(),
             "generated_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         }
-        shared_env.write_text(env.get_template("shared.env.j2").render(shared_ctx))
+        write_generated(shared_env, env.get_template("shared.env.j2").render(shared_ctx))
 
     inst_dir = INSTANCES_DIR / name
     inst_dir.mkdir(parents=True, exist_ok=True)
-    (inst_dir / ".env").write_text(env.get_template("instance.env.j2").render(ctx))
-    (inst_dir / "docker-compose.yml").write_text(env.get_template("instance-docker-compose.yml.j2").render(ctx))
-    (TRAEFIK_DIR / f"instance-{name}.yml").write_text(env.get_template("instance-traefik.yml.j2").render(ctx))
+    record_generated([{"path": str(inst_dir.relative_to(PROJECT_ROOT)), "kind": "dir", "owner": name}])
+    write_generated(inst_dir / ".env", env.get_template("instance.env.j2").render(ctx), owner=name)
+    write_generated(inst_dir / "docker-compose.yml",
+                    env.get_template("instance-docker-compose.yml.j2").render(ctx), owner=name)
 
     # Create database
     pg_container = f"{prefix}-postgres16"
@@ -209,8 +225,10 @@ def api_create_instance(req: CreateInstanceRequest, user: str = Depends(verify_c
     if branch:
         inst_record["branch"] = branch
         inst_record["worktree_path"] = str(worktree_path.relative_to(PROJECT_ROOT))
+        record_generated([{"path": inst_record["worktree_path"], "kind": "worktree", "owner": name}])
     registry.setdefault("instances", {})[name] = inst_record
     save_registry(registry)
+    schedule_route_publish()
 
     protocol = "https" if enable_https else "http"
     return {"message": f"Instance '{name}' created", "url": f"{protocol}://{subdomain}.{d}"}
@@ -239,10 +257,6 @@ def api_destroy_instance(name: str, drop_db: bool = Query(False), user: str = De
         except Exception:
             pass
 
-    traefik_file = TRAEFIK_DIR / f"instance-{name}.yml"
-    if traefik_file.exists():
-        traefik_file.unlink()
-
     if drop_db:
         db_name = safe_sql_identifier(inst.get("db_name", ""))
         if db_name:
@@ -288,6 +302,8 @@ def api_destroy_instance(name: str, drop_db: bool = Query(False), user: str = De
 
     del registry["instances"][name]
     save_registry(registry)
+    forget_generated(owner=name)
+    schedule_route_publish()
     return {"message": f"Instance '{name}' destroyed"}
 
 
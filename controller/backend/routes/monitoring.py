@@ -1,17 +1,25 @@
 """Monitoring routes — status, stats, logs."""
 
+import base64
+import re
+import sqlite3
+import time
+from typing import Optional
+
 import docker
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from ..helpers import (
-    _get_base_service_names, docker_client,
+    docker_client, get_base_container_names,
     get_domain, get_domain_prefix, detect_https,
     get_container_status, get_container_stats,
     sanitize_container_name,
 )
 from ..auth import verify_credentials
+from ..logindex import index_stats, search as search_index
+from ..logstream import docker_ts_to_epoch, epoch_to_docker_ts, iter_lines, parse_time
 from ..models import (
-    ContainerStatsResponse, LogsResponse, StatusResponse,
+    ContainerStatsResponse, LogIndexSearchResponse, LogSearchResponse, LogsResponse, StatusResponse,
 )
 
 router = APIRouter(prefix="/api", tags=["monitoring"])
@@ -21,10 +29,8 @@ router = APIRouter(prefix="/api", tags=["monitoring"])
 def api_status(user: str = Depends(verify_credentials)):
     prefix = get_domain_prefix()
     https = detect_https()
-    base_services = list(_get_base_service_names())
-    services = {}
-    for svc in base_services:
-        services[svc] = get_container_status(f"{prefix}-{svc}")
+    services = {svc: get_container_status(container)
+                for svc, container in get_base_container_names().items()}
     return {
         "domain": get_domain(),
         "domain_prefix": prefix,
@@ -46,6 +52,77 @@ def api_instance_logs(name: str, tail: int = Query(100, ge=1, le=5000), user: st
     return {"lines": logs.splitlines(), "container_name": container_name, "tail": tail}
 
 
+def _encode_cursor(ts: str, seen: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts}|{seen}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        ts, seen = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        docker_ts_to_epoch(ts)
+        return ts, int(seen)
+    except ValueError:
+        raise HTTPException(422, "Invalid cursor")
+
+
+@router.get("/instances/{name}/logs/search", response_model=LogSearchResponse, summary="Search container logs")
+def api_instance_logs_search(
+    name: str,
+    q: str = Query("", description="Regex to match (case-insensitive); empty matches every line"),
+    since: Optional[str] = Query(None, description="ISO 8601, epoch seconds, or relative (30m, 2h, 1d)"),
+    until: Optional[str] = Query(None, description="ISO 8601, epoch seconds, or relative (30m, 2h, 1d)"),
+    limit: int = Query(200, ge=1, le=2000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    user: str = Depends(verify_credentials),
+):
+    """Oldest-first matching lines within [since, until], streamed from Docker and filtered server-side.
+
+    Pass the same q/since/until with next_cursor to fetch the following page;
+    next_cursor is null on the last page.
+    """
+    container_name = sanitize_container_name(name)
+    try:
+        pattern = re.compile(q, re.IGNORECASE) if q else None
+    except re.error as e:
+        raise HTTPException(422, f"Invalid pattern: {e}")
+    since_ts = parse_time(since, "since") if since else None
+    until_ts = parse_time(until, "until") if until else None
+
+    # The cursor is the last returned line's timestamp plus how many lines
+    # carrying exactly that timestamp were already consumed
+    after, skip = _decode_cursor(cursor) if cursor else ("", 0)
+    if after:
+        since_ts = max(since_ts or 0.0, docker_ts_to_epoch(after) - 1e-6)
+
+    try:
+        container = docker_client.containers.get(container_name)
+    except docker.errors.NotFound:
+        raise HTTPException(404, f"Container '{container_name}' not running")
+    stream = container.logs(stream=True, follow=False, timestamps=True,
+                            since=since_ts or None, until=until_ts)
+
+    lines, scanned, next_cursor = [], 0, None
+    run_ts, run_seen = after, skip
+    try:
+        for raw in iter_lines(stream):
+            ts, _, text = raw.partition(" ")
+            if after and ts <= after:
+                if ts < after or skip > 0:
+                    skip -= ts == after
+                    continue
+            run_ts, run_seen = (ts, run_seen + 1) if ts == run_ts else (ts, 1)
+            scanned += 1
+            if pattern and not pattern.search(text):
+                continue
+            lines.append({"timestamp": ts, "line": text})
+            if len(lines) == limit:
+                next_cursor = _encode_cursor(run_ts, run_seen)
+                break
+    finally:
+        stream.close()
+    return {"lines": lines, "container_name": container_name, "scanned": scanned, "next_cursor": next_cursor}
+
+
 @router.get("/instances/{name}/stats", response_model=ContainerStatsResponse, summary="Instance resource usage")
 def api_instance_stats(name: str, user: str = Depends(verify_credentials)):
     container_name = sanitize_container_name(name)
@@ -54,6 +131,33 @@ def api_instance_stats(name: str, user: str = Depends(verify_credentials)):
 
 @router.get("/services/stats", summary="Base services resource usage")
 def api_services_stats(user: str = Depends(verify_credentials)):
-    prefix = get_domain_prefix()
-    services = list(_get_base_service_names() - {"controller"})
-    return {svc: get_container_stats(f"{prefix}-{svc}") for svc in services}
+    return {svc: get_container_stats(container)
+            for svc, container in get_base_container_names().items() if svc != "controller"}
+
+
+@router.get("/logs/search", response_model=LogIndexSearchResponse, summary="Search the persistent log index")
+def api_logs_search(
+    q: str = Query("", description="FTS5 query, e.g. 'fatal AND error' or '\"connection refused\"'"),
+    source: Optional[str] = Query(None, description="Instance or base service name"),
+    since: Optional[str] = Query(None, description="ISO 8601, epoch seconds, or relative (30m, 2h, 1d)"),
+    until: Optional[str] = Query(None, description="ISO 8601, epoch seconds, or relative (30m, 2h, 1d)"),
+    limit: int = Query(100, ge=1, le=1000),
+    user: str = Depends(verify_credentials),
+):
+    """Newest-first matches across every instance and base service, including destroyed ones.
+
+    Requires the log indexer (LOG_INDEX=1); only day partitions inside the window are read.
+    """
+    since_ts = epoch_to_docker_ts(parse_time(since, "since")) if since else None
+    until_ts = epoch_to_docker_ts(parse_time(until, "until")) if until else None
+    started = time.perf_counter()
+    try:
+        hits = search_index(q, source, since_ts, until_ts, limit)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(422, f"Invalid query: {e}")
+    return {"hits": hits, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+@router.get("/logs/index", summary="Log index partitions and size")
+def api_logs_index(user: str = Depends(verify_credentials)):
+    return index_stats()
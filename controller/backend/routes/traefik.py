@@ -0,0 +1,15 @@
+"""Traefik HTTP provider — instance routes served straight from the registry."""
+
+from fastapi import APIRouter, Depends, Response
+
+from ..auth import verify_provider_token
+from ..routing import provider_config
+
+router = APIRouter(prefix="/api", tags=["traefik"])
+
+
+@router.get("/traefik/dynamic", summary="Traefik dynamic configuration (HTTP provider)")
+def api_traefik_dynamic(_: None = Depends(verify_provider_token)):
+    """Polled by Traefik (`--providers.http.endpoint`). The body is rebuilt only when
+    the registry changes; Traefik itself skips the reload when it comes back identical."""
+    return Response(provider_config(), media_type="application/json", headers={"Cache-Control": "no-cache"})
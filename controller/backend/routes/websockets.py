@@ -1,13 +1,22 @@
 """WebSocket routes — live logs streaming and web terminal."""
 
 import asyncio
+import json
+import os
+import re
 
+import docker
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from starlette.websockets import WebSocketState
 
 from ..helpers import docker_client, sanitize_container_name
+from ..logstream import LineFilter, pump_logs, pump_merged
 
 router = APIRouter()
 
+MAX_MERGED_CONTAINERS = 10
+TERMINAL_IDLE_TIMEOUT = int(os.environ.get("TERMINAL_IDLE_TIMEOUT", "1800"))  # seconds, 0 = never
+
 
 def verify_ws_auth(websocket: WebSocket) -> bool:
     """Verify WebSocket auth via query param token (Basic credentials base64)."""
@@ -31,6 +40,11 @@ def verify_ws_auth(websocket: WebSocket) -> bool:
         return False
 
 
+def _line_filter(websocket: WebSocket) -> LineFilter:
+    """?grep= / ?exclude= regexes (re.error if either is invalid)."""
+    return LineFilter(websocket.query_params.get("grep"), websocket.query_params.get("exclude"))
+
+
 @router.websocket("/ws/logs/{name}")
 async def ws_logs(websocket: WebSocket, name: str):
     if not verify_ws_auth(websocket):
@@ -40,32 +54,84 @@ async def ws_logs(websocket: WebSocket, name: str):
 
     try:
         container_name = sanitize_container_name(name)
+        line_filter = _line_filter(websocket)
     except HTTPException:
         await websocket.send_text(f"Unknown container: '{name}'")
         await websocket.close()
         return
+    except re.error as e:
+        await websocket.send_text(f"Invalid filter: {e}")
+        await websocket.close()
+        return
+
+    def open_stream(tail: int):
+        return docker_client.containers.get(container_name).logs(stream=True, follow=True, tail=tail)
 
     try:
-        container = docker_client.containers.get(container_name)
-    except Exception:
+        await pump_logs(websocket, container_name, open_stream, line_filter)
+    except docker.errors.NotFound:
         await websocket.send_text(f"Container '{name}' not found")
+    except WebSocketDisconnect:
+        return
+    except Exception:
+        pass
+    if websocket.client_state == WebSocketState.CONNECTED:
         await websocket.close()
+
+
+@router.websocket("/ws/logs")
+async def ws_logs_merged(websocket: WebSocket):
+    """Several containers on one socket: ?containers=v4-main,postgres16,redis-durango"""
+    if not verify_ws_auth(websocket):
+        await websocket.close(code=4401)
         return
+    await websocket.accept()
 
-    log_generator = container.logs(stream=True, follow=True, tail=100)
-    loop = asyncio.get_event_loop()
+    names = [n.strip() for n in websocket.query_params.get("containers", "").split(",") if n.strip()]
+    names = list(dict.fromkeys(names))
     try:
-        while True:
-            chunk = await loop.run_in_executor(None, next, log_generator, None)
-            if chunk is None:
-                break
-            await websocket.send_text(chunk.decode(errors="replace"))
+        if not names or len(names) > MAX_MERGED_CONTAINERS:
+            raise ValueError(f"Pass 1-{MAX_MERGED_CONTAINERS} names in ?containers=")
+        line_filter = _line_filter(websocket)
+        sources = {}
+        for name in names:
+            container_name = sanitize_container_name(name)
+
+            def open_stream(tail: int, container_name=container_name):
+                return docker_client.containers.get(container_name).logs(
+                    stream=True, follow=True, tail=tail, timestamps=True)
+
+            sources[name] = (f"{container_name} (timestamps)", open_stream)
+    except HTTPException as e:
+        await websocket.send_text(e.detail)
+        await websocket.close()
+        return
+    except (ValueError, re.error) as e:
+        await websocket.send_text(f"Invalid request: {e}")
+        await websocket.close()
+        return
+
+    try:
+        await pump_merged(websocket, sources, line_filter)
+    except docker.errors.NotFound as e:
+        await websocket.send_text(f"Container not found: {e.explanation or e}")
     except WebSocketDisconnect:
-        pass
+        return
     except Exception:
+        pass
+    if websocket.client_state == WebSocketState.CONNECTED:
         await websocket.close()
-    finally:
-        log_generator.close()
+
+
+def _parse_resize(text: str) -> tuple[int, int] | None:
+    """(rows, cols) from a '{"type": "resize", "rows": R, "cols": C}' control message."""
+    try:
+        msg = json.loads(text)
+        if msg.get("type") == "resize":
+            return int(msg["rows"]), int(msg["cols"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        pass
+    return None
 
 
 @router.websocket("/ws/terminal/{name}")
@@ -82,37 +148,64 @@ async def ws_terminal(websocket: WebSocket, name: str):
         await websocket.close()
         return
 
+    # Docker answers over HTTP: keep those round trips off the event loop
     try:
-        docker_client.containers.get(container_name)
+        await asyncio.to_thread(docker_client.containers.get, container_name)
     except Exception:
         await websocket.send_text(f"\r\nContainer '{container_name}' not found\r\n")
         await websocket.close()
         return
 
-    exec_id = docker_client.api.exec_create(
+    exec_id = await asyncio.to_thread(
+        docker_client.api.exec_create,
         container_name, "/bin/bash", stdin=True, tty=True, stdout=True, stderr=True,
     )
-    sock = docker_client.api.exec_start(exec_id, socket=True, tty=True)
+    sock = await asyncio.to_thread(docker_client.api.exec_start, exec_id, socket=True, tty=True)
     raw_sock = sock._sock
+    raw_sock.setblocking(False)  # driven by the event loop, no thread per session
+    loop = asyncio.get_running_loop()
+    last_activity = loop.time()
 
     async def read_from_container():
-        loop = asyncio.get_event_loop()
-        try:
-            while True:
-                data = await loop.run_in_executor(None, raw_sock.recv, 4096)
-                if not data:
-                    break
-                await websocket.send_bytes(data)
-        except Exception:
-            pass
-
-    reader_task = asyncio.create_task(read_from_container())
-    try:
+        nonlocal last_activity
         while True:
-            data = await websocket.receive_bytes()
-            raw_sock.sendall(data)
-    except WebSocketDisconnect:
-        pass
+            data = await loop.sock_recv(raw_sock, 4096)
+            if not data:
+                return
+            last_activity = loop.time()
+            await websocket.send_bytes(data)
+
+    async def write_to_container():
+        nonlocal last_activity
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            last_activity = loop.time()
+            if message.get("bytes") is not None:
+                await loop.sock_sendall(raw_sock, message["bytes"])
+            elif message.get("text"):
+                size = _parse_resize(message["text"])
+                if size:
+                    await asyncio.to_thread(docker_client.api.exec_resize, exec_id, height=size[0], width=size[1])
+                else:
+                    await loop.sock_sendall(raw_sock, message["text"].encode())
+
+    async def close_when_idle():
+        if TERMINAL_IDLE_TIMEOUT <= 0:
+            await asyncio.Event().wait()
+        while (remaining := last_activity + TERMINAL_IDLE_TIMEOUT - loop.time()) > 0:
+            await asyncio.sleep(remaining)
+        await websocket.send_text(f"\r\nSession closed after {TERMINAL_IDLE_TIMEOUT}s without activity.\r\n")
+
+    tasks = [asyncio.create_task(t()) for t in (read_from_container, write_to_container, close_when_idle)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.exception()  # a dropped exec socket or client just ends the session
     finally:
-        reader_task.cancel()
+        for task in tasks:
+            task.cancel()
         raw_sock.close()
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close()
@@ -0,0 +1,187 @@
+"""Traefik instance routes — HTTP-provider config from the registry, or debounced atomic
+publishing of traefik/instances.yml for setups still on the file provider."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .helpers import (
+    PROJECT_ROOT, REGISTRY_DB, TRAEFIK_DIR,
+    content_hash, detect_http_provider, detect_https, forget_generated, get_domain, get_template_env,
+    load_registry, record_generated,
+)
+
+log = logging.getLogger("ssmd.routing")
+
+ROUTES_FILE = TRAEFIK_DIR / "instances.yml"
+LEGACY_ROUTE_GLOB = "instance-*.yml"
+
+PUBLISH_DEBOUNCE = float(os.environ.get("ROUTE_PUBLISH_DEBOUNCE", "0.5"))  # seconds, 0 = immediate
+PUBLISH_MAX_DELAY = 5.0  # a steady stream of changes still publishes at least this often
+
+RESTRICTED_SOURCE_RANGES = ["127.0.0.1/32", "172.16.0.0/12", "192.168.0.0/16", "10.0.0.0/8"]
+
+_lock = threading.Lock()
+_timer: threading.Timer | None = None
+_first_pending: float | None = None
+
+
+def write_atomic(path: Path, content: str):
+    """Write via a temp file in the same directory + rename; the .tmp suffix keeps Traefik off it."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def render_routes(registry: dict | None = None) -> str | None:
+    """Render routes for every registered instance, or None if there are none."""
+    registry = registry or load_registry()
+    instances = [
+        {"name": name, "type": inst.get("type", ""), "subdomain": inst.get("subdomain", name),
+         "restricted": inst.get("restricted", False)}
+        for name, inst in sorted(registry.get("instances", {}).items())
+    ]
+    if not instances:
+        return None
+    return get_template_env().get_template("instance-routes.yml.j2").render(
+        domain=registry.get("domain") or get_domain(), enable_https=detect_https(), instances=instances,
+    )
+
+
+def build_dynamic_config(registry: dict | None = None) -> dict:
+    """Traefik dynamic configuration for every registered instance (same routes as the template)."""
+    registry = registry or load_registry()
+    domain = registry.get("domain") or get_domain()
+    https = detect_https()
+    routers, services, middlewares = {}, {}, {}
+    for name, inst in sorted(registry.get("instances", {}).items()):
+        router = {
+            "rule": f"Host(`{inst.get('subdomain', name)}.{domain}`)",
+            "service": f"instance-{name}",
+            "entryPoints": ["websecure" if https else "web"],
+            "priority": 100,
+        }
+        if https:
+            router["tls"] = {}
+        if inst.get("restricted", False):
+            router["middlewares"] = [f"ip-whitelist-{name}"]
+            middlewares[f"ip-whitelist-{name}"] = {"ipAllowList": {"sourceRange": RESTRICTED_SOURCE_RANGES}}
+        routers[f"instance-{name}"] = router
+        services[f"instance-{name}"] = {"loadBalancer": {"servers": [{"url": f"http://{name}:80"}]}}
+    if not routers:
+        return {}
+    http = {"routers": routers, "services": services}
+    if middlewares:
+        http["middlewares"] = middlewares
+    return {"http": http}
+
+
+_provider_cache: dict = {"key": None, "body": b""}
+
+
+def _provider_cache_key() -> tuple:
+    # registry.db is in WAL mode, so a write may only touch the -wal file until checkpoint
+    key = []
+    for path in (REGISTRY_DB, REGISTRY_DB.with_name(REGISTRY_DB.name + "-wal"), TRAEFIK_DIR / "dynamic.yml"):
+        try:
+            st = path.stat()
+            key.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            key.append(None)
+    return tuple(key)
+
+
+def provider_config() -> bytes:
+    """JSON body for the HTTP provider, rebuilt only when the registry changes.
+
+    Keys are sorted so an unchanged registry always yields identical bytes:
+    Traefik hashes each response and skips the reload when nothing changed.
+    """
+    key = _provider_cache_key()
+    if _provider_cache["key"] != key:
+        body = json.dumps(build_dynamic_config(), sort_keys=True, separators=(",", ":")).encode()
+        _provider_cache.update(key=key, body=body)
+    return _provider_cache["body"]
+
+
+def publish_routes() -> bool:
+    """Regenerate traefik/instances.yml from the registry now. Returns True if it changed.
+
+    With the HTTP provider enabled the file is removed instead, so routes are
+    not served twice.
+    """
+    content = None if detect_http_provider() else render_routes()
+    changed = False
+    manifest_path = str(ROUTES_FILE.relative_to(PROJECT_ROOT))
+    if content is None:
+        if ROUTES_FILE.exists():
+            ROUTES_FILE.unlink()
+            changed = True
+        forget_generated([manifest_path])
+    else:
+        if not ROUTES_FILE.exists() or ROUTES_FILE.read_text() != content:
+            TRAEFIK_DIR.mkdir(parents=True, exist_ok=True)
+            write_atomic(ROUTES_FILE, content)
+            changed = True
+        record_generated([{"path": manifest_path, "sha256": content_hash(content)}])
+
+    for legacy in TRAEFIK_DIR.glob(LEGACY_ROUTE_GLOB):
+        legacy.unlink()
+        changed = True
+    return changed
+
+
+def _flush():
+    global _timer, _first_pending
+    with _lock:
+        _timer, _first_pending = None, None
+    try:
+        if publish_routes():
+            log.info("Published %s", ROUTES_FILE)
+    except Exception:
+        log.exception("Publishing Traefik routes failed")
+
+
+def schedule_route_publish():
+    """Publish routes after PUBLISH_DEBOUNCE seconds without further changes.
+
+    Bursts of creates/destroys (e.g. 20 instances from a script) collapse into
+    one write and therefore one Traefik reload.
+    """
+    global _timer, _first_pending
+    if PUBLISH_DEBOUNCE <= 0:
+        _flush()
+        return
+    with _lock:
+        now = time.monotonic()
+        if _first_pending is None:
+            _first_pending = now
+        if _timer is not None:
+            if now - _first_pending >= PUBLISH_MAX_DELAY:
+                return
+            _timer.cancel()
+        _timer = threading.Timer(PUBLISH_DEBOUNCE, _flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def flush_route_publish():
+    """Publish any pending route change immediately (used on shutdown)."""
+    with _lock:
+        pending = _timer
+        if pending is not None:
+            pending.cancel()
+    if pending is not None:
+        _flush()
@@ -7,8 +7,10 @@ Auto-discovers config from project .env and registry.
 Requires: pip install mcp httpx
 """
 
+import asyncio
 import json
 import os
+import time
 from pathlib import Path
 
 import httpx
@@ -41,44 +43,112 @@ CONTROLLER_URL = os.environ.get("CONTROLLER_URL", "http://localhost:8900")
 
 # ─── HTTP Client ─────────────────────────────────────────────────────────────
 
-def _client() -> httpx.Client:
-    return httpx.Client(
-        base_url=CONTROLLER_URL,
-        auth=(CONTROLLER_USER, CONTROLLER_PASS),
-        timeout=60.0,
-    )
+# Per-operation timeouts: reads answer quickly, while create / restore /
+# migrations can legitimately run for minutes. connect stays short everywhere.
+TIMEOUT_SHORT = httpx.Timeout(15.0, connect=5.0)  # status, lists, logs, guard checks
+TIMEOUT_MEDIUM = httpx.Timeout(120.0, connect=5.0)  # start, stop, destroy
+TIMEOUT_LONG = httpx.Timeout(900.0, connect=5.0)  # create, db setup, snapshot, restore
 
+BATCH_CONCURRENCY = 4  # requests in flight per batch tool; the controller runs compose in a thread pool
 
-def _get(path: str, **params) -> str:
-    with _client() as c:
-        r = c.get(path, params=params)
-        r.raise_for_status()
-        return r.text
+_http: httpx.AsyncClient | None = None
 
 
-def _post(path: str, **kwargs) -> str:
-    with _client() as c:
-        r = c.post(path, **kwargs)
-        r.raise_for_status()
-        return r.text
+def _client() -> httpx.AsyncClient:
+    """Process-wide client: pooled keep-alive connections, so a tool call costs only its request.
 
+    Created on first use, inside the server's event loop; it lives as long as the process.
+    """
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            base_url=CONTROLLER_URL,
+            auth=(CONTROLLER_USER, CONTROLLER_PASS),
+            timeout=TIMEOUT_SHORT,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0),
+        )
+    return _http
+
+
+async def _get(path: str, timeout: httpx.Timeout = TIMEOUT_SHORT, **params) -> str:
+    r = await _client().get(path, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r.text
+
+
+async def _post(path: str, timeout: httpx.Timeout = TIMEOUT_MEDIUM, **kwargs) -> str:
+    r = await _client().post(path, timeout=timeout, **kwargs)
+    r.raise_for_status()
+    return r.text
 
-def _delete(path: str, **params) -> str:
-    with _client() as c:
-        r = c.delete(path, params=params)
-        r.raise_for_status()
-        return r.text
 
+async def _delete(path: str, timeout: httpx.Timeout = TIMEOUT_MEDIUM, **params) -> str:
+    r = await _client().delete(path, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r.text
 
-def _check_restricted(name: str, operation: str) -> str | None:
+
+async def _for_each(names: list[str], call) -> str:
+    """Run call(name) for every name, at most BATCH_CONCURRENCY at a time.
+
+    Returns one JSON object: {"succeeded": n, "failed": n, "results": {name: {"ok", "result" | "error"}}}.
+    A failing instance does not stop the others.
+    """
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(name: str) -> dict:
+        async with sem:
+            try:
+                text = await call(name)
+            except httpx.HTTPStatusError as e:
+                try:
+                    detail = e.response.json().get("detail", e.response.text)
+                except ValueError:
+                    detail = e.response.text
+                return {"ok": False, "error": f"{e.response.status_code}: {detail}"}
+            except httpx.HTTPError as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        try:
+            return {"ok": True, "result": json.loads(text)}
+        except ValueError:
+            return {"ok": True, "result": text}
+
+    unique = list(dict.fromkeys(names))
+    outcomes = await asyncio.gather(*(run(n) for n in unique))
+    results = dict(zip(unique, outcomes))
+    ok = sum(1 for r in outcomes if r["ok"])
+    return json.dumps({"succeeded": ok, "failed": len(outcomes) - ok, "results": results}, indent=2)
+
+
+# Guard checks trust a recent "restricted" answer for RESTRICTED_TTL instead of
+# asking the controller every time. Only positive answers are kept: an instance
+# recreated as restricted (e.g. from the CLI) is blocked on the very next call,
+# while a restriction lifted elsewhere takes up to RESTRICTED_TTL to be noticed.
+RESTRICTED_TTL = 60.0  # seconds
+_restricted_cache: dict[str, float] = {}  # name -> when it was seen restricted
+
+
+def _remember_restricted(name: str, restricted: bool):
+    if restricted:
+        _restricted_cache[name] = time.monotonic()
+    else:
+        _restricted_cache.pop(name, None)
+
+
+async def _check_restricted(name: str, operation: str) -> str | None:
     """Check if instance is restricted. Returns error message if blocked, None if allowed."""
-    with _client() as c:
-        r = c.get("/api/instances")
+    seen = _restricted_cache.get(name)
+    if seen is not None and time.monotonic() - seen < RESTRICTED_TTL:
+        restricted = True
+    else:
+        r = await _client().get(f"/api/instances/{name}")
+        if r.status_code == 404:
+            return None  # the operation itself reports the missing instance
         r.raise_for_status()
-        data = r.json()
-    for inst in data.get("instances", []):
-        if inst["name"] == name and inst.get("restricted", False):
-            return f"Instance '{name}' is restricted. {operation} is blocked to protect sensitive data (API keys, tokens). Use the web UI or CLI directly."
+        restricted = r.json().get("restricted", False)
+        _remember_restricted(name, restricted)
+    if restricted:
+        return f"Instance '{name}' is restricted. {operation} is blocked to protect sensitive data (API keys, tokens). Use the web UI or CLI directly."
     return None
 
 
@@ -91,19 +161,22 @@ mcp = FastMCP(
 
 
 @mcp.tool()
-def ssmd_get_status() -> str:
+async def ssmd_get_status() -> str:
     """Get system status: domain, protocol, and health of all base services (Traefik, PostgreSQL, Redis, MySQL, etc.)."""
-    return _get("/api/status")
+    return await _get("/api/status")
 
 
 @mcp.tool()
-def ssmd_list_instances() -> str:
+async def ssmd_list_instances() -> str:
     """List all instances with their status, URL, branch, database, and restricted flag. Restricted instances have real API keys and should not be accessed for data operations."""
-    return _get("/api/instances")
+    text = await _get("/api/instances")
+    for inst in json.loads(text).get("instances", []):
+        _remember_restricted(inst["name"], inst.get("restricted", False))
+    return text
 
 
 @mcp.tool()
-def ssmd_create_instance(
+async def ssmd_create_instance(
     name: str,
     type: str,
     subdomain: str = "",
@@ -128,99 +201,133 @@ def ssmd_create_instance(
         body["branch"] = branch
     if from_snapshot:
         body["from_snapshot"] = from_snapshot
-    return _post("/api/instances", json=body)
+    text = await _post("/api/instances", json=body, timeout=TIMEOUT_LONG)
+    _remember_restricted(name, restricted)
+    return text
 
 
 @mcp.tool()
-def ssmd_destroy_instance(name: str, drop_db: bool = False) -> str:
+async def ssmd_destroy_instance(name: str, drop_db: bool = False) -> str:
     """Destroy an instance — removes container, config, and optionally its database.
 
     Args:
         name: Instance name
         drop_db: Also drop the PostgreSQL database
     """
-    return _delete(f"/api/instances/{name}", drop_db=drop_db)
+    _restricted_cache.pop(name, None)
+    return await _delete(f"/api/instances/{name}", drop_db=drop_db)
 
 
 @mcp.tool()
-def ssmd_start_instance(name: str) -> str:
+async def ssmd_start_instance(name: str) -> str:
     """Start a stopped instance.
 
     Args:
         name: Instance name
     """
-    return _post(f"/api/instances/{name}/start")
+    return await _post(f"/api/instances/{name}/start")
 
 
 @mcp.tool()
-def ssmd_stop_instance(name: str) -> str:
+async def ssmd_stop_instance(name: str) -> str:
     """Stop a running instance.
 
     Args:
         name: Instance name
     """
-    return _post(f"/api/instances/{name}/stop")
+    return await _post(f"/api/instances/{name}/stop")
+
+
+@mcp.tool()
+async def ssmd_start_instances(names: list[str]) -> str:
+    """Start several instances concurrently. Returns per-instance results plus succeeded/failed counts.
+
+    Args:
+        names: Instance names
+    """
+    return await _for_each(names, lambda name: _post(f"/api/instances/{name}/start"))
+
+
+@mcp.tool()
+async def ssmd_stop_instances(names: list[str]) -> str:
+    """Stop several instances concurrently. Returns per-instance results plus succeeded/failed counts.
+
+    Args:
+        names: Instance names
+    """
+    return await _for_each(names, lambda name: _post(f"/api/instances/{name}/stop"))
+
+
+@mcp.tool()
+async def ssmd_instances_stats(names: list[str]) -> str:
+    """Get CPU and memory usage for several instances in one call.
+
+    Args:
+        names: Instance names
+    """
+    return await _for_each(names, lambda name: _get(f"/api/instances/{name}/stats"))
 
 
 @mcp.tool()
-def ssmd_db_setup(name: str, skip_seed: bool = False) -> str:
+async def ssmd_db_setup(name: str, skip_seed: bool = False) -> str:
     """Run CakePHP database migrations and seeds for an instance. Blocked for restricted instances.
 
     Args:
         name: Instance name
         skip_seed: Skip database seeding (run migrations only)
     """
-    err = _check_restricted(name, "db_setup")
+    err = await _check_restricted(name, "db_setup")
     if err:
         return err
-    return _post(f"/api/instances/{name}/db-setup", params={"skip_seed": skip_seed})
+    return await _post(f"/api/instances/{name}/db-setup", params={"skip_seed": skip_seed}, timeout=TIMEOUT_LONG)
 
 
 @mcp.tool()
-def ssmd_db_snapshot(name: str) -> str:
+async def ssmd_db_snapshot(name: str, profile: str = "full") -> str:
     """Create a pg_dump snapshot of an instance's database. Saved to snapshots/ as .sql.gz. Blocked for restricted instances.
 
     Args:
         name: Instance name
+        profile: Snapshot profile — 'full', 'schema-only', 'no-logs', or any defined in config/snapshot-profiles.conf
     """
-    err = _check_restricted(name, "db_snapshot")
+    err = await _check_restricted(name, "db_snapshot")
     if err:
         return err
-    return _post(f"/api/instances/{name}/db-snapshot")
+    return await _post(f"/api/instances/{name}/db-snapshot", params={"profile": profile}, timeout=TIMEOUT_LONG)
 
 
 @mcp.tool()
-def ssmd_db_restore(name: str, snapshot: str) -> str:
+async def ssmd_db_restore(name: str, snapshot: str) -> str:
     """Restore a database snapshot into an instance. Blocked for restricted instances.
 
     Args:
         name: Instance name
         snapshot: Snapshot file path (e.g. 'snapshots/v4_main_20260404_120000.sql.gz')
     """
-    err = _check_restricted(name, "db_restore")
+    err = await _check_restricted(name, "db_restore")
     if err:
         return err
-    return _post(f"/api/instances/{name}/db-restore", params={"snapshot": snapshot})
+    return await _post(f"/api/instances/{name}/db-restore", params={"snapshot": snapshot}, timeout=TIMEOUT_LONG)
 
 
 @mcp.tool()
-def ssmd_list_snapshots() -> str:
+async def ssmd_list_snapshots() -> str:
     """List all available database snapshots with name, path, size, and creation date."""
-    return _get("/api/snapshots")
+    return await _get("/api/snapshots")
 
 
 @mcp.tool()
-def ssmd_instance_logs(name: str, tail: int = 100) -> str:
+async def ssmd_instance_logs(name: str, tail: int = 100) -> str:
     """Get the last N lines of an instance's container logs. Blocked for restricted instances.
 
     Args:
         name: Instance name
         tail: Number of log lines to return (default 100, max 5000)
     """
-    err = _check_restricted(name, "instance_logs")
+    err = await _check_restricted(name, "instance_logs")
     if err:
         return err
-    return _get(f"/api/instances/{name}/logs", tail=tail)
+    return await _get(f"/api/instances/{name}/logs", tail=tail)
 
 
 if __name__ == "__main__":
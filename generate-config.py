@@ -5,6 +5,10 @@ Dynamic isolated dev instance manager.
 
 Usage: ./ssmd <domain>           Generate base configs
        ./ssmd instance create    Create a new instance
+       ./ssmd snapshots prune    Apply snapshot retention policies
+       ./ssmd backups restore    Restore configs from an earlier run
+       ./ssmd logs search        Search indexed logs across all instances
+       ./ssmd verify             Check generated files against the manifest
        ./ssmd --reset            Remove all generated files
 
 Legacy alias: ./generate-config.py still works.
@@ -41,6 +45,32 @@ from lib.instance_manager import (
     instance_destroy, instance_logs, instance_shell,
 )
 from lib.database import instance_db_setup, instance_db_snapshot, instance_db_restore
+from lib.snapshots import snapshots_list, snapshots_policy, snapshots_profiles, snapshots_prune
+from lib.manifest import verify
+from lib.backups import backups_list, backups_show, backups_restore, backups_policy, backups_prune
+from lib.logindex import logs_search, logs_index
+
+
+def retention_count(value):
+    """argparse type for retention settings: a count >= 0, where 0 unsets it"""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 (unset) or a positive number, got {n}")
+    return n
+
+
+def positive_int(value):
+    """argparse type for limits: a count >= 1"""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {n}")
+    return n
 
 
 def build_instance_parser():
@@ -79,13 +109,19 @@ def build_instance_parser():
 
     # db-setup
     p = sub.add_parser('db-setup', help='Run migrations and seeds for an instance')
-    p.add_argument('--name', required=True, help='Instance name')
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument('--name', help='Instance name')
+    target.add_argument('--all', action='store_true', help='Run for every running instance')
+    p.add_argument('--type', choices=['v4', 'selfhosted'], help='With --all: only instances of this type')
+    p.add_argument('--parallel', type=int, default=4, help='With --all: max concurrent instances (default: 4)')
     p.add_argument('--skip-seed', action='store_true', help='Skip database seeding')
+    p.add_argument('--force', action='store_true', help='Run even if migrations and seeds are unchanged since the last setup')
 
     # db-snapshot
     p = sub.add_parser('db-snapshot', help='Take a pg_dump snapshot of an instance database')
     p.add_argument('--name', required=True, help='Instance name')
-    p.add_argument('--output', help='Output file path (default: snapshots/<db_name>_<timestamp>.sql.gz)')
+    p.add_argument('--output', help='Output file path (default: snapshots/<db_name>_<timestamp>[_<profile>].sql.gz)')
+    p.add_argument('--profile', default='full', help='Snapshot profile from config/snapshot-profiles.conf (default: full)')
 
     # db-restore
     p = sub.add_parser('db-restore', help='Restore a database snapshot into an instance')
@@ -106,6 +142,90 @@ def build_instance_parser():
     return parser
 
 
+def build_snapshots_parser():
+    """Build argparse parser for snapshots subcommands"""
+    parser = argparse.ArgumentParser(
+        prog=f'{Path(sys.argv[0]).name} snapshots',
+        description='Manage database snapshots and retention policies',
+    )
+    sub = parser.add_subparsers(dest='snapshots_command')
+
+    # list
+    sub.add_parser('list', help='List catalogued snapshots')
+
+    # profiles
+    sub.add_parser('profiles', help='List snapshot profiles (config/snapshot-profiles.conf)')
+
+    # policy
+    p = sub.add_parser('policy', help='Show or set retention policies (global unless --instance is given)')
+    p.add_argument('--instance', help='Apply the policy to this instance only')
+    p.add_argument('--keep-last', type=retention_count, help='Keep the newest N snapshots (0 to unset)')
+    p.add_argument('--keep-daily', type=retention_count, help='Keep the newest snapshot of each of the last N days (0 to unset)')
+    p.add_argument('--keep-weekly', type=retention_count, help='Keep the newest snapshot of each of the last N weeks (0 to unset)')
+    p.add_argument('--max-total-mb', type=retention_count, help='Cap total snapshot size in MB, oldest removed first (0 to unset)')
+    p.add_argument('--clear', action='store_true', help='Remove the policy for this scope')
+
+    # prune
+    p = sub.add_parser('prune', help='Delete snapshots outside the retention policies')
+    p.add_argument('--dry-run', action='store_true', help='Show what would be removed without deleting')
+
+    return parser
+
+
+def build_backups_parser():
+    """Build argparse parser for backups subcommands"""
+    parser = argparse.ArgumentParser(
+        prog=f'{Path(sys.argv[0]).name} backups',
+        description='Inspect, restore and prune config backups',
+    )
+    sub = parser.add_subparsers(dest='backups_command')
+
+    # list
+    sub.add_parser('list', help='List backup runs, newest first')
+
+    # show
+    p = sub.add_parser('show', help='List the files in a backup run')
+    p.add_argument('run', help='Run id (from backups list)')
+
+    # restore
+    p = sub.add_parser('restore', help='Restore the files of a backup run')
+    p.add_argument('run', help='Run id (from backups list)')
+    p.add_argument('--file', action='append', help='Restore only this path (repeatable)')
+
+    # policy
+    p = sub.add_parser('policy', help='Show or set the backup retention policy')
+    p.add_argument('--keep-last', type=retention_count, help='Keep the newest N runs (0 to unset)')
+    p.add_argument('--max-age-days', type=retention_count, help='Drop runs older than N days (0 to unset)')
+
+    # prune
+    p = sub.add_parser('prune', help='Delete runs outside the retention policy and unreferenced files')
+    p.add_argument('--dry-run', action='store_true', help='Show what would be removed without deleting')
+
+    return parser
+
+
+def build_logs_parser():
+    """Build argparse parser for logs subcommands"""
+    parser = argparse.ArgumentParser(
+        prog=f'{Path(sys.argv[0]).name} logs',
+        description='Search the persistent log index kept by the controller (LOG_INDEX=1)',
+    )
+    sub = parser.add_subparsers(dest='logs_command')
+
+    # search
+    p = sub.add_parser('search', help='Full-text search across all instances and base services')
+    p.add_argument('query', nargs='*', help='FTS5 query, e.g. fatal AND error, or "connection refused"')
+    p.add_argument('--instance', help='Only this instance or base service')
+    p.add_argument('--since', help='ISO 8601 time (UTC) or relative: 30m, 2h, 1d')
+    p.add_argument('--until', help='ISO 8601 time (UTC) or relative: 30m, 2h, 1d')
+    p.add_argument('--limit', type=positive_int, default=100, help='Maximum matches, newest first (default: 100)')
+
+    # index
+    sub.add_parser('index', help='Show index partitions and size')
+
+    return parser
+
+
 def main():
     # Change to script directory first
     script_dir = Path(__file__).parent
@@ -135,6 +255,64 @@ def main():
             inst_parser.print_help()
         sys.exit(0)
 
+    if len(sys.argv) > 1 and sys.argv[1] == 'snapshots':
+        snap_parser = build_snapshots_parser()
+        args = snap_parser.parse_args(sys.argv[2:])
+
+        dispatch = {
+            'list': snapshots_list,
+            'policy': snapshots_policy,
+            'profiles': snapshots_profiles,
+            'prune': snapshots_prune,
+        }
+        handler = dispatch.get(args.snapshots_command)
+        if handler:
+            handler(args)
+        else:
+            snap_parser.print_help()
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'backups':
+        backups_parser = build_backups_parser()
+        args = backups_parser.parse_args(sys.argv[2:])
+
+        dispatch = {
+            'list': backups_list,
+            'show': backups_show,
+            'restore': backups_restore,
+            'policy': backups_policy,
+            'prune': backups_prune,
+        }
+        handler = dispatch.get(args.backups_command)
+        if handler:
+            handler(args)
+        else:
+            backups_parser.print_help()
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'logs':
+        logs_parser = build_logs_parser()
+        args = logs_parser.parse_args(sys.argv[2:])
+
+        dispatch = {
+            'search': logs_search,
+            'index': logs_index,
+        }
+        handler = dispatch.get(args.logs_command)
+        if handler:
+            handler(args)
+        else:
+            logs_parser.print_help()
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'verify':
+        verify_parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} verify',
+            description='Report generated files that were modified or removed since ssmd wrote them',
+        )
+        verify(verify_parser.parse_args(sys.argv[2:]))
+        sys.exit(0)
+
     # Config generation parser
     from lib.output import BANNER
     banner = BANNER
@@ -146,7 +324,11 @@ def main():
                '  %(prog)s --reset                       Remove all generated files\n'
                '  %(prog)s instance create --name v4-main --type v4 --subdomain v4\n'
                '  %(prog)s instance list\n'
-               '  %(prog)s instance destroy --name v4-main --drop-db\n',
+               '  %(prog)s instance destroy --name v4-main --drop-db\n'
+               '  %(prog)s snapshots prune --dry-run\n'
+               '  %(prog)s backups restore 20260404_120000\n'
+               '  %(prog)s logs search "connection refused" --since 2h\n'
+               '  %(prog)s verify\n',
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument('domain', nargs='?', default=None, help='Base domain (e.g., user196.online)')
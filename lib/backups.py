@@ -0,0 +1,321 @@
+"""Config backups — content-addressed blobs plus a small JSON index per run.
+
+    backups/objects/ab/ab12…   file contents, stored once per distinct SHA-256
+    backups/runs/<ts>.json     {created_at, reason, files: {path: {sha256, size, mtime_ns, mode}}}
+    backups/policy.json        retention (keep_last, max_age_days)
+
+Older versions copied each run flat into backups/<ts>/. Those directories are
+counted as runs by the retention policy, so 'backups prune' ages them out too.
+
+A run whose files are identical to the previous run is not recorded, and files
+whose size and mtime match the previous run are not even re-read, so repeated
+'./ssmd <domain>' runs cost almost nothing.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .output import Colors, print_colored, print_header
+
+BACKUPS_DIR = Path('backups')
+OBJECTS_DIR = BACKUPS_DIR / 'objects'
+RUNS_DIR = BACKUPS_DIR / 'runs'
+POLICY_FILE = BACKUPS_DIR / 'policy.json'
+
+BACKUP_POLICY_FIELDS = ('keep_last', 'max_age_days')
+DEFAULT_BACKUP_POLICY = {'keep_last': 20, 'max_age_days': None}
+
+RUN_ID_FORMAT = '%Y%m%d_%H%M%S'
+LEGACY_DIR_PATTERN = re.compile(r'^\d{8}_\d{6}$')
+
+
+def _blob_path(digest):
+    return OBJECTS_DIR / digest[:2] / digest
+
+
+def _write_file_atomic(path, data, mode):
+    """Write bytes via a temp file in the same directory + rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _store_blob(data):
+    digest = hashlib.sha256(data).hexdigest()
+    blob = _blob_path(digest)
+    if not blob.exists():
+        _write_file_atomic(blob, data, 0o600)
+    return digest
+
+
+# ─── Runs ────────────────────────────────────────────────────────────────────
+
+def list_runs():
+    """Run ids, newest first."""
+    if not RUNS_DIR.exists():
+        return []
+    return sorted((p.stem for p in RUNS_DIR.glob('*.json')), reverse=True)
+
+
+def list_legacy_backups():
+    """Timestamped backups/<ts>/ directories left by older versions, newest first."""
+    if not BACKUPS_DIR.exists():
+        return []
+    return sorted((p.name for p in BACKUPS_DIR.iterdir() if p.is_dir() and LEGACY_DIR_PATTERN.match(p.name)),
+                  reverse=True)
+
+
+def load_run(run_id):
+    """Index of one run, or None if it does not exist."""
+    try:
+        return json.loads((RUNS_DIR / f'{run_id}.json').read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _latest_run():
+    for run_id in list_runs():
+        run = load_run(run_id)
+        if run is not None:
+            return run_id, run
+    return None, None
+
+
+def _new_run_id():
+    base = datetime.now().strftime(RUN_ID_FORMAT)
+    run_id, n = base, 1
+    while (RUNS_DIR / f'{run_id}.json').exists():
+        n += 1
+        run_id = f'{base}_{n}'
+    return run_id
+
+
+def create_backup(paths, reason=''):
+    """Back up the existing files among paths as a new run.
+
+    Returns (run_id, files) where files lists the paths in the run. When every
+    file is unchanged since the latest run, that run's id is returned and
+    nothing is written. Returns (None, []) if none of the paths exist.
+    """
+    latest_id, latest = _latest_run()
+    previous = latest['files'] if latest else {}
+
+    files = {}
+    for p in paths:
+        path = Path(p)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_file():
+            continue
+        key = str(p)
+        prev = previous.get(key)
+        if prev and prev['size'] == st.st_size and prev['mtime_ns'] == st.st_mtime_ns \
+                and _blob_path(prev['sha256']).exists():
+            digest = prev['sha256']
+        else:
+            digest = _store_blob(path.read_bytes())
+        files[key] = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                      'mode': st.st_mode & 0o777}
+
+    if not files:
+        return None, []
+    if latest and {k: v['sha256'] for k, v in files.items()} == {k: v['sha256'] for k, v in previous.items()}:
+        return latest_id, list(files)
+
+    run_id = _new_run_id()
+    index = {'created_at': datetime.now().isoformat(timespec='seconds'), 'reason': reason, 'files': files}
+    _write_file_atomic(RUNS_DIR / f'{run_id}.json', json.dumps(index, indent=2).encode(), 0o600)
+    return run_id, list(files)
+
+
+def restore_run(run_id, paths=None):
+    """Write the files of a run back in place; returns the paths restored."""
+    run = load_run(run_id)
+    if run is None:
+        raise FileNotFoundError(f"backup run '{run_id}' not found")
+    restored = []
+    for rel, entry in run['files'].items():
+        if paths and rel not in paths:
+            continue
+        data = _blob_path(entry['sha256']).read_bytes()
+        _write_file_atomic(Path(rel), data, entry.get('mode', 0o644))
+        restored.append(rel)
+    return restored
+
+
+# ─── Retention ───────────────────────────────────────────────────────────────
+
+def load_backup_policy():
+    policy = dict(DEFAULT_BACKUP_POLICY)
+    try:
+        policy.update(json.loads(POLICY_FILE.read_text()))
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return policy
+
+
+def save_backup_policy(policy):
+    data = json.dumps({f: policy.get(f) for f in BACKUP_POLICY_FIELDS}, indent=2).encode()
+    _write_file_atomic(POLICY_FILE, data, 0o644)
+
+
+def plan_prune(run_ids, policy):
+    """Run ids (newest first) that fall outside policy. The newest run is always kept."""
+    keep_last = policy.get('keep_last')
+    max_age = policy.get('max_age_days')
+    cutoff = (datetime.now() - timedelta(days=max_age)).strftime(RUN_ID_FORMAT) if max_age else None
+    victims = []
+    for i, run_id in enumerate(run_ids):
+        if i == 0:
+            continue
+        if (keep_last and i >= keep_last) or (cutoff and run_id < cutoff):
+            victims.append(run_id)
+    return victims
+
+
+def prune_backups(policy=None, dry_run=False):
+    """Drop runs outside the retention policy, then objects no run refers to.
+
+    Legacy backups/<ts>/ directories take part as runs of their own.
+    Returns (runs removed, bytes freed).
+    """
+    legacy = set(list_legacy_backups())
+    victims = plan_prune(sorted(legacy.union(list_runs()), reverse=True), policy or load_backup_policy())
+    if dry_run:
+        return victims, 0
+    freed = 0
+    for run_id in victims:
+        if run_id in legacy:
+            legacy_dir = BACKUPS_DIR / run_id
+            freed += sum(f.stat().st_size for f in legacy_dir.rglob('*') if f.is_file())
+            shutil.rmtree(legacy_dir)
+        else:
+            (RUNS_DIR / f'{run_id}.json').unlink(missing_ok=True)
+    return victims, freed + collect_garbage()
+
+
+def collect_garbage():
+    """Delete objects that no run index references; returns bytes freed."""
+    if not OBJECTS_DIR.exists():
+        return 0
+    referenced = set()
+    for run_id in list_runs():
+        run = load_run(run_id)
+        if run is None:
+            return 0  # unreadable index: don't guess what it referenced
+        referenced.update(e['sha256'] for e in run['files'].values())
+    freed = 0
+    for blob in OBJECTS_DIR.glob('*/*'):
+        if blob.name not in referenced and not blob.name.endswith('.tmp'):
+            freed += blob.stat().st_size
+            blob.unlink()
+    return freed
+
+
+# ─── CLI handlers ────────────────────────────────────────────────────────────
+
+def _format_policy(policy):
+    parts = [f"{f}={policy[f]}" for f in BACKUP_POLICY_FIELDS if policy.get(f)]
+    return ', '.join(parts) or '(keep everything)'
+
+
+def backups_list(args):
+    """List backup runs"""
+    run_ids = list_runs()
+    legacy = list_legacy_backups()
+    if not run_ids and not legacy:
+        print_colored("No backups yet.", Colors.YELLOW)
+        return
+
+    print_header("Config Backups")
+    print(f"{'Run':<20} {'Files':>5}  {'Reason'}")
+    print("-" * 60)
+    for run_id in run_ids:
+        run = load_run(run_id) or {'files': {}, 'reason': '(unreadable index)'}
+        print(f"{run_id:<20} {len(run['files']):>5}  {run.get('reason') or '-'}")
+    stored = sum(b.stat().st_size for b in OBJECTS_DIR.glob('*/*')) if OBJECTS_DIR.exists() else 0
+    print(f"\n{len(run_ids)} run(s), {stored / 1024:.0f} KB stored. "
+          f"Retention: {_format_policy(load_backup_policy())}")
+    if legacy:
+        print(f"{len(legacy)} older backups/<timestamp>/ director{'y' if len(legacy) == 1 else 'ies'} "
+              f"(pruned under the same policy)")
+    print()
+
+
+def backups_show(args):
+    """List the files in one backup run"""
+    run = load_run(args.run)
+    if run is None:
+        print_colored(f"Error: Backup run '{args.run}' not found.", Colors.RED)
+        sys.exit(1)
+    print_header(f"Backup {args.run}")
+    print(f"Created: {run['created_at']}   Reason: {run.get('reason') or '-'}\n")
+    for rel, entry in sorted(run['files'].items()):
+        print(f"  {rel:<44} {entry['size']:>8} B  {entry['sha256'][:12]}")
+    print()
+
+
+def backups_restore(args):
+    """Restore the files of a backup run"""
+    run = load_run(args.run)
+    if run is None:
+        print_colored(f"Error: Backup run '{args.run}' not found.", Colors.RED)
+        sys.exit(1)
+    paths = set(args.file or [])
+    unknown = paths - set(run['files'])
+    if unknown:
+        print_colored(f"Error: Not in backup {args.run}: {', '.join(sorted(unknown))}", Colors.RED)
+        sys.exit(1)
+
+    # The current state becomes a run of its own, so a restore can be undone
+    current_id, _ = create_backup(paths or run['files'], reason=f'before restore of {args.run}')
+    restored = restore_run(args.run, paths)
+    for rel in restored:
+        print(f"  Restored: {rel}")
+    print_colored(f"Restored {len(restored)} file(s) from {args.run}.", Colors.GREEN)
+    if current_id:
+        print(f"Previous state kept as {current_id}.")
+
+
+def backups_policy(args):
+    """Show or set the backup retention policy"""
+    updates = {f: getattr(args, f) for f in BACKUP_POLICY_FIELDS if getattr(args, f) is not None}
+    policy = load_backup_policy()
+    if updates:
+        policy.update({f: (v or None) for f, v in updates.items()})
+        save_backup_policy(policy)
+        print_colored(f"Updated backup retention: {_format_policy(policy)}", Colors.GREEN)
+        return
+    print(f"Backup retention: {_format_policy(policy)}")
+
+
+def backups_prune(args):
+    """Delete backup runs outside the retention policy"""
+    victims, freed = prune_backups(dry_run=args.dry_run)
+    if not victims:
+        print_colored("Nothing to prune.", Colors.GREEN)
+        return
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    for run_id in victims:
+        print(f"  {verb}: {run_id}")
+    summary = f"{verb} {len(victims)} run(s)"
+    if not args.dry_run:
+        summary += f", freed {freed / 1024:.0f} KB"
+    print_colored(f"{summary}.", Colors.YELLOW if args.dry_run else Colors.GREEN)
@@ -9,13 +9,15 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
-
 from .output import Colors, print_colored, print_header, print_banner
 from .registry import (
     DEFAULT_SOURCE_PATHS,
-    detect_current_domain, load_registry, reset_registry,
+    detect_current_domain, load_manifest, load_registry, parse_env_file, reset_registry,
 )
+from .backups import create_backup, prune_backups
+from .manifest import remove_generated, track_files, untrack
+from .routes import remove_routes
+from .templates import content_hash, get_environment, render_template, write_atomic
 
 
 def validate_domain(domain):
@@ -23,50 +25,39 @@ def validate_domain(domain):
     return re.match(pattern, domain) is not None
 
 
-def backup_files(backup_dir):
-    files_to_backup = [
-        '.env',
-        'docker-compose.yml',
-        'docker-compose.override.yml',
-        'traefik/dynamic.yml',
-        'config/durango-apache.conf',
-        'config/orangescrum-apache.conf',
-        'php-trust-certs.sh',
-        'generate-certs.sh',
-        'build-images.sh',
-        'Dockerfile.base',
-        'Dockerfile.php7.2',
-        'Dockerfile.php8.3',
-    ]
-
-    backup_path = Path(backup_dir)
-    backup_path.mkdir(parents=True, exist_ok=True)
-
-    backed_up = []
-    for file_path in files_to_backup:
-        if Path(file_path).exists():
-            dest = backup_path / Path(file_path).name
-            shutil.copy2(file_path, dest)
-            backed_up.append(file_path)
-
-    return backed_up
-
-
-def backup_old_domain_files(old_domain, backup_dir):
-    old_files = list(Path('launchers').glob(f'*{old_domain}*'))
-    old_files.extend(Path('certs').glob(f'{old_domain}.*'))
-
-    if not old_files:
-        return
-
-    backup_path = Path(backup_dir)
-    print_colored(f"\nBacking up old domain files ({old_domain})...", Colors.YELLOW)
-    for file in old_files:
-        if file.exists():
-            dest = backup_path / file.name
-            shutil.copy2(file, dest)
-            file.unlink()
-            print(f"  Archived: {file.name}")
+# Outputs of generate_configurations — what a run backs up, and what reset
+# removes for projects generated before the manifest existed
+GENERATED_CONFIG_FILES = [
+    '.env',
+    'docker-compose.yml',
+    'docker-compose.override.yml',
+    'traefik/dynamic.yml',
+    'config/durango-apache.conf',
+    'config/orangescrum-apache.conf',
+    'config/instance-apache.conf',
+    'config/dnsmasq.conf',
+    'php-trust-certs.sh',
+    'generate-certs.sh',
+    'build-images.sh',
+    'entrypoints/browser-trust-certs.sh',
+    'Dockerfile.base',
+    'Dockerfile.php7.2',
+    'Dockerfile.php8.3',
+    'os-v2/.env',
+    'instances/shared.env',
+]
+
+
+def old_domain_files(old_domain):
+    """Launchers and certificates left behind by the previous domain."""
+    return sorted([*Path('launchers').glob(f'*{old_domain}*'), *Path('certs').glob(f'{old_domain}.*')])
+
+
+def backup_configs(reason, extra_files=()):
+    """Back up the generated configs (plus extra_files) and apply the retention policy."""
+    run_id, files = create_backup([*GENERATED_CONFIG_FILES, *map(str, extra_files)], reason)
+    prune_backups()
+    return run_id, files
 
 
 def generate_configurations(domain, dry_run=False, interactive=False, enable_https=False):
@@ -82,7 +73,7 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
         print(f"  Current: {current_domain}")
         print(f"  New:     {domain}")
         print("\nThis will:")
-        print(f"  - Backup old configs to backups/")
+        print(f"  - Back up current configs and old domain files (./ssmd backups list)")
         print(f"  - Remove old domain files ({current_domain})")
         print(f"  - Generate new configs for {domain}")
 
@@ -124,18 +115,18 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
     print(f"Mode: {'Dry run (review only)' if dry_run else 'Apply configurations'}\n")
 
     # Create backup
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = f"backups/{timestamp}"
-
     print_colored("Backing up existing configurations...", Colors.YELLOW)
-    backed_up = backup_files(backup_dir)
-    if backed_up:
-        print_colored(f"✓ Backups saved to {backup_dir}", Colors.GREEN)
-        for file in backed_up:
-            print(f"  - {file}")
-
-    if current_domain and current_domain != domain:
-        backup_old_domain_files(current_domain, backup_dir)
+    old_files = old_domain_files(current_domain) if current_domain and current_domain != domain else []
+    backup_run, backed_up = backup_configs(f"before './ssmd {domain}'", old_files)
+    if backup_run:
+        print_colored(f"✓ {len(backed_up)} file(s) backed up as {backup_run} "
+                      f"(restore: ./ssmd backups restore {backup_run})", Colors.GREEN)
+
+    if old_files:
+        print_colored(f"\nArchiving old domain files ({current_domain})...", Colors.YELLOW)
+        for file in old_files:
+            file.unlink(missing_ok=True)
+            print(f"  Archived: {file}")
 
     print()
 
@@ -145,12 +136,7 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
         print_colored(f"Error: Templates directory not found: {templates_dir}", Colors.RED)
         sys.exit(1)
 
-    env = Environment(
-        loader=FileSystemLoader(str(templates_dir)),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        keep_trailing_newline=True
-    )
+    env = get_environment(templates_dir)
 
     # Generate security salt
     try:
@@ -165,6 +151,10 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
             import uuid
             security_salt = hashlib.sha256(uuid.uuid4().bytes + uuid.uuid4().bytes).hexdigest()
 
+    # Re-use existing credentials: rotating them on every run would change .env
+    # (and the controller password) even when nothing else did
+    existing_env = parse_env_file(Path('.env'))
+
     context = {
         'domain': domain,
         'domain_prefix': domain_prefix,
@@ -174,6 +164,8 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
         'builder_uid': os.getuid(),
         'lan_ip': lan_ip,
         'security_salt': security_salt,
+        'controller_pass': existing_env.get('CONTROLLER_PASS') or security_salt[:24],
+        'traefik_provider_token': existing_env.get('TRAEFIK_PROVIDER_TOKEN') or security_salt[24:56],
         'port_offset': port_offset,
         'traefik_http_port': base_traefik_http,
         'traefik_https_port': base_traefik_https,
@@ -323,35 +315,38 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
     else:
         context['cache_engine'] = 'file'
 
+    # Besides where it is written, each output records what consumes it, so a
+    # re-run can say exactly what to restart:
+    #   services  — base compose services that bind-mount the file (restart them)
+    #   compose   — the compose project definition (docker compose up -d)
+    #   images    — baked into images (rebuild)
+    #   instances — read by every dynamic instance (restart instances)
     configs = [
-        {'template': '.env.j2', 'output': '.env', 'label': '.env'},
-        {'template': 'shared.env.j2', 'output': 'instances/shared.env', 'label': 'instances/shared.env'},
-        {'template': 'Dockerfile.base.j2', 'output': 'Dockerfile.base', 'label': 'Dockerfile.base'},
-        {'template': 'Dockerfile.php7.2.j2', 'output': 'Dockerfile.php7.2', 'label': 'Dockerfile.php7.2'},
-        {'template': 'Dockerfile.php8.3.j2', 'output': 'Dockerfile.php8.3', 'label': 'Dockerfile.php8.3'},
-        {'template': 'build-images.sh.j2', 'output': 'build-images.sh', 'label': 'build-images.sh'},
-        {'template': 'docker-compose.yml.j2', 'output': 'docker-compose.yml', 'label': 'docker-compose.yml'},
-        {'template': 'docker-compose.override.yml.j2', 'output': 'docker-compose.override.yml', 'label': 'docker-compose.override.yml'},
+        {'template': '.env.j2', 'output': '.env', 'label': '.env', 'compose': True},
+        {'template': 'shared.env.j2', 'output': 'instances/shared.env', 'label': 'instances/shared.env', 'instances': True},
+        {'template': 'Dockerfile.base.j2', 'output': 'Dockerfile.base', 'label': 'Dockerfile.base', 'images': True},
+        {'template': 'Dockerfile.php7.2.j2', 'output': 'Dockerfile.php7.2', 'label': 'Dockerfile.php7.2', 'images': True},
+        {'template': 'Dockerfile.php8.3.j2', 'output': 'Dockerfile.php8.3', 'label': 'Dockerfile.php8.3', 'images': True},
+        {'template': 'build-images.sh.j2', 'output': 'build-images.sh', 'label': 'build-images.sh', 'images': True},
+        {'template': 'docker-compose.yml.j2', 'output': 'docker-compose.yml', 'label': 'docker-compose.yml', 'compose': True},
+        {'template': 'docker-compose.override.yml.j2', 'output': 'docker-compose.override.yml', 'label': 'docker-compose.override.yml', 'compose': True},
         {'template': 'traefik-dynamic.yml.j2', 'output': 'traefik/dynamic.yml', 'label': 'traefik/dynamic.yml'},
-        {'template': 'durango-apache.conf.j2', 'output': 'config/durango-apache.conf', 'label': 'config/durango-apache.conf'},
-        {'template': 'orangescrum-apache.conf.j2', 'output': 'config/orangescrum-apache.conf', 'label': 'config/orangescrum-apache.conf'},
-        {'template': 'php-trust-certs.sh.j2', 'output': 'php-trust-certs.sh', 'label': 'php-trust-certs.sh'},
+        {'template': 'durango-apache.conf.j2', 'output': 'config/durango-apache.conf', 'label': 'config/durango-apache.conf', 'images': True},
+        {'template': 'orangescrum-apache.conf.j2', 'output': 'config/orangescrum-apache.conf', 'label': 'config/orangescrum-apache.conf', 'services': ['orangescrum']},
+        {'template': 'php-trust-certs.sh.j2', 'output': 'php-trust-certs.sh', 'label': 'php-trust-certs.sh', 'images': True},
         {'template': 'generate-certs.sh.j2', 'output': 'generate-certs.sh', 'label': 'generate-certs.sh'},
-        {'template': 'os-v2.env.j2', 'output': 'os-v2/.env', 'label': 'os-v2/.env'},
-        {'template': 'dnsmasq.conf.j2', 'output': 'config/dnsmasq.conf', 'label': 'config/dnsmasq.conf'},
-        {'template': 'browser-trust-certs.sh.j2', 'output': 'entrypoints/browser-trust-certs.sh', 'label': 'entrypoints/browser-trust-certs.sh'},
-        {'template': 'instance-apache.conf.j2', 'output': 'config/instance-apache.conf', 'label': 'config/instance-apache.conf'},
+        {'template': 'os-v2.env.j2', 'output': 'os-v2/.env', 'label': 'os-v2/.env', 'services': ['orangescrum']},
+        {'template': 'dnsmasq.conf.j2', 'output': 'config/dnsmasq.conf', 'label': 'config/dnsmasq.conf', 'services': ['dns']},
+        {'template': 'browser-trust-certs.sh.j2', 'output': 'entrypoints/browser-trust-certs.sh', 'label': 'entrypoints/browser-trust-certs.sh', 'services': ['browser']},
+        {'template': 'instance-apache.conf.j2', 'output': 'config/instance-apache.conf', 'label': 'config/instance-apache.conf', 'instances': True},
     ]
 
-    if dry_run:
-        for config in configs:
-            config['output'] = config['output'] + '.new'
-
-    generated_files = []
+    # Render everything in memory first; only outputs whose content differs
+    # (ignoring the '# Generated:' timestamp) are written, atomically
+    changed, unchanged = [], []
+    written = {}
     for config in configs:
         try:
-            print_colored(f"Generating {config['label']}...", Colors.BLUE)
-
             template = env.get_template(config['template'])
 
             render_context = context.copy()
@@ -361,31 +356,33 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
             output_content = template.render(render_context)
 
             output_path = Path(config['output'])
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            output_path.write_text(output_content)
+            if output_path.exists() and content_hash(output_path.read_text()) == content_hash(output_content):
+                unchanged.append(config)
+                if not dry_run:
+                    written[output_path] = output_content
+                continue
 
-            if output_path.suffix == '.sh' or (output_path.suffix == '.new' and '.sh' in config['output']):
-                output_path.chmod(0o755)
+            if dry_run:
+                output_path = output_path.with_name(output_path.name + '.new')
+            mode = 0o755 if config['output'].endswith('.sh') else None
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(output_path, output_content, mode)
+            written[output_path] = output_content
 
-            generated_files.append(config['output'])
-            print_colored(f"✓ Generated {config['output']}", Colors.GREEN)
+            changed.append(config)
+            print_colored(f"✓ {'Would update' if dry_run else 'Updated'} {config['label']}", Colors.GREEN)
 
         except Exception as e:
             print_colored(f"✗ Error generating {config['label']}: {e}", Colors.RED)
             sys.exit(1)
 
-    def safe_copy_env(src_path, target_path):
-        src = Path(src_path)
-        tgt = Path(target_path)
-        if not src.exists():
-            return False
-        if tgt.exists():
-            bkp = Path(backup_dir) / f"{tgt.name}.bak"
-            shutil.copy2(tgt, bkp)
-        tgt.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src, tgt)
-        return True
+    track_files(written)
+    if not dry_run:
+        # A real run supersedes dry-run previews: remove them along with their manifest entries
+        previews = [Path(f"{c['output']}.new") for c in configs]
+        for preview in previews:
+            preview.unlink(missing_ok=True)
+        untrack(previews)
 
     if not dry_run:
         for app_logs in ['apps/orangescrum-v4/logs', 'apps/orangescrum/logs', 'apps/durango-pg/logs', '.composer-cache', 'snapshots']:
@@ -398,27 +395,55 @@ def generate_configurations(domain, dry_run=False, interactive=False, enable_htt
 
     # Summary
     print_header("Configuration Generation Complete!")
-    print("Generated files:")
-    for file in generated_files:
-        print(f"  - {file}")
-    print(f"\nBackups saved to: {backup_dir}\n")
+    if changed:
+        print("Changed files:")
+        for config in changed:
+            print(f"  - {config['output']}")
+    else:
+        print_colored("No configuration changes.", Colors.GREEN)
+    if unchanged:
+        print(f"Unchanged: {len(unchanged)} file(s)")
+    if backup_run:
+        print(f"\nBackup: {backup_run}  (./ssmd backups restore {backup_run})\n")
+    else:
+        print()
 
     if dry_run:
-        print_colored("Review the generated files (*.new) before applying.", Colors.YELLOW)
-        print(f"\nTo apply the configurations, run:")
-        print(f"  {sys.argv[0]} {domain}")
-        print("\nOr manually:")
-        for config in configs:
-            src = config['output']
-            dest = src.replace('.new', '')
-            print(f"  mv {src} {dest}")
+        if changed:
+            print_colored("Review the generated files (*.new) before applying.", Colors.YELLOW)
+            print(f"\nTo apply the configurations, run:")
+            print(f"  {sys.argv[0]} {domain}")
+            print("\nOr manually:")
+            for config in changed:
+                print(f"  mv {config['output']}.new {config['output']}")
     else:
         print_colored("✓ Configurations applied!", Colors.GREEN)
+        if current_domain and changed:
+            print_apply_steps(changed)
         print_next_steps(domain, context['services'], enable_https)
 
     print()
 
 
+def print_apply_steps(changed):
+    """Print the minimal commands that pick up the changed outputs."""
+    services = sorted({svc for c in changed for svc in c.get('services', [])})
+    steps = []
+    if any(c.get('images') for c in changed):
+        steps.append('./build-images.sh all                 # Dockerfiles / baked-in files changed')
+    if any(c.get('compose') for c in changed):
+        steps.append('docker compose up -d                  # recreates only services whose definition changed')
+    if services:
+        steps.append(f"docker compose restart {' '.join(services)}")
+    if any(c.get('instances') for c in changed):
+        steps.append('./ssmd instance stop/start --name <name>   # instances read shared.env / instance-apache.conf')
+    if not steps:
+        return
+    print_colored("\nTo pick up the changes:", Colors.BLUE)
+    for step in steps:
+        print(f"  {step}")
+
+
 def print_next_steps(domain, services, enable_https=True):
     protocol = 'https' if enable_https else 'http'
     access_points = [
@@ -431,26 +456,17 @@ def print_next_steps(domain, services, enable_https=True):
         {"name": "VNC Browser", "url": "http://localhost:3000"},
     ]
 
-    templates_dir = Path('templates')
-    env = Environment(
-        loader=FileSystemLoader(str(templates_dir)),
-        trim_blocks=True,
-        lstrip_blocks=True
-    )
-
-    template = env.get_template('next-steps.txt.j2')
-    output = template.render(domain=domain, access_points=access_points, services=services)
-    print(output)
+    output = render_template('next-steps.txt.j2', domain=domain, access_points=access_points, services=services)
+    print(output, end='' if output.endswith('\n') else '\n')
 
 
 def handle_reset():
     """Handle reset operation"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = f"backups/{timestamp}"
     print_header("Reset: backing up and removing generated files")
-    backed_up = backup_files(backup_dir)
-    if backed_up:
-        print_colored(f"Backed up {len(backed_up)} files to {backup_dir}", Colors.GREEN)
+    backup_run, backed_up = backup_configs('before reset')
+    if backup_run:
+        print_colored(f"Backed up {len(backed_up)} files as {backup_run} "
+                      f"(restore: ./ssmd backups restore {backup_run})", Colors.GREEN)
     else:
         print_colored("No generated config files found to backup.", Colors.YELLOW)
 
@@ -467,37 +483,6 @@ def handle_reset():
         except Exception:
             print_colored("  Warning: Could not stop base services.", Colors.YELLOW)
 
-    files_to_remove = [
-        '.env',
-        'docker-compose.yml',
-        'docker-compose.override.yml',
-        'traefik/dynamic.yml',
-        'config/durango-apache.conf',
-        'config/orangescrum-apache.conf',
-        'config/instance-apache.conf',
-        'config/dnsmasq.conf',
-        'php-trust-certs.sh',
-        'generate-certs.sh',
-        'build-images.sh',
-        'entrypoints/browser-trust-certs.sh',
-        'Dockerfile.base',
-        'Dockerfile.php7.2',
-        'Dockerfile.php8.3',
-        'os-v2/.env',
-    ]
-
-    for f in files_to_remove:
-        p = Path(f)
-        try:
-            if p.exists():
-                if p.is_dir():
-                    shutil.rmtree(p)
-                else:
-                    p.unlink()
-                print_colored(f"Removed: {f}", Colors.GREEN)
-        except Exception as e:
-            print_colored(f"Could not remove {f}: {e}", Colors.YELLOW)
-
     # Stop and remove all instances
     registry = load_registry()
     for inst_name, inst in registry.get('instances', {}).items():
@@ -532,41 +517,29 @@ def handle_reset():
             shutil.rmtree(inst_dir)
             print_colored(f"  Removed instances/{inst_name}/", Colors.GREEN)
 
+    # Remove generated files — straight from the manifest, so nothing outside
+    # what ssmd wrote is scanned. Projects generated before the manifest
+    # existed fall back to the known output list (and their .new siblings).
+    manifest = load_manifest()
+    if not manifest:
+        manifest = [{'path': f, 'kind': 'file'}
+                    for out in GENERATED_CONFIG_FILES for f in (out, f"{out}.new")]
+    for f in remove_generated(manifest):
+        print_colored(f"Removed: {f}", Colors.GREEN)
+
+    # Remove generated instance traefik routes (before the registry: nothing
+    # may touch registry.db once it is gone)
+    for f in remove_routes():
+        print_colored(f"Removed: {f}", Colors.GREEN)
+
     # Reset registry
     reset_registry()
     print_colored("Instance registry reset.", Colors.GREEN)
 
-    # Remove generated instance traefik configs
-    try:
-        traefik_dir = Path('traefik')
-        if traefik_dir.exists():
-            for lf in traefik_dir.glob('instance-*.yml'):
-                try:
-                    lf.unlink()
-                    print_colored(f"Removed: {lf}", Colors.GREEN)
-                except Exception as e:
-                    print_colored(f"Could not remove {lf}: {e}", Colors.YELLOW)
-    except Exception:
-        pass
-
     # Remove worktrees directory
     worktrees_dir = Path('apps') / 'worktrees'
     if worktrees_dir.exists():
         shutil.rmtree(worktrees_dir, ignore_errors=True)
         print_colored(f"Removed: apps/worktrees/", Colors.GREEN)
 
-    # Remove any generated .new files
-    try:
-        new_files = list(Path('.').rglob('*.new'))
-        for nf in new_files:
-            if 'backups' in nf.parts:
-                continue
-            try:
-                nf.unlink()
-                print_colored(f"Removed: {nf}", Colors.GREEN)
-            except Exception as e:
-                print_colored(f"Could not remove {nf}: {e}", Colors.YELLOW)
-    except Exception:
-        pass
-
     print_colored("Reset complete.", Colors.BLUE)
@@ -1,17 +1,89 @@
 """Database operations — setup (migrations/seeds), snapshot, restore."""
 
 import argparse
+import hashlib
+import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 from .output import Colors, print_colored, print_header
-from .registry import load_registry, get_project_context
+from .registry import load_registry, get_project_context, set_migrations_fingerprint
+from .snapshots import catalog_snapshot, load_snapshot_profiles, snapshot_filename
+
+
+MIGRATION_DIRS = ('config/Migrations', 'config/Seeds')
+
+
+def migrations_fingerprint(source_path):
+    """Hash the migration and seed files of an app checkout (including plugins).
+
+    Returns None when the source has no migrations, so callers never skip on it.
+    """
+    root = Path(source_path)
+    dirs = [root / d for d in MIGRATION_DIRS]
+    dirs += [plugin / d for plugin in sorted(root.glob('plugins/*')) for d in MIGRATION_DIRS]
+    h = hashlib.sha256()
+    found = False
+    for base in dirs:
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for fname in sorted(filenames):
+                f = Path(dirpath) / fname
+                h.update(str(f.relative_to(root)).encode() + b'\0')
+                h.update(hashlib.sha256(f.read_bytes()).digest())
+                found = True
+    return h.hexdigest() if found else None
+
+
+def _exec_streaming(container, cmd, on_line):
+    """Run a command in a container, passing each output line to on_line. Returns the exit code."""
+    proc = subprocess.Popen(
+        ['docker', 'exec', container, *cmd],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    for line in proc.stdout:
+        on_line(line.rstrip('\n'))
+    return proc.wait()
+
+
+def _db_setup_one(name, container, skip_seed, on_line, fingerprint=None):
+    """Run migrations (and seeds) for one instance. Returns a summary dict.
+
+    The fingerprint is recorded only after a full run (migrations and seeds
+    both succeeded), so a --skip-seed run never marks seeds as applied.
+    """
+    started = time.monotonic()
+    result = {'name': name, 'migrations': 'failed', 'seeds': 'skipped', 'duration': 0.0}
+    try:
+        if _exec_streaming(container, ['php', 'bin/cake.php', 'migrations', 'migrate'], on_line) == 0:
+            result['migrations'] = 'ok'
+            if not skip_seed:
+                code = _exec_streaming(container, ['php', 'bin/cake.php', 'migrations', 'seed'], on_line)
+                result['seeds'] = 'ok' if code == 0 else 'warning'
+                if code == 0 and fingerprint:
+                    set_migrations_fingerprint(name, fingerprint)
+    except FileNotFoundError:
+        on_line("docker not found")
+    result['duration'] = time.monotonic() - started
+    return result
+
+
+def _is_unchanged(inst, fingerprint):
+    return bool(fingerprint) and inst.get('migrations_fingerprint') == fingerprint
 
 
 def instance_db_setup(args):
-    """Run database migrations and seeds for an instance"""
+    """Run database migrations and seeds for an instance (or the whole fleet with --all)"""
+    if args.all:
+        return _fleet_db_setup(args)
+
     registry = load_registry()
     name = args.name
 
@@ -20,37 +92,88 @@ def instance_db_setup(args):
         sys.exit(1)
 
     ctx = get_project_context()
-    container = f"{ctx['domain_prefix']}-{name}"
+    inst = registry['instances'][name]
+    container = inst.get('container_name', f"{ctx['domain_prefix']}-{name}")
+    fingerprint = migrations_fingerprint(inst.get('source_path', ''))
 
     print_header(f"Database Setup: {name}")
 
-    print_colored("Running migrations...", Colors.BLUE)
-    try:
-        result = subprocess.run([
-            'docker', 'exec', container, 'php', 'bin/cake.php', 'migrations', 'migrate'
-        ], check=True, capture_output=True, text=True)
-        print(result.stdout)
-        print_colored("  Migrations complete.", Colors.GREEN)
-    except subprocess.CalledProcessError as e:
-        print_colored(f"  Migration failed: {e.stderr}", Colors.RED)
+    if not args.force and _is_unchanged(inst, fingerprint):
+        print_colored("Migrations and seeds unchanged since the last setup — nothing to do.", Colors.GREEN)
+        print("  Use --force to run them anyway.")
+        print()
         return
 
-    if not args.skip_seed:
-        print_colored("Running seeders...", Colors.BLUE)
-        try:
-            result = subprocess.run([
-                'docker', 'exec', container, 'php', 'bin/cake.php', 'migrations', 'seed'
-            ], check=True, capture_output=True, text=True)
-            print(result.stdout)
-            print_colored("  Seeders complete.", Colors.GREEN)
-        except subprocess.CalledProcessError as e:
-            print_colored(f"  Seeder warning: {e.stderr}", Colors.YELLOW)
+    print_colored("Running migrations and seeders...", Colors.BLUE)
+    result = _db_setup_one(name, container, args.skip_seed, print, fingerprint)
+    if result['migrations'] != 'ok':
+        print_colored("  Migration failed.", Colors.RED)
+        return
+    print_colored("  Migrations complete.", Colors.GREEN)
+    if result['seeds'] == 'ok':
+        print_colored("  Seeders complete.", Colors.GREEN)
+    elif result['seeds'] == 'warning':
+        print_colored("  Seeder warning (see output above).", Colors.YELLOW)
 
     print()
     print_colored(f"Database setup complete for '{name}'.", Colors.GREEN)
     print()
 
 
+def _fleet_db_setup(args):
+    """Run db-setup across all running instances concurrently"""
+    registry = load_registry()
+    ctx = get_project_context()
+    instances = {
+        name: inst for name, inst in registry.get('instances', {}).items()
+        if not args.type or inst['type'] == args.type
+    }
+    running = sorted(n for n, inst in instances.items() if inst.get('status', 'running') == 'running')
+    stopped = sorted(set(instances) - set(running))
+
+    fingerprints = {n: migrations_fingerprint(instances[n].get('source_path', '')) for n in running}
+    unchanged = [] if args.force else [n for n in running if _is_unchanged(instances[n], fingerprints[n])]
+    targets = [n for n in running if n not in unchanged]
+
+    if unchanged:
+        print_colored(f"Unchanged since last setup (use --force to include): {', '.join(unchanged)}", Colors.GREEN)
+    if not targets:
+        print_colored("No running instances need migrating.", Colors.YELLOW)
+        return
+
+    parallel = max(1, args.parallel)
+    print_header(f"Database Setup: {len(targets)} instance(s), {min(parallel, len(targets))} at a time")
+    if stopped:
+        print_colored(f"Skipping stopped instances: {', '.join(stopped)}", Colors.YELLOW)
+
+    width = max(len(n) for n in targets)
+    print_lock = threading.Lock()
+
+    def run(name):
+        def on_line(line):
+            with print_lock:
+                print(f"{Colors.CYAN}{name:<{width}}{Colors.NC} | {line}")
+        container = instances[name].get('container_name', f"{ctx['domain_prefix']}-{name}")
+        return _db_setup_one(name, container, args.skip_seed, on_line, fingerprints[name])
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        results = list(pool.map(run, targets))
+
+    print_header("Summary")
+    print(f"{'Instance':<{max(width, 8)}}  {'Migrations':<10}  {'Seeds':<8}  {'Duration':>8}")
+    print("-" * (max(width, 8) + 34))
+    for r in results:
+        color = Colors.GREEN if r['migrations'] == 'ok' else Colors.RED
+        print(f"{color}{r['name']:<{max(width, 8)}}  {r['migrations']:<10}  {r['seeds']:<8}  {r['duration']:>7.1f}s{Colors.NC}")
+    print()
+
+    failed = [r['name'] for r in results if r['migrations'] != 'ok']
+    if failed:
+        print_colored(f"Migrations failed for: {', '.join(failed)}", Colors.RED)
+        sys.exit(1)
+    print_colored(f"Database setup complete for {len(results)} instance(s).", Colors.GREEN)
+
+
 def instance_db_snapshot(args):
     """Create a pg_dump snapshot of an instance's database"""
     registry = load_registry()
@@ -66,17 +189,25 @@ def instance_db_snapshot(args):
     db_name = inst['db_name']
     db_user = inst.get('db_user', 'postgres')
 
+    profile = args.profile
+    profiles = load_snapshot_profiles()
+    if profile not in profiles:
+        print_colored(f"Error: Unknown snapshot profile '{profile}'. Available: {', '.join(profiles)}", Colors.RED)
+        sys.exit(1)
+
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = args.output or f"snapshots/{db_name}_{timestamp}.sql.gz"
+    output_file = args.output or f"snapshots/{snapshot_filename(db_name, timestamp, profile)}"
     Path(output_file).parent.mkdir(parents=True, exist_ok=True)
 
     print_header(f"Database Snapshot: {name}")
     print(f"Database: {db_name}")
+    print(f"Profile: {profile}")
     print(f"Output: {output_file}")
 
     try:
         dump_cmd = subprocess.Popen(
-            ['docker', 'exec', pg_container, 'pg_dump', '-U', db_user, '--no-owner', '--no-acl', db_name],
+            ['docker', 'exec', pg_container, 'pg_dump', '-U', db_user, '--no-owner', '--no-acl',
+             *profiles[profile]['pg_dump_args'], db_name],
             stdout=subprocess.PIPE
         )
         with open(output_file, 'wb') as f:
@@ -88,6 +219,7 @@ def instance_db_snapshot(args):
             print_colored("Error: pg_dump failed.", Colors.RED)
             sys.exit(1)
 
+        catalog_snapshot(output_file, name, db_name, profile)
         file_size = Path(output_file).stat().st_size
         print_colored(f"Snapshot saved: {output_file} ({file_size // 1024} KB)", Colors.GREEN)
     except Exception as e:
@@ -139,10 +271,12 @@ def instance_db_restore(args):
         gunzip = subprocess.Popen(['gunzip', '-c', snapshot], stdout=subprocess.PIPE)
         psql = subprocess.Popen(
             ['docker', 'exec', '-i', pg_container, 'psql', '-U', db_user, '-d', db_name],
-            stdin=gunzip.stdout, capture_output=True, text=True
+            stdin=gunzip.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         )
         gunzip.stdout.close()
         stdout, stderr = psql.communicate()
+        # The schema is now whatever the snapshot had, so the next db-setup must run
+        set_migrations_fingerprint(name, '')
 
         if psql.returncode != 0:
             print_colored(f"Warning: psql returned {psql.returncode}", Colors.YELLOW)
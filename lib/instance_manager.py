@@ -10,14 +10,15 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
-
 from .output import Colors, print_colored, print_header
 from .registry import (
     RESERVED_SUBDOMAINS, DEFAULT_SOURCE_PATHS,
     load_registry, save_registry, get_project_context,
 )
 from .database import instance_db_restore
+from .manifest import KIND_WORKTREE, track_dirs, track_files, untrack
+from .routes import ROUTES_FILE, http_provider_enabled, publish_routes
+from .templates import get_environment
 
 
 def instance_create(args):
@@ -127,13 +128,7 @@ def instance_create(args):
     print(f"Database: {db_name}")
     print()
 
-    templates_dir = Path('templates')
-    env = Environment(
-        loader=FileSystemLoader(str(templates_dir)),
-        trim_blocks=True,
-        lstrip_blocks=True,
-        keep_trailing_newline=True
-    )
+    env = get_environment()
 
     template_context = {
         'instance_name': name,
@@ -161,21 +156,21 @@ def instance_create(args):
     instance_dir = Path(f'instances/{name}')
     instance_dir.mkdir(parents=True, exist_ok=True)
 
+    generated = {}
     print_colored("Generating instance .env...", Colors.BLUE)
     tpl = env.get_template('instance.env.j2')
-    (instance_dir / '.env').write_text(tpl.render(template_context))
+    generated[instance_dir / '.env'] = tpl.render(template_context)
+    (instance_dir / '.env').write_text(generated[instance_dir / '.env'])
     print_colored(f"  Generated instances/{name}/.env", Colors.GREEN)
 
     print_colored("Generating instance docker-compose.yml...", Colors.BLUE)
     tpl = env.get_template('instance-docker-compose.yml.j2')
-    (instance_dir / 'docker-compose.yml').write_text(tpl.render(template_context))
+    generated[instance_dir / 'docker-compose.yml'] = tpl.render(template_context)
+    (instance_dir / 'docker-compose.yml').write_text(generated[instance_dir / 'docker-compose.yml'])
     print_colored(f"  Generated instances/{name}/docker-compose.yml", Colors.GREEN)
 
-    print_colored("Generating Traefik routing config...", Colors.BLUE)
-    tpl = env.get_template('instance-traefik.yml.j2')
-    traefik_file = Path(f'traefik/instance-{name}.yml')
-    traefik_file.write_text(tpl.render(template_context))
-    print_colored(f"  Generated traefik/instance-{name}.yml (auto-discovered by Traefik)", Colors.GREEN)
+    track_dirs([instance_dir], owner=name)
+    track_files(generated, owner=name)
 
     # Create database
     print_colored("Creating PostgreSQL database...", Colors.BLUE)
@@ -251,9 +246,17 @@ def instance_create(args):
     if branch:
         inst_record['branch'] = branch
         inst_record['worktree_path'] = str(worktree_path)
+        track_dirs([worktree_path], owner=name, kind=KIND_WORKTREE)
     registry['instances'][name] = inst_record
     save_registry(registry)
 
+    print_colored("Publishing Traefik route...", Colors.BLUE)
+    publish_routes(registry)
+    if http_provider_enabled():
+        print_colored("  Picked up from the registry by the controller's Traefik provider", Colors.GREEN)
+    else:
+        print_colored(f"  Updated {ROUTES_FILE} (auto-discovered by Traefik)", Colors.GREEN)
+
     protocol = 'https' if ctx['enable_https'] else 'http'
     print()
     print_colored("Instance created successfully!", Colors.GREEN)
@@ -363,11 +366,6 @@ def instance_destroy(args):
         except (subprocess.CalledProcessError, FileNotFoundError):
             print_colored("  Warning: Could not stop container.", Colors.YELLOW)
 
-    traefik_file = Path(f'traefik/instance-{name}.yml')
-    if traefik_file.exists():
-        traefik_file.unlink()
-        print_colored(f"  Removed traefik/instance-{name}.yml", Colors.GREEN)
-
     if args.drop_db:
         db_name = inst.get('db_name', '')
         if db_name:
@@ -414,6 +412,9 @@ def instance_destroy(args):
 
     del registry['instances'][name]
     save_registry(registry)
+    untrack(owner=name)
+    if publish_routes(registry):
+        print_colored(f"  Removed route from {ROUTES_FILE}", Colors.GREEN)
 
     print()
     print_colored(f"Instance '{name}' destroyed.", Colors.GREEN)
@@ -0,0 +1,109 @@
+"""Log index search — reads the controller's day-partitioned FTS5 files in log-index/."""
+
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .output import Colors, print_colored, print_header
+
+LOG_INDEX_DIR = Path('log-index')
+
+_RELATIVE_TIME_RE = re.compile(r'^(\d+)([smhd])$')
+_RELATIVE_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def to_docker_ts(value):
+    """Docker-style UTC timestamp from ISO 8601 (UTC unless an offset is given) or '30m'/'2h'/'1d' ago."""
+    match = _RELATIVE_TIME_RE.match(value)
+    if match:
+        dt = datetime.now(timezone.utc) - timedelta(**{_RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+    else:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f'{dt.microsecond:06d}000Z'
+
+
+def partitions():
+    """Day files, newest first."""
+    if not LOG_INDEX_DIR.exists():
+        return []
+    return sorted(LOG_INDEX_DIR.glob('????-??-??.db'), reverse=True)
+
+
+def search(q='', source=None, since=None, until=None, limit=100):
+    """Newest-first matches; partitions outside [since, until] are never opened."""
+    hits = []
+    for path in partitions():
+        day = path.stem
+        if until and day > until[:10]:
+            continue
+        if since and day < since[:10]:
+            break
+        where, params = [], []
+        if q:
+            where.append('lines MATCH ?')
+            params.append(q)
+        for clause, value in (('source = ?', source), ('ts >= ?', since), ('ts <= ?', until)):
+            if value:
+                where.append(clause)
+                params.append(value)
+        sql = 'SELECT ts, source, line FROM lines'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY rowid DESC LIMIT ?'
+        params.append(limit - len(hits))
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            hits.extend(db.execute(sql, params).fetchall())
+        finally:
+            db.close()
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+# ─── CLI handlers ────────────────────────────────────────────────────────────
+
+def logs_search(args):
+    """Search indexed logs across all instances"""
+    if not partitions():
+        print_colored("The log index is empty. Set LOG_INDEX=1 in .env and restart the controller "
+                      "(docker compose up -d controller).", Colors.YELLOW)
+        return
+    try:
+        since = to_docker_ts(args.since) if args.since else None
+        until = to_docker_ts(args.until) if args.until else None
+    except ValueError as e:
+        print_colored(f"Error: Invalid time: {e}", Colors.RED)
+        sys.exit(1)
+    try:
+        hits = search(' '.join(args.query), args.instance, since, until, args.limit)
+    except sqlite3.OperationalError as e:
+        print_colored(f"Error: Invalid query: {e}", Colors.RED)
+        sys.exit(1)
+
+    if not hits:
+        print_colored("No matches.", Colors.YELLOW)
+        return
+    width = max(len(src) for _, src, _ in hits)
+    for ts, src, line in reversed(hits):  # oldest first, like a log
+        print(f"{Colors.DIM}{ts[:23]}{Colors.NC} {Colors.BLUE}{src:<{width}}{Colors.NC} {line}")
+    if len(hits) == args.limit:
+        print_colored(f"\nShowing the newest {args.limit} matches; narrow the query or raise --limit.", Colors.YELLOW)
+
+
+def logs_index(args):
+    """Show log index partitions"""
+    parts = partitions()
+    if not parts:
+        print_colored("The log index is empty.", Colors.YELLOW)
+        return
+    print_header("Log Index")
+    total = 0
+    for path in parts:
+        size = sum(p.stat().st_size for p in (path, path.with_name(path.name + '-wal')) if p.exists())
+        total += size
+        print(f"  {path.stem}  {size / 1024 / 1024:>8.1f} MB")
+    print(f"\n{len(parts)} day(s), {total / 1024 / 1024:.1f} MB total\n")
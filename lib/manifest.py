@@ -0,0 +1,82 @@
+"""Generated-file manifest — what ssmd wrote, for drift detection (verify) and reset."""
+
+import shutil
+import sys
+from pathlib import Path
+
+from .output import Colors, print_colored, print_header
+from .registry import load_manifest, record_generated, forget_generated
+from .templates import content_hash
+
+KIND_FILE = 'file'
+KIND_DIR = 'dir'
+KIND_WORKTREE = 'worktree'
+
+
+def track_files(files, owner=''):
+    """Record generated files; files maps path -> the content that was written."""
+    record_generated([{'path': str(path), 'kind': KIND_FILE, 'owner': owner, 'sha256': content_hash(content)}
+                      for path, content in files.items()])
+
+
+def track_dirs(paths, owner='', kind=KIND_DIR):
+    record_generated([{'path': str(p), 'kind': kind, 'owner': owner} for p in paths])
+
+
+def untrack(paths=None, owner=None):
+    forget_generated(paths=[str(p) for p in paths or []], owner=owner)
+
+
+def entry_state(entry):
+    """'ok', 'missing' or 'modified' for one manifest entry."""
+    path = Path(entry['path'])
+    if entry['kind'] != KIND_FILE:
+        return 'ok' if path.is_dir() else 'missing'
+    try:
+        text = path.read_text()
+    except FileNotFoundError:
+        return 'missing'
+    except UnicodeDecodeError:
+        return 'modified'
+    return 'ok' if not entry['sha256'] or content_hash(text) == entry['sha256'] else 'modified'
+
+
+def remove_generated(entries):
+    """Delete the listed artifacts; returns the paths actually removed."""
+    removed = []
+    # Files first, then directories deepest-first, so nothing is removed twice
+    for entry in sorted(entries, key=lambda e: (e['kind'] != KIND_FILE, -len(Path(e['path']).parts))):
+        path = Path(entry['path'])
+        try:
+            if entry['kind'] == KIND_FILE and path.is_file():
+                path.unlink()
+            elif entry['kind'] != KIND_FILE and path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                continue
+            removed.append(entry['path'])
+        except OSError as e:
+            print_colored(f"Could not remove {path}: {e}", Colors.YELLOW)
+    return removed
+
+
+def verify(args):
+    """Compare generated files with the manifest"""
+    entries = load_manifest()
+    if not entries:
+        print_colored("Nothing tracked yet. Run './ssmd <domain>' to generate configs.", Colors.YELLOW)
+        return
+
+    drift = [(e, state) for e in entries if (state := entry_state(e)) != 'ok']
+    print_header("Generated Files")
+    for e, state in drift:
+        color = Colors.RED if state == 'missing' else Colors.YELLOW
+        owner = f"  ({e['owner']})" if e['owner'] else ''
+        print_colored(f"  {state:<9} {e['path']}{owner}", color)
+
+    if not drift:
+        print_colored(f"All {len(entries)} generated artifacts match the manifest.", Colors.GREEN)
+        return
+    print(f"\n{len(entries)} tracked, {len(drift)} drifted. "
+          f"Re-run './ssmd <domain>' to regenerate base configs.")
+    sys.exit(1)
@@ -20,6 +20,7 @@ _REGISTRY_JSON = Path('instances/registry.json')  # legacy, for migration
 _INSTANCE_COLUMNS = [
     'name', 'type', 'subdomain', 'db_name', 'db_user', 'container_name',
     'source_path', 'created_at', 'status', 'restricted', 'branch', 'worktree_path',
+    'migrations_fingerprint',
 ]
 
 
@@ -48,7 +49,39 @@ def _get_db() -> sqlite3.Connection:
             status         TEXT DEFAULT 'running',
             restricted     INTEGER DEFAULT 0,
             branch         TEXT DEFAULT '',
-            worktree_path  TEXT DEFAULT ''
+            worktree_path  TEXT DEFAULT '',
+            migrations_fingerprint TEXT DEFAULT ''
+        )
+    """)
+    _ensure_columns(db, 'instances', {'migrations_fingerprint': "TEXT DEFAULT ''"})
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            path        TEXT PRIMARY KEY,
+            instance    TEXT DEFAULT '',
+            db_name     TEXT DEFAULT '',
+            size_bytes  INTEGER DEFAULT 0,
+            created_at  TEXT DEFAULT '',
+            profile     TEXT DEFAULT 'full',
+            sha256      TEXT DEFAULT ''
+        )
+    """)
+    _ensure_columns(db, 'snapshots', {'profile': "TEXT DEFAULT 'full'", 'sha256': "TEXT DEFAULT ''"})
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_policies (
+            scope        TEXT PRIMARY KEY,
+            keep_last    INTEGER,
+            keep_daily   INTEGER,
+            keep_weekly  INTEGER,
+            max_total_mb INTEGER
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS generated_files (
+            path       TEXT PRIMARY KEY,
+            kind       TEXT DEFAULT 'file',
+            owner      TEXT DEFAULT '',
+            sha256     TEXT DEFAULT '',
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     """)
     db.commit()
@@ -60,6 +93,14 @@ def _get_db() -> sqlite3.Connection:
     return db
 
 
+def _ensure_columns(db: sqlite3.Connection, table: str, columns: dict):
+    """Add columns introduced after a table was first created."""
+    existing = {r[1] for r in db.execute(f"PRAGMA table_info({table})")}
+    for column, decl in columns.items():
+        if column not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def _migrate_from_json(db: sqlite3.Connection):
     """Import data from the legacy registry.json into SQLite."""
     try:
@@ -154,8 +195,9 @@ def save_registry(registry: dict):
             db.execute("""
                 INSERT OR REPLACE INTO instances
                     (name, type, subdomain, db_name, db_user, container_name,
-                     source_path, created_at, status, restricted, branch, worktree_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     source_path, created_at, status, restricted, branch, worktree_path,
+                     migrations_fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 name,
                 inst['type'],
@@ -169,6 +211,7 @@ def save_registry(registry: dict):
                 int(inst.get('restricted', False)),
                 inst.get('branch', ''),
                 inst.get('worktree_path', ''),
+                inst.get('migrations_fingerprint', ''),
             ))
 
         db.execute("COMMIT")
@@ -190,65 +233,220 @@ def reset_registry():
             p.unlink()
 
 
-# ─── Domain detection (unchanged) ───────────────────────────────────────────
+def set_migrations_fingerprint(name: str, fingerprint: str):
+    """Record the migrations/seeds fingerprint last applied to an instance."""
+    db = _get_db()
+    db.execute("UPDATE instances SET migrations_fingerprint = ? WHERE name = ?", (fingerprint, name))
+    db.commit()
+    db.close()
 
-def detect_current_domain():
-    """Detect current domain from existing docker-compose.yml"""
-    compose_file = Path('docker-compose.yml')
-    if not compose_file.exists():
-        return None
-    try:
-        content = compose_file.read_text()
-        match = re.search(r'# Domain: ([a-z0-9.-]+\.[a-z]{2,})', content)
-        if match:
-            return match.group(1)
-        match = re.search(r'Host\(`v4\.([a-z0-9.-]+\.[a-z]{2,})`\)', content)
-        if match:
-            return match.group(1)
-    except Exception:
-        pass
-    return None
 
+# ─── Snapshot catalog & retention policies ──────────────────────────────────
+
+SNAPSHOT_POLICY_FIELDS = ('keep_last', 'keep_daily', 'keep_weekly', 'max_total_mb')
+GLOBAL_POLICY_SCOPE = '*'
+
+
+def load_snapshot_catalog() -> list:
+    """Return all catalogued snapshots as dicts, newest first."""
+    db = _get_db()
+    db.row_factory = sqlite3.Row
+    rows = db.execute("SELECT * FROM snapshots ORDER BY created_at DESC").fetchall()
+    db.close()
+    return [dict(r) for r in rows]
+
+
+def record_snapshot(path: str, instance: str = '', db_name: str = '',
+                    size_bytes: int = 0, created_at: str = '', profile: str = 'full',
+                    sha256: str = ''):
+    """Add or update a snapshot entry in the catalog."""
+    db = _get_db()
+    db.execute("""
+        INSERT OR REPLACE INTO snapshots (path, instance, db_name, size_bytes, created_at, profile, sha256)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (path, instance, db_name, size_bytes, created_at, profile, sha256))
+    db.commit()
+    db.close()
+
+
+def forget_snapshots(paths):
+    """Remove catalog entries (the files themselves are not touched)."""
+    db = _get_db()
+    db.executemany("DELETE FROM snapshots WHERE path = ?", [(p,) for p in paths])
+    db.commit()
+    db.close()
 
-def get_project_context():
-    """Load project context from registry (SQLite) or generated .env file"""
-    reg = load_registry()
-    domain = reg.get('domain') or detect_current_domain()
-    if not domain:
-        print_colored("Error: No domain configured. Run './ssmd <domain>' first.", Colors.RED)
-        sys.exit(1)
 
-    env_file = Path('.env')
+def load_snapshot_policies() -> dict:
+    """Return retention policies as {scope: {field: int|None}}; '*' is the global scope."""
+    db = _get_db()
+    db.row_factory = sqlite3.Row
+    rows = db.execute("SELECT * FROM snapshot_policies").fetchall()
+    db.close()
+    return {r['scope']: {f: r[f] for f in SNAPSHOT_POLICY_FIELDS} for r in rows}
+
+
+def save_snapshot_policy(scope: str, policy: dict):
+    """Create or replace the retention policy for a scope (instance name or '*')."""
+    db = _get_db()
+    db.execute("""
+        INSERT OR REPLACE INTO snapshot_policies
+            (scope, keep_last, keep_daily, keep_weekly, max_total_mb)
+        VALUES (?, ?, ?, ?, ?)
+    """, (scope, *(policy.get(f) for f in SNAPSHOT_POLICY_FIELDS)))
+    db.commit()
+    db.close()
+
+
+def delete_snapshot_policy(scope: str):
+    db = _get_db()
+    db.execute("DELETE FROM snapshot_policies WHERE scope = ?", (scope,))
+    db.commit()
+    db.close()
+
+
+# ─── Generated-file manifest ────────────────────────────────────────────────
+
+def load_manifest() -> list:
+    """Return every tracked generated artifact (path, kind, owner, sha256, updated_at)."""
+    db = _get_db()
+    db.row_factory = sqlite3.Row
+    rows = db.execute("SELECT * FROM generated_files ORDER BY path").fetchall()
+    db.close()
+    return [dict(r) for r in rows]
+
+
+def record_generated(entries):
+    """Add or update manifest entries; each is a dict with path, kind, owner, sha256."""
+    db = _get_db()
+    db.executemany("""
+        INSERT OR REPLACE INTO generated_files (path, kind, owner, sha256)
+        VALUES (?, ?, ?, ?)
+    """, [(e['path'], e.get('kind', 'file'), e.get('owner', ''), e.get('sha256', '')) for e in entries])
+    db.commit()
+    db.close()
+
+
+def forget_generated(paths=None, owner=None):
+    """Drop manifest entries by path and/or owner (the files themselves are not touched)."""
+    db = _get_db()
+    if paths:
+        db.executemany("DELETE FROM generated_files WHERE path = ?", [(p,) for p in paths])
+    if owner:
+        db.execute("DELETE FROM generated_files WHERE owner = ?", (owner,))
+    db.commit()
+    db.close()
+
+
+# ─── Project context ────────────────────────────────────────────────────────
+
+def _stat_key(path):
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def parse_env_file(path):
+    """KEY=value pairs of an env file ({} if it does not exist); values are kept verbatim."""
     env_vars = {}
-    if env_file.exists():
-        for line in env_file.read_text().splitlines():
+    if path.exists():
+        for line in path.read_text().splitlines():
             line = line.strip()
             if line and not line.startswith('#') and '=' in line:
                 k, v = line.split('=', 1)
                 env_vars[k.strip()] = v.strip()
+    return env_vars
 
-    domain_prefix = domain.replace('.', '-').replace('_', '-')
 
-    enable_https = False
-    dynamic_yml = Path('traefik/dynamic.yml')
-    if dynamic_yml.exists():
-        content = dynamic_yml.read_text()
-        enable_https = 'websecure' in content
+def _compose_settings(path):
+    """Domain and cache engine, from one read of docker-compose.yml."""
+    try:
+        content = path.read_text()
+    except (FileNotFoundError, UnicodeDecodeError):
+        return {'domain': None, 'cache_engine': 'redis'}
+    match = (re.search(r'# Domain: ([a-z0-9.-]+\.[a-z]{2,})', content)
+             or re.search(r'Host\(`v4\.([a-z0-9.-]+\.[a-z]{2,})`\)', content))
+    cache_engine = 'memcached' if 'memcached-durango' in content and 'redis-durango' not in content else 'redis'
+    return {'domain': match.group(1) if match else None, 'cache_engine': cache_engine}
+
 
-    cache_engine = 'redis'
-    compose_file = Path('docker-compose.yml')
-    if compose_file.exists():
-        content = compose_file.read_text()
-        if 'redis-durango' in content:
-            cache_engine = 'redis'
-        elif 'memcached-durango' in content:
-            cache_engine = 'memcached'
+def _stored_domain():
+    db = _get_db()
+    row = db.execute("SELECT value FROM config WHERE key = 'domain'").fetchone()
+    db.close()
+    return row[0] if row else None
+
+
+class ProjectContext:
+    """Values parsed from the project's generated files, cached per source file.
+
+    Each source is re-read only when the mtime or size of its file changes,
+    so repeated lookups within a command cost a stat() per source.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _cached(self, name, paths, loader):
+        key = tuple(_stat_key(p) for p in paths)
+        hit = self._cache.get(name)
+        if hit is None or hit[0] != key:
+            hit = (key, loader())
+            self._cache[name] = hit
+        return hit[1]
+
+    @property
+    def env_vars(self):
+        path = Path('.env')
+        return self._cached('env', (path,), lambda: parse_env_file(path))
+
+    @property
+    def enable_https(self):
+        path = Path('traefik/dynamic.yml')
+        return self._cached('https', (path,), lambda: path.exists() and 'websecure' in path.read_text())
+
+    def _compose(self):
+        path = Path('docker-compose.yml')
+        return self._cached('compose', (path,), lambda: _compose_settings(path))
+
+    @property
+    def cache_engine(self):
+        return self._compose()['cache_engine']
+
+    @property
+    def domain(self):
+        wal = REGISTRY_DB.with_name(REGISTRY_DB.name + '-wal')  # WAL mode: commits may only touch the -wal file
+        return self._cached('domain', (REGISTRY_DB, wal), _stored_domain) or self.compose_domain
+
+    @property
+    def compose_domain(self):
+        """Domain the current docker-compose.yml was generated for."""
+        return self._compose()['domain']
+
+
+_project_context = ProjectContext()
+
+
+def detect_current_domain():
+    """Detect current domain from existing docker-compose.yml"""
+    return _project_context.compose_domain
+
+
+def get_project_context():
+    """Load project context from registry (SQLite) or generated .env file"""
+    ctx = _project_context
+    domain = ctx.domain
+    if not domain:
+        print_colored("Error: No domain configured. Run './ssmd <domain>' first.", Colors.RED)
+        sys.exit(1)
 
     return {
         'domain': domain,
-        'domain_prefix': domain_prefix,
-        'enable_https': enable_https,
-        'cache_engine': cache_engine,
+        'domain_prefix': domain.replace('.', '-').replace('_', '-'),
+        'enable_https': ctx.enable_https,
+        'cache_engine': ctx.cache_engine,
         'project_root': str(Path.cwd()),
-        'env_vars': env_vars,
+        'env_vars': dict(ctx.env_vars),
     }
@@ -0,0 +1,77 @@
+"""Traefik instance routes — one generated file, rendered from the registry, written atomically.
+
+Not used when Traefik reads routes from the controller's HTTP provider.
+"""
+
+from pathlib import Path
+
+from .manifest import track_files, untrack
+from .registry import load_registry, get_project_context
+from .templates import render_template, write_if_changed
+
+TRAEFIK_DIR = Path('traefik')
+ROUTES_FILE = TRAEFIK_DIR / 'instances.yml'
+LEGACY_ROUTE_GLOB = 'instance-*.yml'
+
+
+def http_provider_enabled():
+    """True when docker-compose.yml points Traefik at the controller's HTTP provider."""
+    compose_file = Path('docker-compose.yml')
+    return compose_file.exists() and '--providers.http.endpoint' in compose_file.read_text()
+
+
+def render_routes(registry=None):
+    """Render the routes for every registered instance, or None if there are none."""
+    registry = registry or load_registry()
+    instances = [
+        {'name': name, 'type': inst.get('type', ''), 'subdomain': inst.get('subdomain', name),
+         'restricted': inst.get('restricted', False)}
+        for name, inst in sorted(registry.get('instances', {}).items())
+    ]
+    if not instances:
+        return None
+    ctx = get_project_context()
+    return render_template(
+        'instance-routes.yml.j2',
+        domain=ctx['domain'], enable_https=ctx['enable_https'], instances=instances,
+    )
+
+
+def publish_routes(registry=None):
+    """Regenerate traefik/instances.yml from the registry.
+
+    The file is only rewritten when its content changes, so Traefik reloads
+    at most once per call. When Traefik pulls routes from the controller's
+    HTTP provider the file is removed instead. Returns True if the file changed.
+    """
+    content = None if http_provider_enabled() else render_routes(registry)
+    changed = False
+    if content is None:
+        if ROUTES_FILE.exists():
+            ROUTES_FILE.unlink()
+            changed = True
+        untrack([ROUTES_FILE])
+    else:
+        changed = write_if_changed(ROUTES_FILE, content)
+        track_files({ROUTES_FILE: content})
+
+    # Per-instance files from older versions are folded into instances.yml
+    if TRAEFIK_DIR.exists():
+        for legacy in TRAEFIK_DIR.glob(LEGACY_ROUTE_GLOB):
+            legacy.unlink()
+            changed = True
+    return changed
+
+
+def remove_routes():
+    """Delete instances.yml and any legacy per-instance files; returns the paths removed.
+
+    Unlike publish_routes this never opens the registry, so reset can call it
+    without recreating registry.db.
+    """
+    removed = [ROUTES_FILE] if ROUTES_FILE.exists() else []
+    if TRAEFIK_DIR.exists():
+        removed.extend(TRAEFIK_DIR.glob(LEGACY_ROUTE_GLOB))
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
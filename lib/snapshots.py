@@ -0,0 +1,272 @@
+"""Snapshot catalog, profiles and retention — list, policies, pruning."""
+
+import configparser
+import re
+from datetime import datetime
+from pathlib import Path
+
+from .output import Colors, print_colored, print_header
+from .registry import (
+    GLOBAL_POLICY_SCOPE, SNAPSHOT_POLICY_FIELDS,
+    load_registry, load_snapshot_catalog, record_snapshot, forget_snapshots,
+    load_snapshot_policies, save_snapshot_policy, delete_snapshot_policy,
+)
+
+SNAPSHOTS_DIR = Path('snapshots')
+PROFILES_FILE = Path('config/snapshot-profiles.conf')
+DEFAULT_PROFILE = 'full'
+_SNAPSHOT_NAME_RE = re.compile(
+    r'^(?P<db_name>.+)_(?P<timestamp>\d{8}_\d{6})(?:_(?P<profile>[a-z0-9-]+))?\.sql\.gz$'
+)
+SNAPSHOT_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+
+# ─── Profiles ────────────────────────────────────────────────────────────────
+
+def _split_patterns(value):
+    return [p.strip() for p in value.split(',') if p.strip()]
+
+
+def load_snapshot_profiles() -> dict:
+    """Read named pg_dump profiles from config/snapshot-profiles.conf."""
+    profiles = {DEFAULT_PROFILE: {'description': 'Complete dump: schema and all data', 'pg_dump_args': []}}
+    cp = configparser.ConfigParser()
+    if PROFILES_FILE.exists():
+        cp.read(PROFILES_FILE)
+    for name in cp.sections():
+        section = cp[name]
+        args = []
+        if section.getboolean('schema_only', fallback=False):
+            args.append('--schema-only')
+        for key, flag in (('table', '--table'), ('exclude_table', '--exclude-table'),
+                          ('exclude_table_data', '--exclude-table-data')):
+            args += [f"{flag}={pat}" for pat in _split_patterns(section.get(key, ''))]
+        profiles[name] = {'description': section.get('description', ''), 'pg_dump_args': args}
+    return profiles
+
+
+def snapshot_filename(db_name, timestamp, profile):
+    """Snapshot file name; the profile is appended unless it is the default one."""
+    suffix = '' if profile == DEFAULT_PROFILE else f"_{profile}"
+    return f"{db_name}_{timestamp}{suffix}.sql.gz"
+
+
+# ─── Catalog ─────────────────────────────────────────────────────────────────
+
+def snapshot_created_at(path):
+    """Snapshot time from the _YYYYMMDD_HHMMSS stamp in its name (mtime for other names)."""
+    match = _SNAPSHOT_NAME_RE.match(path.name)
+    if match:
+        try:
+            return datetime.strptime(match.group('timestamp'), SNAPSHOT_TIMESTAMP_FORMAT) \
+                .isoformat(timespec='seconds')
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec='seconds')
+
+
+def catalog_snapshot(path, instance, db_name, profile=DEFAULT_PROFILE):
+    """Record a freshly written snapshot. Only files under snapshots/ are managed."""
+    path = Path(path)
+    if path.parent.resolve() != SNAPSHOTS_DIR.resolve() or not path.exists():
+        return
+    record_snapshot(
+        f"{SNAPSHOTS_DIR.name}/{path.name}", instance, db_name, path.stat().st_size,
+        snapshot_created_at(path), profile,
+    )
+
+
+def sync_catalog() -> list:
+    """Reconcile the catalog with snapshots/ and return the current entries.
+
+    Files copied in by hand are catalogued (instance inferred from the
+    db_name prefix); entries whose file disappeared are dropped.
+    """
+    catalog = {e['path']: e for e in load_snapshot_catalog()}
+    on_disk = {f"{SNAPSHOTS_DIR.name}/{f.name}": f for f in SNAPSHOTS_DIR.glob('*.sql.gz')} \
+        if SNAPSHOTS_DIR.exists() else {}
+
+    gone = [p for p in catalog if p not in on_disk]
+    if gone:
+        forget_snapshots(gone)
+
+    new = [p for p in on_disk if p not in catalog]
+    if new:
+        db_to_instance = {inst['db_name']: name
+                          for name, inst in load_registry().get('instances', {}).items()}
+        for rel in new:
+            f = on_disk[rel]
+            match = _SNAPSHOT_NAME_RE.match(f.name)
+            db_name = match.group('db_name') if match else ''
+            profile = (match.group('profile') if match else None) or DEFAULT_PROFILE
+            record_snapshot(
+                rel, db_to_instance.get(db_name, ''), db_name, f.stat().st_size,
+                snapshot_created_at(f), profile,
+            )
+
+    return load_snapshot_catalog() if (gone or new) else list(catalog.values())
+
+
+# ─── Retention ───────────────────────────────────────────────────────────────
+
+def _group_key(entry):
+    return entry.get('instance') or entry.get('db_name') or entry['path']
+
+
+def _apply_cap(entries, cap_mb):
+    """Split newest-first entries into (kept, dropped) so the kept total fits cap_mb.
+
+    The newest snapshot is always kept, even if it alone exceeds the cap.
+    """
+    if not cap_mb:
+        return entries, []
+    limit = cap_mb * 1024 * 1024
+    total = 0
+    for i, e in enumerate(entries):
+        total += e.get('size_bytes', 0)
+        if total > limit and i > 0:
+            return entries[:i], entries[i:]
+    return entries, []
+
+
+def plan_prune(entries, policies) -> list:
+    """Return the catalog entries that the retention policies would remove.
+
+    Keep rules (keep_last / keep_daily / keep_weekly) are resolved per instance,
+    falling back field-by-field to the global ('*') policy. An instance's
+    max_total_mb caps that instance; the global max_total_mb caps everything.
+    A group with no keep rules keeps all of its snapshots. Mirrors plan_prune
+    in controller/backend/retention.py (checked by tests/test_retention.py).
+    """
+    global_policy = policies.get(GLOBAL_POLICY_SCOPE, {})
+    groups = {}
+    for e in entries:
+        groups.setdefault(_group_key(e), []).append(e)
+
+    kept, pruned = [], []
+    for key, group in groups.items():
+        group = sorted(group, key=lambda e: e.get('created_at', ''), reverse=True)
+        own = policies.get(key, {})
+        rules = {f: own.get(f) if own.get(f) is not None else global_policy.get(f)
+                 for f in ('keep_last', 'keep_daily', 'keep_weekly')}
+
+        if any(rules.values()):
+            keep = set()
+            if rules['keep_last']:
+                keep.update(e['path'] for e in group[:rules['keep_last']])
+            for field, bucket in (('keep_daily', lambda d: d.date()),
+                                  ('keep_weekly', lambda d: d.isocalendar()[:2])):
+                if not rules[field]:
+                    continue
+                seen = set()
+                for e in group:
+                    b = bucket(datetime.fromisoformat(e['created_at']))
+                    if b not in seen:
+                        if len(seen) >= rules[field]:
+                            break
+                        seen.add(b)
+                        keep.add(e['path'])
+            group_kept = [e for e in group if e['path'] in keep]
+            pruned.extend(e for e in group if e['path'] not in keep)
+        else:
+            group_kept = group
+
+        group_kept, dropped = _apply_cap(group_kept, own.get('max_total_mb'))
+        kept.extend(group_kept)
+        pruned.extend(dropped)
+
+    kept.sort(key=lambda e: e.get('created_at', ''), reverse=True)
+    _, dropped = _apply_cap(kept, global_policy.get('max_total_mb'))
+    pruned.extend(dropped)
+    return pruned
+
+
+def prune_snapshots(dry_run=False) -> list:
+    """Apply retention policies to snapshots/ and return the entries removed."""
+    entries = sync_catalog()
+    victims = plan_prune(entries, load_snapshot_policies())
+    if dry_run or not victims:
+        return victims
+    for e in victims:
+        Path(e['path']).unlink(missing_ok=True)
+    forget_snapshots([e['path'] for e in victims])
+    return victims
+
+
+# ─── CLI handlers ────────────────────────────────────────────────────────────
+
+def _format_policy(policy):
+    parts = [f"{f}={policy[f]}" for f in SNAPSHOT_POLICY_FIELDS if policy.get(f) is not None]
+    return ', '.join(parts) or '(keep everything)'
+
+
+def snapshots_list(args):
+    """List catalogued snapshots"""
+    entries = sync_catalog()
+    if not entries:
+        print_colored("No snapshots found.", Colors.YELLOW)
+        return
+
+    print_header("Database Snapshots")
+    print(f"{'Path':<52} {'Instance':<16} {'Profile':<12} {'Size':>10}  {'Created'}")
+    print("-" * 113)
+    total = 0
+    for e in entries:
+        total += e['size_bytes']
+        print(f"{e['path']:<52} {e['instance'] or '-':<16} {e['profile']:<12} "
+              f"{e['size_bytes'] // 1024:>7} KB  {e['created_at']}")
+    print(f"\n{len(entries)} snapshot(s), {total / 1024 / 1024:.1f} MB total\n")
+
+
+def snapshots_policy(args):
+    """Show or set snapshot retention policies"""
+    scope = args.instance or GLOBAL_POLICY_SCOPE
+    label = f"instance '{args.instance}'" if args.instance else 'global'
+
+    if args.clear:
+        delete_snapshot_policy(scope)
+        print_colored(f"Removed {label} retention policy.", Colors.GREEN)
+        return
+
+    updates = {f: getattr(args, f) for f in SNAPSHOT_POLICY_FIELDS if getattr(args, f) is not None}
+    if updates:
+        policy = load_snapshot_policies().get(scope, {})
+        policy.update({f: (v or None) for f, v in updates.items()})
+        save_snapshot_policy(scope, policy)
+        print_colored(f"Updated {label} retention policy: {_format_policy(policy)}", Colors.GREEN)
+        return
+
+    policies = load_snapshot_policies()
+    if not policies:
+        print_colored("No retention policies configured — snapshots are kept forever.", Colors.YELLOW)
+        return
+    print_header("Snapshot Retention Policies")
+    for s, policy in sorted(policies.items()):
+        name = 'global' if s == GLOBAL_POLICY_SCOPE else s
+        print(f"  {name:<16} {_format_policy(policy)}")
+    print()
+
+
+def snapshots_prune(args):
+    """Delete snapshots that fall outside the retention policies"""
+    victims = prune_snapshots(dry_run=args.dry_run)
+    if not victims:
+        print_colored("Nothing to prune.", Colors.GREEN)
+        return
+
+    freed = sum(e['size_bytes'] for e in victims)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    for e in victims:
+        print(f"  {verb}: {e['path']} ({e['size_bytes'] // 1024} KB)")
+    print_colored(f"{verb} {len(victims)} snapshot(s), {freed / 1024 / 1024:.1f} MB.",
+                  Colors.YELLOW if args.dry_run else Colors.GREEN)
+
+
+def snapshots_profiles(args):
+    """List available snapshot profiles"""
+    print_header("Snapshot Profiles")
+    for name, profile in load_snapshot_profiles().items():
+        print(f"  {name:<14} {profile['description']}")
+        if profile['pg_dump_args']:
+            print(f"  {'':<14} {Colors.DIM}pg_dump {' '.join(profile['pg_dump_args'])}{Colors.NC}")
+    print(f"\nDefined in {PROFILES_FILE}\n")
@@ -0,0 +1,101 @@
+"""Template rendering — one cached Jinja environment per templates directory,
+plus atomic, change-detecting writes of rendered output."""
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATES_DIR = Path('templates')
+BYTECODE_CACHE_DIR = Path('.cache/jinja')
+
+_environments = {}
+
+# Every generated file carries a '# Generated: <timestamp>' header; it is not content
+_GENERATED_LINE_RE = re.compile(r'^#\s*Generated: .*$', re.M)
+
+
+def _bytecode_cache():
+    try:
+        BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR))
+
+
+def get_environment(templates_dir=TEMPLATES_DIR):
+    """Shared Environment for templates_dir.
+
+    Compiled templates stay in memory for the life of the process and in
+    .cache/jinja between runs, so cold CLI invocations skip compilation too.
+    Jinja checks a template's mtime on every lookup and recompiles it when the
+    file changed; the on-disk cache is keyed by source checksum, so stale
+    bytecode is never used.
+    """
+    key = Path(templates_dir).resolve()
+    env = _environments.get(key)
+    if env is None:
+        env = Environment(
+            loader=FileSystemLoader(str(key)),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=True,
+            bytecode_cache=_bytecode_cache(),
+        )
+        _environments[key] = env
+    return env
+
+
+def render_template(name, context=None, templates_dir=TEMPLATES_DIR, **kwargs):
+    """Render templates/<name> with context (and/or keyword arguments)."""
+    return get_environment(templates_dir).get_template(name).render(context or {}, **kwargs)
+
+
+# ─── Output files ────────────────────────────────────────────────────────────
+
+def content_hash(text):
+    """SHA-256 of rendered output, ignoring the '# Generated:' timestamp line."""
+    return hashlib.sha256(_GENERATED_LINE_RE.sub('', text, count=1).encode()).hexdigest()
+
+
+def write_atomic(path, content, mode=None):
+    """Write content to path via a temp file + rename, so readers never see a partial file.
+
+    The temp file lives in the same directory (same filesystem) and ends in
+    .tmp, so file watchers such as Traefik's ignore it. The file keeps its
+    current permissions unless mode is given (new files default to 0644).
+    """
+    path = Path(path)
+    if mode is None:
+        try:
+            mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_if_changed(path, content, mode=None):
+    """Atomically write content unless the file already holds it. Returns True if written."""
+    path = Path(path)
+    try:
+        if content_hash(path.read_text()) == content_hash(content):
+            return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, content, mode)
+    return True
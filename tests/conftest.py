@@ -1,15 +1,25 @@
 """Shared fixtures and helpers for integration tests."""
 
 import os
+import sys
 import time
 from pathlib import Path
+from unittest import mock
 
+import docker
 import pytest
 import requests
 
 PROJECT_ROOT = Path(__file__).parent.parent
 API_URL = os.environ.get("API_URL", "http://127.0.0.1:8900")
 
+# Unit tests import the controller backend directly; it reads PROJECT_ROOT at import
+sys.path.insert(0, str(PROJECT_ROOT / "controller"))
+os.environ.setdefault("PROJECT_ROOT", str(PROJECT_ROOT))
+# backend.helpers creates its Docker client at import; unit tests never talk to
+# the daemon, so they must not need one to collect
+docker.from_env = mock.MagicMock(name="docker.from_env")
+
 
 def _read_env(key: str) -> str:
     env_file = PROJECT_ROOT / ".env"
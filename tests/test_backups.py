@@ -0,0 +1,94 @@
+"""Unit tests for config backup runs and their retention.
+
+Run:  pytest tests/test_backups.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from lib import backups
+
+
+def run_id(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime(backups.RUN_ID_FORMAT)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """An empty project directory; backups/ paths are relative to it."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+# ─── plan_prune ─────────────────────────────────────────────────────────────
+
+
+class TestPlanPrune:
+    RUNS = [run_id(d + 0.5) for d in range(10)]  # newest first; half a day clear of any cutoff
+
+    def test_empty_policy_keeps_everything(self):
+        assert backups.plan_prune(self.RUNS, {}) == []
+
+    def test_keep_last(self):
+        assert backups.plan_prune(self.RUNS, {"keep_last": 3}) == self.RUNS[3:]
+
+    def test_max_age(self):
+        assert backups.plan_prune(self.RUNS, {"max_age_days": 5}) == self.RUNS[5:]
+
+    def test_stricter_rule_wins(self):
+        assert backups.plan_prune(self.RUNS, {"keep_last": 8, "max_age_days": 2}) == self.RUNS[2:]
+
+    def test_newest_run_always_kept(self):
+        old = [run_id(d) for d in (100, 200)]
+        assert backups.plan_prune(old, {"keep_last": 1, "max_age_days": 1}) == old[1:]
+
+
+# ─── Runs on disk ───────────────────────────────────────────────────────────
+
+
+class TestRuns:
+    def test_unchanged_files_record_no_new_run(self, project):
+        (project / ".env").write_text("A=1\n")
+        first, files = backups.create_backup([".env", "missing.yml"], reason="first")
+        assert files == [".env"]
+        assert backups.create_backup([".env"])[0] == first
+        assert backups.list_runs() == [first]
+
+    def test_restore_puts_content_back(self, project):
+        env = project / ".env"
+        env.write_text("A=1\n")
+        first, _ = backups.create_backup([".env"])
+        env.write_text("A=2\n")
+        assert backups.restore_run(first) == [".env"]
+        assert env.read_text() == "A=1\n"
+
+    def test_prune_removes_runs_and_unreferenced_objects(self, project):
+        env = project / ".env"
+        for n in range(3):
+            env.write_text(f"A={n}\n")
+            backups.create_backup([".env"])
+        runs = backups.list_runs()
+        assert len(runs) == 3
+        victims, freed = backups.prune_backups({"keep_last": 1})
+        assert victims == runs[1:]
+        assert freed > 0
+        assert backups.list_runs() == runs[:1]
+        assert len(list(backups.OBJECTS_DIR.glob("*/*"))) == 1
+
+    def test_legacy_directories_follow_the_policy(self, project):
+        for days_ago in (30, 20, 10):
+            legacy = project / "backups" / run_id(days_ago)
+            legacy.mkdir(parents=True)
+            (legacy / ".env").write_text("OLD=1\n")
+        (project / "backups" / "notes").mkdir()  # not a timestamp: never touched
+        (project / ".env").write_text("A=1\n")
+        current, _ = backups.create_backup([".env"])
+
+        assert backups.prune_backups({"keep_last": 2}, dry_run=True) == ([run_id(20), run_id(30)], 0)
+        victims, freed = backups.prune_backups({"keep_last": 2})
+        assert victims == [run_id(20), run_id(30)]
+        assert freed == 2 * len("OLD=1\n")
+        assert backups.list_legacy_backups() == [run_id(10)]
+        assert backups.list_runs() == [current]
+        assert (project / "backups" / "notes").is_dir()
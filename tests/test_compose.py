@@ -0,0 +1,79 @@
+"""Unit tests for the docker-compose.yml model behind base-service discovery.
+
+Run:  pytest tests/test_compose.py -v
+"""
+
+from backend.helpers import parse_compose
+
+COMPOSE = """\
+# Generated by ssmd
+# Domain: example.test
+name: ssmd
+services:
+  traefik:
+    image: traefik:v2.10
+    container_name: ssmd-traefik
+    command:
+      - "--providers.docker=true"
+      - "--providers.http.endpoint=http://ssmd-controller:8900/api/traefik/dynamic?token=x"
+    ports:
+      - "80:80"
+      - target: 443
+        published: 443
+        protocol: tcp
+  postgres16:
+    image: postgres:16
+    healthcheck:
+      test: ["CMD", "pg_isready"]
+  memcached-durango:
+    image: memcached:1.6
+    healthcheck:
+      disable: true
+  worker:
+"""
+
+
+class TestParseCompose:
+    def test_project_and_domain(self):
+        model = parse_compose(COMPOSE)
+        assert model["project"] == "ssmd"
+        assert model["domain"] == "example.test"  # read from the header comment
+
+    def test_container_names(self):
+        services = parse_compose(COMPOSE)["services"]
+        assert services["traefik"]["container_name"] == "ssmd-traefik"
+        assert services["postgres16"]["container_name"] == "ssmd-postgres16-1"
+
+    def test_no_project_name_leaves_container_unknown(self):
+        model = parse_compose("services:\n  redis:\n    image: redis:7\n")
+        assert model["project"] is None
+        assert model["services"]["redis"]["container_name"] is None
+
+    def test_healthcheck(self):
+        services = parse_compose(COMPOSE)["services"]
+        assert services["postgres16"]["healthcheck"] is True
+        assert services["memcached-durango"]["healthcheck"] is False  # disable: true
+        assert services["traefik"]["healthcheck"] is False
+
+    def test_ports_short_and_long_syntax(self):
+        assert parse_compose(COMPOSE)["services"]["traefik"]["ports"] == ["80:80", "443:443/tcp"]
+
+    def test_empty_service_spec(self):
+        worker = parse_compose(COMPOSE)["services"]["worker"]
+        assert worker == {"container_name": "ssmd-worker-1", "image": "", "healthcheck": False, "ports": []}
+
+    def test_http_provider(self):
+        assert parse_compose(COMPOSE)["http_provider"] is True
+        file_only = COMPOSE.replace("--providers.http.endpoint", "--providers.file.directory")
+        assert parse_compose(file_only)["http_provider"] is False
+
+    def test_cache_engine(self):
+        assert parse_compose(COMPOSE)["cache_engine"] == "memcached"
+        both = COMPOSE + "  redis-durango:\n    image: redis:7\n"
+        assert parse_compose(both)["cache_engine"] == "redis"
+
+    def test_empty_file(self):
+        model = parse_compose("")
+        assert model["services"] == {}
+        assert model["domain"] is None
+        assert model["http_provider"] is False
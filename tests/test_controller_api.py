@@ -4,13 +4,21 @@ Requires: base services running, controller healthy.
 Run:  pytest tests/test_controller_api.py -v
 """
 
+import base64
+import gzip
+import hashlib
 import os
+import re
 import subprocess
 import sqlite3
 import time
 from pathlib import Path
+from urllib.parse import urlencode
 
 import pytest
+import requests
+
+from tests.conftest import _read_env
 
 PROJECT_ROOT = Path(__file__).parent.parent
 API_URL = os.environ.get("API_URL", "http://127.0.0.1:8900")
@@ -28,6 +36,10 @@ def api_post(api, path, json=None):
     return api.post(f"{API_URL}{path}", json=json)
 
 
+def api_put(api, path, json=None):
+    return api.put(f"{API_URL}{path}", json=json)
+
+
 def api_delete(api, path):
     return api.delete(f"{API_URL}{path}")
 
@@ -282,3 +294,208 @@ class TestEdgeCases:
         r = api_get(api, "/api/services/stats")
         assert r.status_code == 200
         assert "postgres16" in r.json()
+
+
+# ─── Phase 5: Snapshots ─────────────────────────────────────────────────────
+
+
+class TestSnapshotPolicy:
+    """Set the global retention policy through the API and read it back.
+
+    keep_last is set far above any real snapshot count, so the background
+    pruner can't remove anything while the test runs; the previous policy is
+    put back afterwards.
+    """
+
+    def test_set_and_read_back(self, api):
+        r = api_get(api, "/api/snapshots/policies")
+        assert r.status_code == 200
+        previous = next((p for p in r.json()["policies"] if p["scope"] == "*"), None)
+
+        policy = {k: v for k, v in (previous or {}).items() if k != "scope"}
+        policy["keep_last"] = 100000
+        try:
+            r = api_put(api, "/api/snapshots/policies", policy)
+            assert r.status_code == 200, r.text
+            assert r.json()["scope"] == "*"
+            assert r.json()["keep_last"] == 100000
+
+            r = api_get(api, "/api/snapshots/policies")
+            stored = next(p for p in r.json()["policies"] if p["scope"] == "*")
+            assert stored["keep_last"] == 100000
+        finally:
+            if previous:
+                api_put(api, "/api/snapshots/policies", {k: v for k, v in previous.items() if k != "scope"})
+            else:
+                api_delete(api, "/api/snapshots/policies")
+
+    def test_prune_dry_run_keeps_files(self, api):
+        before = {s["name"] for s in api_get(api, "/api/snapshots").json()["snapshots"]}
+        r = api_post(api, "/api/snapshots/prune?dry_run=true")
+        assert r.status_code == 200, r.text
+        data = r.json()
+        assert data["dry_run"] is True
+        assert {s["name"] for s in data["removed"]} <= before
+        after = {s["name"] for s in api_get(api, "/api/snapshots").json()["snapshots"]}
+        assert after == before
+
+
+TRANSFER_SNAPSHOT = "pytest-transfer_db_20000101_000000.sql.gz"
+
+
+@pytest.fixture(scope="module")
+def payload():
+    """Gzipped body and its SHA-256; the uploaded file is removed afterwards."""
+    data = gzip.compress(b"-- pytest transfer\n" * 1000)
+    yield data, hashlib.sha256(data).hexdigest()
+    (PROJECT_ROOT / "snapshots" / TRANSFER_SNAPSHOT).unlink(missing_ok=True)
+
+
+class TestSnapshotTransfer:
+    """Upload a small snapshot, download it whole and by range, then remove it."""
+
+    NAME = TRANSFER_SNAPSHOT
+
+    def test_upload(self, api, payload):
+        data, sha = payload
+        r = api.put(f"{API_URL}/api/snapshots/{self.NAME}", data=data,
+                    headers={"Content-Type": "application/gzip", "X-Content-SHA256": sha})
+        assert r.status_code == 200, r.text
+        assert r.json()["sha256"] == sha
+
+    def test_upload_existing_conflicts(self, api, payload):
+        r = api.put(f"{API_URL}/api/snapshots/{self.NAME}", data=payload[0],
+                    headers={"Content-Type": "application/gzip"})
+        assert r.status_code == 409
+
+    def test_download_whole(self, api, payload):
+        data, sha = payload
+        r = api_get(api, f"/api/snapshots/{self.NAME}/content")
+        assert r.status_code == 200
+        assert r.content == data
+        assert r.headers["X-Content-SHA256"] == sha
+        assert r.headers["Accept-Ranges"] == "bytes"
+
+    def test_download_range(self, api, payload):
+        data, _ = payload
+        r = api.get(f"{API_URL}/api/snapshots/{self.NAME}/content", headers={"Range": "bytes=10-19"})
+        assert r.status_code == 206
+        assert r.content == data[10:20]
+        assert r.headers["Content-Range"] == f"bytes 10-19/{len(data)}"
+
+    def test_download_unsatisfiable(self, api, payload):
+        r = api.get(f"{API_URL}/api/snapshots/{self.NAME}/content", headers={"Range": f"bytes={len(payload[0])}-"})
+        assert r.status_code == 416
+
+
+# ─── Phase 6: Traefik HTTP provider ─────────────────────────────────────────
+
+
+class TestTraefikProvider:
+    """The endpoint Traefik polls; it authenticates with ?token=, not Basic auth."""
+
+    def test_rejects_missing_token(self):
+        r = requests.get(f"{API_URL}/api/traefik/dynamic")
+        assert r.status_code in (401, 503)
+
+    def test_rejects_wrong_token(self):
+        r = requests.get(f"{API_URL}/api/traefik/dynamic", params={"token": "not-the-token"})
+        assert r.status_code in (401, 503)
+
+    def test_serves_stable_config(self):
+        token = _read_env("TRAEFIK_PROVIDER_TOKEN")
+        if not token:
+            pytest.skip("TRAEFIK_PROVIDER_TOKEN not in .env")
+        first = requests.get(f"{API_URL}/api/traefik/dynamic", params={"token": token})
+        assert first.status_code == 200, first.text
+        assert first.headers["Content-Type"].startswith("application/json")
+        assert set(first.json()) <= {"http"}
+        # Traefik reloads only when the body changes, so an idle registry must give identical bytes
+        second = requests.get(f"{API_URL}/api/traefik/dynamic", params={"token": token})
+        assert second.content == first.content
+
+
+# ─── Phase 7: Live logs ─────────────────────────────────────────────────────
+
+
+def ws_connect(path, **params):
+    """Open a controller WebSocket; credentials go in ?token= as for the web UI."""
+    ws_client = pytest.importorskip("websockets.sync.client")
+    user = _read_env("CONTROLLER_USER") or "admin"
+    token = base64.b64encode(f"{user}:{_read_env('CONTROLLER_PASS')}".encode()).decode()
+    query = urlencode({"token": token, **params})
+    return ws_client.connect(f"{API_URL.replace('http', 'ws', 1)}{path}?{query}", open_timeout=10)
+
+
+class TestLogStream:
+    """/ws/logs/{name} against postgres16, which is always running."""
+
+    def test_rejects_bad_token(self):
+        ws_client = pytest.importorskip("websockets.sync.client")
+        exceptions = pytest.importorskip("websockets.exceptions")
+        # closed before accept: the handshake itself is refused
+        with pytest.raises((exceptions.InvalidHandshake, exceptions.ConnectionClosed)):
+            with ws_client.connect(f"{API_URL.replace('http', 'ws', 1)}/ws/logs/postgres16?token=eA==") as ws:
+                ws.recv(timeout=10)
+
+    def test_unknown_container(self):
+        with ws_connect("/ws/logs/pytest-no-such-container") as ws:
+            assert "Unknown container" in ws.recv(timeout=10)
+
+    def test_invalid_filter(self):
+        with ws_connect("/ws/logs/postgres16", grep="(") as ws:
+            assert ws.recv(timeout=10).startswith("Invalid filter")
+
+    def test_grep_sends_only_matching_lines(self):
+        with ws_connect("/ws/logs/postgres16", grep="[a-z]") as ws:
+            text = ws.recv(timeout=10)
+        lines = text.splitlines()
+        assert lines
+        assert all(re.search("[a-z]", line) for line in lines)
+
+    def test_exclude_everything_sends_nothing(self):
+        with ws_connect("/ws/logs/postgres16", exclude=".") as ws:
+            with pytest.raises(TimeoutError):
+                ws.recv(timeout=3)
+
+
+class TestLogSearch:
+    """/api/instances/{name}/logs/search on postgres16: paging and validation."""
+
+    PATH = "/api/instances/postgres16/logs/search"
+
+    def test_pages_join_up(self, api):
+        whole = api_get(api, f"{self.PATH}?limit=6")
+        assert whole.status_code == 200, whole.text
+        expected = whole.json()["lines"]
+        stamps = [line["timestamp"] for line in expected]
+        assert stamps == sorted(stamps)  # oldest first
+
+        paged, cursor = [], None
+        while len(paged) < len(expected):
+            r = api_get(api, f"{self.PATH}?limit=2" + (f"&cursor={cursor}" if cursor else ""))
+            assert r.status_code == 200, r.text
+            paged += r.json()["lines"]
+            cursor = r.json()["next_cursor"]
+            if not cursor:
+                break
+        assert paged[:len(expected)] == expected
+
+    def test_pattern_filters_server_side(self, api):
+        r = api_get(api, f"{self.PATH}?q=%5Ba-z%5D&limit=20")
+        assert r.status_code == 200
+        data = r.json()
+        assert data["scanned"] >= len(data["lines"])
+        assert all(re.search("[a-z]", line["line"], re.IGNORECASE) for line in data["lines"])
+
+    def test_invalid_pattern(self, api):
+        assert api_get(api, f"{self.PATH}?q=(").status_code == 422
+
+    def test_invalid_cursor(self, api):
+        assert api_get(api, f"{self.PATH}?cursor=not-a-cursor").status_code == 422
+
+    def test_invalid_time(self, api):
+        assert api_get(api, f"{self.PATH}?since=yesterday-ish").status_code == 422
+
+    def test_unknown_container(self, api):
+        assert api_get(api, "/api/instances/pytest-no-such-container/logs/search").status_code == 404
@@ -0,0 +1,135 @@
+"""Unit tests for skipping unchanged db-setup runs, and for restores resetting it.
+
+Docker is replaced by fakes that record the commands they are given.
+Run:  pytest tests/test_db_setup.py -v
+"""
+
+import gzip
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from backend import helpers
+from backend.routes import database as routes
+from lib import database, registry
+
+INSTANCE = {
+    "type": "v4", "subdomain": "app", "db_name": "app_db", "db_user": "app",
+    "container_name": "dev-test-app", "status": "running",
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    """An app checkout with one migration, so it has a fingerprint."""
+    migrations = tmp_path / "src" / "config" / "Migrations"
+    migrations.mkdir(parents=True)
+    (migrations / "20260101000000_Init.php").write_text("<?php // init\n")
+    return tmp_path / "src"
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "snapshots" / "app_db_20260101_000000.sql.gz"
+    path.parent.mkdir()
+    path.write_bytes(gzip.compress(b"CREATE TABLE t ();\n"))
+    return path
+
+
+# ─── CLI ────────────────────────────────────────────────────────────────────
+
+
+class FakeProcess:
+    """Popen stand-in: no output, exit code 0."""
+
+    def __init__(self, cmd, **kwargs):
+        self.args = cmd
+        self.stdout = io.StringIO()
+        self.returncode = 0
+
+    def wait(self):
+        return 0
+
+    def communicate(self):
+        return "", ""
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch, source):
+    """Project in tmp_path with one registered instance; returns the commands run."""
+    monkeypatch.chdir(tmp_path)
+    registry.save_registry({"domain": "test.dev", "instances": {"app": {**INSTANCE, "source_path": str(source)}}})
+    monkeypatch.setattr(database, "get_project_context", lambda: {"domain_prefix": "dev-test"})
+    commands = []
+
+    def popen(cmd, **kwargs):
+        commands.append(cmd)
+        return FakeProcess(cmd, **kwargs)
+
+    monkeypatch.setattr(database.subprocess, "Popen", popen)
+    return commands
+
+
+def db_setup(force=False):
+    database.instance_db_setup(SimpleNamespace(name="app", all=False, force=force, skip_seed=False))
+
+
+def migrated(commands):
+    return any("migrate" in cmd for cmd in commands)
+
+
+class TestCliDbSetup:
+    def test_second_setup_is_skipped(self, cli):
+        db_setup()
+        assert migrated(cli)
+        cli.clear()
+        db_setup()
+        assert not migrated(cli)
+
+    def test_restore_forces_next_setup(self, cli, snapshot):
+        db_setup()
+        database.instance_db_restore(SimpleNamespace(name="app", snapshot=str(snapshot), drop_existing=False))
+        assert not registry.load_registry()["instances"]["app"].get("migrations_fingerprint")
+        cli.clear()
+        db_setup()
+        assert migrated(cli)
+        assert cli[0][:3] == ["docker", "exec", "dev-test-app"]  # container from the registry
+
+
+# ─── API ────────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch, source):
+    """Controller routes against a registry in tmp_path; returns the commands run."""
+    monkeypatch.setattr(helpers, "REGISTRY_DB", tmp_path / "instances" / "registry.db")
+    monkeypatch.setattr(routes, "PROJECT_ROOT", tmp_path)
+    helpers.save_registry({"domain": "test.dev", "instances": {"app": {**INSTANCE, "source_path": str(source)}}})
+    commands = []
+
+    def exec_run(cmd, **kwargs):
+        commands.append(cmd)
+        return 0, (b"", b"")
+
+    container = mock.MagicMock(exec_run=exec_run)
+    monkeypatch.setattr(routes, "docker_client", mock.MagicMock(**{"containers.get.return_value": container}))
+    monkeypatch.setattr(routes, "sanitize_container_name", lambda name: INSTANCE["container_name"])
+    return commands
+
+
+def api_db_setup_skipped():
+    return routes.api_db_setup("app", skip_seed=False, force=False, user="u").get("skipped", False)
+
+
+class TestApiDbSetup:
+    def test_restore_forces_next_setup(self, api, tmp_path, snapshot):
+        assert not api_db_setup_skipped()
+        assert api_db_setup_skipped()
+
+        routes.api_db_restore("app", snapshot=str(snapshot.relative_to(tmp_path)), user="u")
+        assert not helpers.load_registry()["instances"]["app"].get("migrations_fingerprint")
+        api.clear()
+        assert not api_db_setup_skipped()
+        assert any("migrate" in cmd for cmd in api)
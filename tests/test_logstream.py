@@ -0,0 +1,262 @@
+"""Unit tests for the shared log streams: line filtering, decoding, fan-out.
+
+Run:  pytest tests/test_logstream.py -v
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+import pytest
+
+from backend import logstream
+from backend.logstream import SUBSCRIBER_BACKLOG, LineBuffer, LineFilter, LogHub, LogSubscriber
+
+E_ACUTE = "é".encode()  # two bytes in UTF-8
+
+
+class FakeStream:
+    """Blocking iterator of chunks, like docker's logs(stream=True)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed.is_set():
+            raise StopIteration
+        return next(self._chunks)
+
+    def close(self):
+        self.closed.set()
+
+
+async def drain(sub, timeout=5):
+    """Everything a subscriber receives until the stream ends."""
+    parts = []
+    while True:
+        item = await asyncio.wait_for(sub.queue.get(), timeout)
+        if not isinstance(item, bytes):
+            return b"".join(parts)
+        parts.append(item)
+
+
+# ─── LineFilter ─────────────────────────────────────────────────────────────
+
+
+class TestLineFilter:
+    def test_empty_filter_is_falsy(self):
+        assert not LineFilter()
+        assert LineFilter(grep="x")
+        assert LineFilter(exclude="x")
+
+    def test_grep_and_exclude(self):
+        f = LineFilter(grep="ERROR|WARN", exclude="healthcheck")
+        assert f.keep("ERROR disk full\n")
+        assert not f.keep("INFO started\n")
+        assert not f.keep("WARN healthcheck slow\n")
+
+    def test_bad_pattern(self):
+        with pytest.raises(re.error):
+            LineFilter(grep="(")
+
+
+# ─── LineBuffer ─────────────────────────────────────────────────────────────
+
+
+class TestLineBuffer:
+    def test_partial_line_waits_for_newline(self):
+        buf = LineBuffer()
+        assert buf.lines(b"hello wor") == []
+        assert buf.lines(b"ld\nnext") == ["hello world\n"]
+        assert buf.flush() == "next"
+        assert buf.flush() == ""
+
+    def test_character_split_across_chunks(self):
+        buf = LineBuffer()
+        assert buf.decode(b"caf" + E_ACUTE[:1]) == "caf"
+        assert buf.decode(E_ACUTE[1:] + b"!") == "é!"
+
+    def test_lines_keep_split_character(self):
+        buf = LineBuffer()
+        assert buf.lines(b"caf" + E_ACUTE[:1]) == []
+        assert buf.lines(E_ACUTE[1:] + b"\n") == ["café\n"]
+
+    def test_truncated_character_replaced_on_flush(self):
+        buf = LineBuffer()
+        buf.lines(b"x" + E_ACUTE[:1])
+        assert buf.flush() == "x�"
+
+
+# ─── LogSubscriber ──────────────────────────────────────────────────────────
+
+
+def received(sub):
+    parts = []
+    while not sub.queue.empty():
+        parts.append(sub.queue.get_nowait())
+    return b"".join(parts)
+
+
+class TestLogSubscriber:
+    def overflow(self, sub, dropped: bytes):
+        """Fill the queue, then offer dropped, which the full queue refuses."""
+        while not sub.queue.full():
+            sub.offer(b"x\n")
+        sub.offer(dropped)
+        received(sub)
+
+    def test_marker_after_whole_lines(self):
+        sub = LogSubscriber(channel=None)
+        self.overflow(sub, b"a\nb\n")
+        sub.offer(b"c\n")
+        assert received(sub) == b"--- 2 line(s) dropped: client too slow ---\nc\n"
+
+    def test_marker_never_glued_to_a_partial_line(self):
+        sub = LogSubscriber(channel=None)
+        for _ in range(SUBSCRIBER_BACKLOG - 1):
+            sub.offer(b"x\n")
+        sub.offer(b"half a li")  # delivered, cut off by the drop that follows
+        sub.offer(b"ne\nlost\n")
+        received(sub)
+        sub.offer(b"next\n")
+        assert received(sub) == b"\n--- 2 line(s) dropped: client too slow ---\nnext\n"
+
+    def test_tail_of_a_dropped_line_is_discarded(self):
+        sub = LogSubscriber(channel=None)
+        self.overflow(sub, b"lost\nstart of a long li")
+        sub.offer(b"ne that went on")  # still the dropped line
+        sub.offer(b" and on\nnext\n")
+        assert received(sub) == b"--- 2 line(s) dropped: client too slow ---\nnext\n"
+
+
+# ─── LogHub ─────────────────────────────────────────────────────────────────
+
+
+class TestLogHub:
+    def test_viewers_share_one_stream(self):
+        opened = []
+        release = threading.Event()
+
+        def open_stream(tail):
+            release.wait(5)  # still opening while the second viewer joins
+            stream = FakeStream([b"one\ntw", b"o\n"])
+            opened.append(stream)
+            return stream
+
+        async def scenario():
+            hub = LogHub()
+            joins = [asyncio.create_task(hub.subscribe("c", open_stream)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert hub.stats() == {"c": 2}
+            release.set()
+            subs = await asyncio.gather(*joins)
+            received = [await drain(sub) for sub in subs]
+            await asyncio.sleep(0)
+            return hub, received
+
+        hub, received = asyncio.run(scenario())
+        assert len(opened) == 1
+        assert received == [b"one\ntwo\n", b"one\ntwo\n"]
+        assert hub.stats() == {}  # the ended channel is gone
+
+    def test_open_error_reaches_every_viewer(self):
+        def open_stream(tail):
+            raise LookupError("no such container")
+
+        async def scenario():
+            hub = LogHub()
+            results = await asyncio.gather(hub.subscribe("c", open_stream), hub.subscribe("c", open_stream),
+                                           return_exceptions=True)
+            return hub, results
+
+        hub, results = asyncio.run(scenario())
+        assert [type(r) for r in results] == [LookupError, LookupError]
+        assert hub.stats() == {}
+
+    def test_late_viewer_gets_whole_recent_lines(self):
+        more = threading.Event()
+
+        def chunks():
+            yield b"first\nsec"
+            more.wait(5)
+            yield b"ond\n"
+
+        async def scenario():
+            hub = LogHub()
+            early = await hub.subscribe("c", lambda tail: FakeStream(chunks()))
+            assert await asyncio.wait_for(early.queue.get(), 5) == b"first\nsec"
+            late = await hub.subscribe("c", lambda tail: pytest.fail("opened twice"))
+            more.set()
+            return await drain(early), await drain(late)
+
+        early, late = asyncio.run(scenario())
+        assert early == b"ond\n"
+        assert late == b"first\nsecond\n"  # backlog plus the unfinished line, then the rest
+
+    def test_last_viewer_leaving_closes_the_stream(self):
+        stream = FakeStream(iter(lambda: b"tick\n", None))
+
+        async def scenario():
+            hub = LogHub()
+            sub = await hub.subscribe("c", lambda tail: stream)
+            await asyncio.wait_for(sub.queue.get(), 5)
+            hub.unsubscribe(sub)
+            return hub
+
+        hub = asyncio.run(scenario())
+        assert stream.closed.wait(5)
+        assert hub.stats() == {}
+
+
+# ─── pump_merged ────────────────────────────────────────────────────────────
+
+
+class StalledSocket:
+    """A client that reads nothing until released, then everything."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.frames = []
+
+    async def send_text(self, text):
+        await self.release.wait()
+        self.frames.append(text)
+
+    async def receive(self):
+        await asyncio.Event().wait()  # never disconnects
+
+
+class TestPumpMerged:
+    def test_slow_client_gets_drops_not_unbounded_buffering(self, monkeypatch):
+        monkeypatch.setattr(logstream, "SUBSCRIBER_BACKLOG", 2)
+        monkeypatch.setattr(logstream, "FLUSH_INTERVAL", 0.001)
+        monkeypatch.setattr(logstream, "log_hub", LogHub())
+        stalled, resumed = threading.Event(), threading.Event()
+
+        def chunks():
+            for i in range(65):
+                if i == 60:  # the backlog is full by now; let the client catch up
+                    stalled.set()
+                    resumed.wait(10)
+                time.sleep(0.005)  # one batch per chunk
+                yield f"2026-01-01T00:00:00.{i:09d}Z line {i}\n".encode()
+
+        async def scenario():
+            ws = StalledSocket()
+            pump = asyncio.create_task(logstream.pump_merged(ws, {"a": ("a", lambda tail: FakeStream(chunks()))}))
+            await asyncio.to_thread(stalled.wait, 10)
+            await asyncio.sleep(0.1)
+            ws.release.set()
+            await asyncio.sleep(0.1)
+            resumed.set()
+            await asyncio.wait_for(pump, 5)
+            return "".join(ws.frames)
+
+        text = asyncio.run(scenario())
+        assert "line(s) dropped: client too slow" in text
+        assert "line 64" in text  # lines after the stall arrive again
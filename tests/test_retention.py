@@ -0,0 +1,130 @@
+"""Unit tests for snapshot retention planning.
+
+The controller image is built from controller/ alone, so lib/snapshots.py keeps
+its own copy of the retention rules; TestCopiesAgree holds both copies to the
+same result on the same catalog.
+Run:  pytest tests/test_retention.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import retention
+from lib import snapshots
+
+MB = 1024 * 1024
+NOW = datetime(2026, 4, 10, 12, 0, 0)  # a Friday
+
+
+def snap(instance, hours_ago, size_mb=1):
+    created = NOW - timedelta(hours=hours_ago)
+    return {
+        "path": f"snapshots/{instance}_db_{created:%Y%m%d_%H%M%S}.sql.gz",
+        "instance": instance, "db_name": f"{instance}_db", "profile": "full", "sha256": "",
+        "size_bytes": size_mb * MB, "created_at": created.isoformat(timespec="seconds"),
+    }
+
+
+def hours(entries):
+    """Age in hours of each entry, newest first."""
+    return sorted((NOW - datetime.fromisoformat(e["created_at"])).total_seconds() / 3600 for e in entries)
+
+
+# ─── _apply_cap ─────────────────────────────────────────────────────────────
+
+
+class TestApplyCap:
+    def test_no_cap_keeps_everything(self):
+        entries = [snap("a", h) for h in (0, 1, 2)]
+        assert retention._apply_cap(entries, None) == (entries, [])
+
+    def test_drops_oldest_beyond_cap(self):
+        entries = [snap("a", h) for h in (0, 1, 2)]
+        kept, dropped = retention._apply_cap(entries, 2)
+        assert hours(kept) == [0, 1]
+        assert hours(dropped) == [2]
+
+    def test_newest_kept_even_over_cap(self):
+        entries = [snap("a", 0, size_mb=5), snap("a", 1)]
+        kept, dropped = retention._apply_cap(entries, 1)
+        assert hours(kept) == [0]
+        assert hours(dropped) == [1]
+
+
+# ─── plan_prune ─────────────────────────────────────────────────────────────
+
+
+class TestPlanPrune:
+    def test_no_policy_keeps_everything(self):
+        assert retention.plan_prune([snap("a", h) for h in range(5)], {}) == []
+
+    def test_keep_last(self):
+        pruned = retention.plan_prune([snap("a", h) for h in range(5)], {"*": {"keep_last": 2}})
+        assert hours(pruned) == [2, 3, 4]
+
+    def test_keep_daily_keeps_newest_per_day(self):
+        entries = [snap("a", h) for h in (0, 1, 25, 26, 49)]
+        pruned = retention.plan_prune(entries, {"*": {"keep_daily": 2}})
+        assert hours(pruned) == [1, 26, 49]
+
+    def test_keep_weekly_keeps_newest_per_iso_week(self):
+        entries = [snap("a", d * 24) for d in (0, 1, 8, 9, 20)]
+        pruned = retention.plan_prune(entries, {"*": {"keep_weekly": 2}})
+        assert hours(pruned) == [24, 9 * 24, 20 * 24]
+
+    def test_instance_policy_falls_back_to_global_per_field(self):
+        entries = [snap("a", h) for h in (0, 1, 25, 26)] + [snap("b", h) for h in (0, 1)]
+        policies = {"*": {"keep_last": 1}, "a": {"keep_daily": 2}}
+        pruned = retention.plan_prune(entries, policies)
+        assert hours(e for e in pruned if e["instance"] == "a") == [1, 26]
+        assert hours(e for e in pruned if e["instance"] == "b") == [1]
+
+    def test_instance_cap(self):
+        entries = [snap("a", h) for h in (0, 1, 2)] + [snap("b", h) for h in (0, 1, 2)]
+        pruned = retention.plan_prune(entries, {"a": {"max_total_mb": 2}})
+        assert [e["instance"] for e in pruned] == ["a"]
+        assert hours(pruned) == [2]
+
+    def test_global_cap_spans_instances(self):
+        entries = [snap("a", h) for h in (0, 3)] + [snap("b", h) for h in (1, 2)]
+        pruned = retention.plan_prune(entries, {"*": {"max_total_mb": 3}})
+        assert [e["instance"] for e in pruned] == ["a"]
+        assert hours(pruned) == [3]
+
+
+# ─── Controller and CLI copies ──────────────────────────────────────────────
+
+
+CATALOG = (
+    [snap("a", h, size_mb=2) for h in (0, 5, 23, 30, 50, 200, 400)]
+    + [snap("b", h) for h in (1, 2, 26, 100, 170, 340)]
+    + [snap("c", h, size_mb=3) for h in (4, 80)]
+)
+
+
+class TestCopiesAgree:
+    @pytest.mark.parametrize("policies", [
+        {},
+        {"*": {"keep_last": 3}},
+        {"*": {"keep_daily": 2, "keep_weekly": 2}},
+        {"*": {"keep_last": 1}, "a": {"keep_daily": 3}, "b": {"max_total_mb": 3}},
+        {"*": {"max_total_mb": 10}, "c": {"keep_last": 1}},
+        {"*": {"keep_weekly": 1, "max_total_mb": 6}, "b": {"keep_last": 4, "max_total_mb": 2}},
+    ])
+    def test_plan_prune(self, policies):
+        controller = retention.plan_prune(CATALOG, policies)
+        cli = snapshots.plan_prune(CATALOG, policies)
+        assert sorted(e["path"] for e in controller) == sorted(e["path"] for e in cli)
+
+    @pytest.mark.parametrize("name, expected", [
+        ("v4_main_20240101_120000.sql.gz", "2024-01-01T12:00:00"),
+        ("v4_main_20240101_120000_no-logs.sql.gz", "2024-01-01T12:00:00"),
+        ("v4_main_20241399_999999.sql.gz", None),
+        ("manual-dump.sql.gz", None),
+    ])
+    def test_created_at(self, tmp_path, name, expected):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        mtime = datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec="seconds")
+        assert retention.snapshot_created_at(path) == snapshots.snapshot_created_at(path) == (expected or mtime)
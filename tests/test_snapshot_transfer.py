@@ -0,0 +1,44 @@
+"""Unit tests for Range parsing on snapshot downloads.
+
+Run:  pytest tests/test_snapshot_transfer.py -v
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from backend.routes.database import _parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),        # suffix longer than the file: whole file
+    ("bytes=900-5000", (900, 999)),   # end clamped to the last byte
+    ("BYTES = 0-0", (0, 0)),
+])
+def test_single_range(header, expected):
+    assert _parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-10",       # other unit
+    "bytes=0-10,20-30", # multiple ranges
+    "bytes=a-b",
+    "bytes=-0",
+    "bytes=",
+    "bytes=500-100",    # last byte before first: invalid, so ignored
+    "bytes=1500-100",
+])
+def test_unservable_falls_back_to_full_file(header):
+    assert _parse_range(header, SIZE) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1200"])
+def test_unsatisfiable(header):
+    with pytest.raises(HTTPException) as exc:
+        _parse_range(header, SIZE)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == f"bytes */{SIZE}"